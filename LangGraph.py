@@ -1,14 +1,9 @@
 # import asyncio
 import os
+import threading
 from dotenv import load_dotenv
-# from langchain_ollama import ChatOllama
-# from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import SystemMessage
-from langgraph.graph import MessagesState, START, StateGraph
-from langgraph.prebuilt import tools_condition, ToolNode
-import logging
-logging.basicConfig(level=logging.DEBUG)
+from langgraph.graph import START, END, StateGraph
 from langgraph.checkpoint.memory import MemorySaver
 # Import tools
 # from tools.time_tool import time_tools
@@ -16,36 +11,32 @@ from langgraph.checkpoint.memory import MemorySaver
 from tools.rag_tools import document_search_tools
 from tools.database_tools import db_tools
 from tools.memory_tool import memory_tools
+from models.state_models import ChatState
+from nodes.history import create_history_manager
+from nodes.user_context import load_user_context
+from nodes.tool_executor import create_tool_executor
+from nodes.router import route_intent, route_after_router
+from nodes.loop_budget import create_final_answer_node, route_after_assistant
+from services.metrics import timed_node
+from services.llm_registry import get_model, has_separate_final_answer_model
 
 load_dotenv()
-# OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-# OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY")
 GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
 LANGCHAIN_API_KEY = os.environ.get("LANGCHAIN_API_KEY")
 os.environ["LANGCHAIN_TRACING_V2"] = "true"
 os.environ["LANGCHAIN_PROJECT"] = "SriChatbot"
 
-# llm = ChatOpenAI(
-#     model="qwen/qwen3-4b:free",
-#     openai_api_base="https://openrouter.ai/api/v1",
-#     openai_api_key=OPENROUTER_API_KEY,
-# )
+# Model per role (planner, final_answer, summarization, ...) dikonfigurasi di services/llm_registry.py
 
-# llm = ChatOllama(
-#     model="qwen3:4b",
-#     temperature=0
-# )
+_react_graph = None
+_graph_lock = threading.Lock()
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    google_api_key=GOOGLE_API_KEY,
-    temperature=0,
-    convert_system_message_to_human=True,
-)
+def get_llm():
+    """LLM utama (role planner), dibuat saat pertama dipakai"""
+    return get_model("planner")
 
 tools = document_search_tools + db_tools + memory_tools
 # llm_with_tools = llm.bind_tools(tools, parallel_tool_calls=False)
-llm_with_tools = llm.bind_tools(tools)
 
 # System message
 # Enhanced system message
@@ -54,7 +45,7 @@ Anda adalah asisten AI bernama SriBot yang menggunakan ReAct (Reasoning + Acting
 
 ---WAJIB: PROTOKOL ReAct PATTERN---
 Untuk SETIAP percakapan, Anda HARUS mengikuti urutan ini:
-1. **SELALU MULAI** dengan memanggil tool `get_user_context` untuk mendapatkan informasi user yang sudah tersimpan
+1. **BACA KONTEKS USER** di bagian ---KONTEKS USER--- (sudah dimuat otomatis, TIDAK perlu memanggil `get_user_context`)
 2. **ANALISIS** apakah pesan user mengandung informasi penting yang perlu disimpan
 3. **JIKA ADA** informasi penting, panggil tool `analyze_and_save_info` atau `save_important_info`
 4. **CEK PERMINTAAN KHUSUS** seperti hapus/update memory jika ada
@@ -72,7 +63,7 @@ Final Answer: Respons final ke user
 
 ---KEMAMPUAN TOOLS---
 **Memory Tools (PRIORITAS TERTINGGI)**:
-- `get_user_context`: WAJIB dipanggil pertama untuk konteks user dengan ID memory
+- `get_user_context`: Muat ulang konteks user (hanya jika perlu data terbaru setelah memory diubah di percakapan ini)
 - `analyze_and_save_info`: Auto-deteksi info penting dari pesan user menggunakan rule-based + LLM fallback
 - `save_important_info`: Simpan info spesifik tentang user secara manual
 - `delete_user_memory`: Hapus memory spesifik berdasarkan konten atau ID
@@ -90,13 +81,13 @@ Final Answer: Respons final ke user
 - `search_product_by_name`: Cari produk songket berdasarkan nama dengan info UMKM
 
 ---ATURAN WAJIB---
--SELALU panggil `get_user_context` di awal setiap percakapan
+-SELALU perhatikan ---KONTEKS USER--- yang sudah dimuat otomatis
 -ANALISIS setiap pesan user untuk info penting yang bisa disimpan
 -GUNAKAN konteks user untuk respons yang personal
 -PANGGIL tools sesuai kebutuhan query user
 -BERIKAN respons yang ramah dan personal
 
--JANGAN langsung jawab tanpa cek konteks user dulu
+-JANGAN panggil `get_user_context` jika konteks user sudah tersedia di prompt
 -JANGAN lewatkan informasi penting yang bisa disimpan
 -JANGAN abaikan tools yang tersedia
 
@@ -139,14 +130,9 @@ Final Answer: Respons final ke user
 **Scenario 1: User Baru dengan Info Personal**
 User: "Halo, nama saya Widya. Saya ingin tahu tentang songket."
 
-Thought: User baru menyapa dan memperkenalkan nama. Saya perlu:
-1. Cek konteks user yang sudah ada
-2. Simpan info nama user
-3. Cari info tentang songket
-
-Action: get_user_context
-Action Input: {}
-Observation: "Belum ada informasi yang tersimpan tentang user ini."
+Thought: User baru menyapa dan memperkenalkan nama. KONTEKS USER: belum ada informasi. Saya perlu:
+1. Simpan info nama user
+2. Cari info tentang songket
 
 Action: analyze_and_save_info  
 Action Input: {"user_message": "Halo, nama saya Widya. Saya ingin tahu tentang songket."}
@@ -161,13 +147,8 @@ Final Answer: Halo Widya! Senang berkenalan dengan Anda. Berdasarkan informasi t
 **Scenario 2: User Minta Hapus Memory**
 User: "Hapus alamat saya dong"
 
-Thought: User minta hapus informasi alamat. Saya perlu:
-1. Cek konteks user dulu
-2. Hapus memory yang berkaitan dengan alamat
-
-Action: get_user_context
-Action Input: {}
-Observation: "Konteks yang tersimpan: 1. Nama: Widya [ID: abc123...] 2. Alamat: Jakarta Selatan [ID: def456...]"
+Thought: User minta hapus informasi alamat. KONTEKS USER: "1. Nama: Widya [ID: abc123...] 2. Alamat: Jakarta Selatan [ID: def456...]". Saya perlu:
+1. Hapus memory yang berkaitan dengan alamat
 
 Action: delete_user_memory
 Action Input: {"memory_identifier": "alamat"}
@@ -178,13 +159,8 @@ Final Answer: Baik Widya, saya sudah menghapus informasi alamat Anda dari memory
 **Scenario 3: User Update Info**
 User: "Eh salah nih, nama bukan Widya tapi Widia"
 
-Thought: User ingin koreksi nama. Saya perlu:
-1. Cek konteks user
-2. Update nama dari Widya ke Widia
-
-Action: get_user_context
-Action Input: {}
-Observation: "Konteks tersimpan: 1. Nama: Widya [ID: abc123...]"
+Thought: User ingin koreksi nama. KONTEKS USER: "1. Nama: Widya [ID: abc123...]". Saya perlu:
+1. Update nama dari Widya ke Widia
 
 Action: update_user_memory
 Action Input: {"old_info": "Widya", "new_info": "Widia"}
@@ -226,32 +202,81 @@ Contoh response format:
 - Berikan transparansi tentang data apa yang tersimpan jika user tanya
 """)
 
-# Node
-def assistant(state: MessagesState):
-   return {"messages": [llm_with_tools.invoke([sys_msg] + state["messages"])]}
-
-builder = StateGraph(MessagesState)
-
-# Define nodes: these do the work
-builder.add_node("assistant", assistant)
-builder.add_node("tools", ToolNode(tools))
-
-# Define edges: these determine how the control flow moves
-builder.add_edge(START, "assistant")
-builder.add_conditional_edges(
-    "assistant",
-    tools_condition,
-)
-builder.add_edge("tools", "assistant")
-# config = {
-#     "configurable": {
-#         "thread_id": "chat-session-002", 
-#         "user_id": "widya123"
-#     }
-# }
-
-memory=MemorySaver()
-react_graph = builder.compile(checkpointer=memory)
+def build_system_message(state: ChatState) -> SystemMessage:
+    """System prompt + konteks user (dimuat oleh load_user_context) + ringkasan percakapan"""
+    content = sys_msg.content
+    content += f"\n---KONTEKS USER---\n{state.get('user_context') or 'Belum ada informasi yang tersimpan tentang user ini.'}\n"
+    if state.get("summary"):
+        content += f"\n---RINGKASAN PERCAKAPAN SEBELUMNYA---\n{state['summary']}\n"
+    return SystemMessage(content=content)
+
+def build_graph(model=None, graph_tools=None, checkpointer=None):
+    """
+    Rakit dan compile ReAct graph. Semua dependensi bisa diganti
+    (misal fake model dan tool lokal untuk benchmark offline).
+    """
+    if model is not None:
+        planner, summarizer, final_model = model, model, None
+    else:
+        planner, summarizer = get_model("planner"), get_model("summarization")
+        final_model = get_model("final_answer") if has_separate_final_answer_model() else None
+    graph_tools = graph_tools if graph_tools is not None else tools
+    model_with_tools = planner.bind_tools(graph_tools)
+
+    # Node
+    async def assistant(state: ChatState):
+       system_message = build_system_message(state)
+       messages = [system_message] + state["messages"]
+       response = await model_with_tools.ainvoke(messages, config={"tags": ["role:planner"]})
+       if final_model is not None and not response.tool_calls:
+           # Planner selesai memakai tool: jawaban akhir ditulis ulang oleh model final_answer
+           response = await final_model.ainvoke(messages, config={"tags": ["role:final_answer"]})
+       return {"messages": [response]}
+
+    builder = StateGraph(ChatState)
+
+    # Define nodes: these do the work
+    builder.add_node("route_intent", timed_node("route_intent", route_intent))
+    builder.add_node("manage_history", timed_node("manage_history", create_history_manager(summarizer)))
+    builder.add_node("load_user_context", timed_node("load_user_context", load_user_context))
+    builder.add_node("assistant", timed_node("assistant", assistant))
+    builder.add_node("tools", timed_node("tools", create_tool_executor(graph_tools)))
+    builder.add_node("force_final_answer", timed_node(
+        "force_final_answer", create_final_answer_node(final_model or planner, build_system_message)
+    ))
+
+    # Define edges: these determine how the control flow moves
+    builder.add_edge(START, "route_intent")
+    builder.add_conditional_edges("route_intent", route_after_router, ["manage_history", END])
+    builder.add_edge("manage_history", "load_user_context")
+    builder.add_edge("load_user_context", "assistant")
+    builder.add_conditional_edges(
+        "assistant",
+        route_after_assistant,
+        ["tools", "force_final_answer", END],
+    )
+    builder.add_edge("tools", "assistant")
+    builder.add_edge("force_final_answer", END)
+    # config = {
+    #     "configurable": {
+    #         "thread_id": "chat-session-002", 
+    #         "user_id": "widya123"
+    #     }
+    # }
+
+    return builder.compile(checkpointer=checkpointer if checkpointer is not None else MemorySaver())
+
+def get_react_graph(checkpointer=None):
+    """
+    Graph utama, di-compile sekali per proses (saat startup lewat lifespan, atau saat pertama dipakai).
+    checkpointer hanya dipakai pada compile pertama; tanpa checkpointer graph memakai MemorySaver.
+    """
+    global _react_graph
+    if _react_graph is None:
+        with _graph_lock:
+            if _react_graph is None:
+                _react_graph = build_graph(checkpointer=checkpointer)
+    return _react_graph
 
 def create_initial_state(message: str, user_id: str):
     """Helper function untuk create initial state dengan user_id"""
@@ -262,6 +287,7 @@ def create_initial_state(message: str, user_id: str):
     }
 
 # # Show
+# react_graph = get_react_graph()
 # display(Image(react_graph.get_graph(xray=True).draw_mermaid_png()))
 # messages = [HumanMessage(content=
 # """
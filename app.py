@@ -1,28 +1,42 @@
-from fastapi import FastAPI, HTTPException
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, APIRouter
 from pydantic import BaseModel
-from langchain_core.messages import HumanMessage
-from LangGraph import react_graph
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+from LangGraph import get_react_graph
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 from typing import Optional, Dict, Any, List, Union
 import logging 
 import uvicorn
 
-logging.basicConfig(level=logging.INFO) # Basic logging
 logger = logging.getLogger(__name__)
 
 # Uploadfile
 from fastapi.staticfiles import StaticFiles
-from fastapi import UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import UploadFile, File, Form, BackgroundTasks, Request, Header
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 import os
 from datetime import datetime
 import magic  # python-magic untuk deteksi MIME type
 from PIL import Image  # Pillow untuk validasi gambar
 import io
 import json
-import re
+import asyncio
+import math
 import psycopg2
 from dotenv import load_dotenv
+from services import answer_cache
+from services.metrics import CHAT_REQUEST_LATENCY, observe_turn, render_metrics
+from services.startup import StartupReport
+from services.checkpointer import create_checkpointer, close_checkpointer
+from services.single_flight import SingleFlight, chat_request_key
+from services.admission import AdmissionRejected, admission
+from services.llm_registry import has_separate_final_answer_model, role_stats
+from services.resilient_llm import request_budget, start_request_budget
+from services.prefetch import get_prefetch_stats, start_prefetch
+from services.logging_setup import TraceIdMiddleware, configure_logging, log_payload, shutdown_logging
 
 load_dotenv()
 
@@ -45,19 +59,17 @@ ALLOWED_IMAGE_TYPES = {
 # Maximum file size (5MB)
 MAX_FILE_SIZE = 5 * 1024 * 1024
 
-app = FastAPI()
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"], 
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Warmup saat startup: panggilan embedding dan DB pertama membuka koneksi;
+# warmup LLM opsional karena memakan kuota
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+WARMUP_LLM = os.getenv("WARMUP_LLM", "false").lower() == "true"
+
+router = APIRouter()
 
 class ChatRequest(BaseModel):
     message: str
     user_id: str
+    session_id: str = "default"
 
 class ChatResponse(BaseModel):
     reply: str
@@ -130,59 +142,24 @@ def extract_images_from_data(data: Union[Dict, List]) -> List[str]:
     find_images(data)
     return images
 
-def extract_structured_data(messages):
-    """Extract structured data (UMKM info, products, etc.) from tool responses"""
+def collect_tool_artifacts(turn_messages):
+    """
+    Ambil data terstruktur dan gambar dari artifact ToolMessage milik turn ini saja.
+    Artifact sukses terakhir menjadi `data`; gambar dikumpulkan dari semua artifact sukses.
+    """
     structured_data = None
     images = []
-    
-    try:
-        for message in messages:
-            if not hasattr(message, 'content'):
-                continue
-                
-            content = message.content
-            if not isinstance(content, str):
-                continue
-                
-            content = content.strip()
-            
-            if not content:
-                continue
-            
-            try:
-                # Try to parse JSON content
-                if content.startswith('{') or content.startswith('['):
-                    parsed_data = json.loads(content)
-                    
-                    # Handle new response format with status/data structure
-                    if isinstance(parsed_data, dict):
-                        if 'status' in parsed_data and 'data' in parsed_data:
-                            # New format: {"status": "success", "data": [...]}
-                            if parsed_data['status'] == 'success':
-                                actual_data = parsed_data['data']
-                                structured_data = parsed_data  # Keep full structure for frontend
-                                images.extend(extract_images_from_data(actual_data))
-                        else:
-                            # Old format: direct data
-                            structured_data = parsed_data
-                            images.extend(extract_images_from_data(parsed_data))
-                    elif isinstance(parsed_data, list):
-                        # List of items (old format)
-                        structured_data = {"status": "success", "data": parsed_data, "count": len(parsed_data)}
-                        images.extend(extract_images_from_data(parsed_data))
-                        
-            except json.JSONDecodeError:
-                urls = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', content)
-                for url in urls:
-                    if any(ext in url.lower() for ext in ['.jpg', '.jpeg', '.png']):
-                        images.append(url)
-                        
-    except Exception as e:
-        print(f"Error extracting structured data: {e}")
-    
-    return structured_data, list(set(images))  # Remove duplicates
+    for message in turn_messages:
+        artifact = getattr(message, "artifact", None)
+        if not isinstance(message, ToolMessage) or not isinstance(artifact, dict):
+            continue
+        if artifact.get("status") != "success":
+            continue
+        structured_data = artifact
+        images.extend(extract_images_from_data(artifact.get("data")))
+    return structured_data, list(dict.fromkeys(images))
 
-@app.post("/upload-umkm")
+@router.post("/upload-umkm")
 async def upload_umkm_image(
     umkm_id: int = Form(...), 
     file: UploadFile = File(...)
@@ -243,7 +220,7 @@ async def upload_umkm_image(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error upload file: {str(e)}")
 
-@app.post("/upload-product")
+@router.post("/upload-product")
 async def upload_product_image(
     product_id: int = Form(...), 
     file: UploadFile = File(...)
@@ -315,7 +292,7 @@ async def upload_product_image(
         raise HTTPException(status_code=500, detail=f"Error upload file: {str(e)}")
 
 
-@app.get("/umkm/{umkm_id}")
+@router.get("/umkm/{umkm_id}")
 async def get_umkm_info(umkm_id: int):
     """Get UMKM info by ID"""
     try:
@@ -347,7 +324,7 @@ async def get_umkm_info(umkm_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/product/{product_id}")
+@router.get("/product/{product_id}")
 async def get_product_info(product_id: int):
     """Get product info by ID"""
     try:
@@ -398,65 +375,266 @@ async def list_uploaded_files():
         raise HTTPException(status_code=500, detail=str(e))
     
 
-@app.post("/chat", response_model=ChatResponse)
-def chat(request: ChatRequest):
-    try:
-        from LangGraph import react_graph
-        config = {
-            "configurable": {
-                "thread_id": "2",
-                "user_id": request.user_id  
-            }
+def build_chat_config(request: ChatRequest) -> Dict[str, Any]:
+    """Config LangGraph untuk satu request chat (satu thread per user/session)"""
+    return {
+        "configurable": {
+            "thread_id": f"{request.user_id}:{request.session_id}",
+            "user_id": request.user_id  
         }
-        logger.info(f"Processing chat for user_id: {request.user_id}")
+    }
 
-        result = react_graph.invoke(
-            {"messages": [HumanMessage(content=request.message)]},  
-            config=config 
+def build_chat_response(messages) -> ChatResponse:
+    """Susun ChatResponse dari daftar message hasil graph"""
+    responses = [m.content for m in messages if hasattr(m, "content") and m.content]
+    final_reply = responses[-1] if responses else "Maaf, saya tidak bisa memberikan respons."
+    
+    structured_data, images = collect_tool_artifacts(current_turn_messages(messages))
+    
+    return ChatResponse(
+        reply=final_reply,
+        data=structured_data,
+        images=images
+    )
+
+def current_turn_messages(messages):
+    """Message milik turn terakhir (mulai dari HumanMessage terakhir)"""
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return messages[i:]
+    return messages
+
+async def record_cached_turn(react_graph, config: Dict[str, Any], message: str, reply: str):
+    """Tambahkan jawaban dari answer cache ke thread agar history percakapan tetap utuh"""
+    try:
+        await react_graph.aupdate_state(
+            config,
+            {"messages": [HumanMessage(content=message), AIMessage(content=reply)]},
+            as_node="assistant",
         )
-        
-        for m in result["messages"]:
+    except Exception as e:
+        logger.warning(f"Gagal mencatat jawaban cache ke thread: {e}")
+
+async def cache_answer_if_eligible(message: str, result: Dict[str, Any], response: ChatResponse):
+    """Simpan jawaban ke answer cache jika turn ini tidak dipersonalisasi"""
+    turn_messages = current_turn_messages(result.get("messages", []))
+    if answer_cache.is_cacheable_turn(turn_messages, result.get("user_context", "")):
+        await answer_cache.store(message, response.model_dump())
+
+# Request /chat identik (user, session, pesan sama, atau Idempotency-Key sama) berbagi satu eksekusi graph
+chat_single_flight = SingleFlight()
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(
+    request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    with CHAT_REQUEST_LATENCY.labels(endpoint="chat").time():
+        try:
+            key = chat_request_key(request.user_id, request.session_id, request.message, idempotency_key)
+            return await chat_single_flight.run(key, lambda: _chat(request, background_tasks))
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            return chat_error_response(e)
+
+async def _chat(request: ChatRequest, background_tasks: BackgroundTasks) -> ChatResponse:
+    react_graph = get_react_graph()
+    config = build_chat_config(request)
+    logger.info(f"Processing chat for user_id: {request.user_id}, session_id: {request.session_id}")
+
+    cached = await answer_cache.lookup(request.message)
+    if cached:
+        logger.info("Answer cache hit")
+        await record_cached_turn(react_graph, config, request.message, cached["reply"])
+        return ChatResponse(**cached)
+
+    async with admission.admit(request.user_id):
+        with request_budget():
+            prefetch = start_prefetch(request.message)
             try:
-                m.pretty_print()
-            except Exception as e:
-                print(f"[RAW] {m}")
-        
-        responses = [m.content for m in result["messages"] if hasattr(m, "content") and m.content]
-        final_reply = responses[-1] if responses else "Maaf, saya tidak bisa memberikan respons."
-        
-        structured_data, images = extract_structured_data(result["messages"])
-        
-        print(f"DEBUG: Extracted structured_data: {structured_data}")
-        print(f"DEBUG: Extracted images: {images}")
-        
-        response = ChatResponse(
-            reply=final_reply,
-            data=structured_data,
-            images=images
-        )
+                result = await react_graph.ainvoke(
+                    {"messages": [HumanMessage(content=request.message)]},  
+                    config=config 
+                )
+            finally:
+                if prefetch is not None:
+                    prefetch.close()
+    
+    turn_messages = current_turn_messages(result["messages"])
+    log_payload(logger, "chat turn messages", [m.model_dump(exclude={"response_metadata"}) for m in turn_messages])
+    observe_turn(turn_messages)
+    response = build_chat_response(result["messages"])
+    background_tasks.add_task(cache_answer_if_eligible, request.message, result, response)
+    logger.info("chat response", extra={"user_id": request.user_id, "tool_messages": sum(isinstance(m, ToolMessage) for m in turn_messages)})
+    return response
 
-        print(f"DEBUG: Final response: {response}")
-        return response
-        
-    except Exception as e:
-        logger.error(f"Error in chat endpoint: {e}")
-        import traceback
-        traceback.print_exc()
-        
-        return ChatResponse(
-            reply="Maaf, terjadi kesalahan saat memproses permintaan Anda. Silakan coba lagi.",
-            data={"status": "error", "message": str(e)},
-            images=[]
+def chat_error_response(e: Exception) -> ChatResponse:
+    logger.error(f"Error in chat endpoint: {e}", exc_info=e)
+    return ChatResponse(
+        reply="Maaf, terjadi kesalahan saat memproses permintaan Anda. Silakan coba lagi.",
+        data={"status": "error", "message": str(e)},
+        images=[]
+    )
+
+def _sse_event(event: str, payload: Any) -> str:
+    """Format satu event Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+def _chunk_text(chunk) -> str:
+    """Ambil teks dari AIMessageChunk (content bisa str atau list of parts)"""
+    content = getattr(chunk, "content", "")
+    if isinstance(content, str):
+        return content
+    parts = []
+    for part in content:
+        if isinstance(part, str):
+            parts.append(part)
+        elif isinstance(part, dict) and part.get("type") == "text":
+            parts.append(part.get("text", ""))
+    return "".join(parts)
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """StreamingResponse yang memanggil on_close setelah selesai, error, atau client disconnect"""
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming chat via Server-Sent Events.
+    Event yang dikirim:
+    - token: potongan teks jawaban dari node assistant
+    - tool_start / tool_end: progress pemanggilan tool
+    - final: payload lengkap (reply, data, images) seperti /chat
+    - error: jika terjadi kesalahan
+    """
+    react_graph = get_react_graph()
+    config = build_chat_config(request)
+    logger.info(f"Processing streaming chat for user_id: {request.user_id}")
+
+    cached = await answer_cache.lookup(request.message)
+    if cached:
+        await record_cached_turn(react_graph, config, request.message, cached["reply"])
+        return StreamingResponse(
+            iter([_sse_event("final", cached)]),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
         )
+
+    # Slot diambil sebelum response dimulai agar penolakan bisa dikirim sebagai 429
+    await admission.acquire(request.user_id)
+    started = time.monotonic()
+
+    # Jika jawaban akhir ditulis model final_answer, token planner tidak ikut di-stream
+    stream_final_only = has_separate_final_answer_model()
+
+    async def event_generator():
+        start_request_budget()
+        prefetch = start_prefetch(request.message)
+        try:
+            async for event in react_graph.astream_events(
+                {"messages": [HumanMessage(content=request.message)]},
+                config=config,
+                version="v2",
+            ):
+                kind = event["event"]
+                node = event.get("metadata", {}).get("langgraph_node")
+
+                if kind == "on_chat_model_stream" and node in ("assistant", "force_final_answer") and (
+                    not stream_final_only or "role:final_answer" in event.get("tags", [])
+                ):
+                    text = _chunk_text(event["data"]["chunk"])
+                    if text:
+                        yield _sse_event("token", {"content": text})
+                elif kind == "on_tool_start":
+                    yield _sse_event("tool_start", {
+                        "tool": event["name"],
+                        "input": event["data"].get("input"),
+                    })
+                elif kind == "on_tool_end":
+                    yield _sse_event("tool_end", {"tool": event["name"]})
+
+            state = await react_graph.aget_state(config)
+            observe_turn(current_turn_messages(state.values.get("messages", [])))
+            response = build_chat_response(state.values.get("messages", []))
+            yield _sse_event("final", response.model_dump())
+            await cache_answer_if_eligible(request.message, state.values, response)
+
+        except Exception as e:
+            logger.error(f"Error in chat stream endpoint: {e}")
+            yield _sse_event("error", {
+                "reply": "Maaf, terjadi kesalahan saat memproses permintaan Anda. Silakan coba lagi.",
+                "message": str(e),
+            })
+        finally:
+            if prefetch is not None:
+                prefetch.close()
+
+    return ReleasingStreamingResponse(
+        event_generator(),
+        on_close=lambda: admission.release(request.user_id, time.monotonic() - started),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
     
+@router.get("/metrics")
+def metrics():
+    """Metrik Prometheus (latency node, tool, DB, Redis, embedding, token LLM)"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@router.get("/admission/stats")
+def admission_stats():
+    """Slot aktif dan antrian admission control di worker ini"""
+    return admission.stats()
+
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "reason": exc.reason},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+@router.get("/llm/stats")
+def llm_stats():
+    """Jumlah panggilan, latency, token, dan perkiraan biaya LLM per role di worker ini"""
+    return role_stats.snapshot()
+
+@router.get("/prefetch/stats")
+def prefetch_stats():
+    """Hit/miss speculative prefetch di worker ini"""
+    return get_prefetch_stats()
+
+@router.get("/embeddings/stats")
+def embeddings_stats():
+    """Hit-rate cache embedding (LRU, Redis, coalesced) di worker ini"""
+    from services.embedding_service import get_embedding_stats
+    return get_embedding_stats()
+
+@router.get("/router/stats")
+def router_stats():
+    """Hit-rate fast-path router (pesan yang dijawab tanpa LLM)"""
+    from nodes.router import get_router_stats
+    return get_router_stats()
+
 # Endpoint untuk testing memory
-@app.get("/memory/{user_id}")
+@router.get("/memory/{user_id}")
 def get_user_memory(user_id: str):
     """Endpoint untuk melihat semua memori user (untuk debugging)"""
     try:
-        from tools.memory_tool import redis_store
+        from tools.memory_tool import get_redis_store
         namespace = ("memories", user_id)
-        memories = redis_store.search(namespace, query="")
+        memories = get_redis_store().search(namespace, query="")
         
         return {
             "user_id": user_id,
@@ -466,8 +644,88 @@ def get_user_memory(user_id: str):
     except Exception as e:
         return {"error": str(e)}
 
-port=int(os.getenv("PORT"))
+@router.get("/startup")
+def startup_report(request: Request):
+    """Breakdown waktu startup worker ini"""
+    return request.app.state.startup_report
+
+async def initialize_services(report: StartupReport):
+    """Inisialisasi store, pool, checkpointer, dan graph sekali per worker, lalu warmup. Return checkpointer."""
+    from tools.memory_tool import get_redis_store
+    from tools.rag_tools import BM25_KEY, HYBRID_SEARCH, get_bm25_index, get_vectorstore
+    from tools.database_tools import ping_database
+    from services.embedding_service import EMBEDDING_DIM
+    from services.index_schema import verify_vector_index
+    from LangGraph import get_llm
+
+    with report.stage("memory_store"):
+        await asyncio.to_thread(get_redis_store)
+    vectorstore = None
+    with report.stage("vector_store"):
+        vectorstore = await asyncio.to_thread(get_vectorstore)
+        if vectorstore is None:
+            raise RuntimeError("vector_db belum tersedia")
+    if vectorstore is not None:
+        with report.stage("index_schema", required=True):
+            # Index dengan dimensi/datatype berbeda dari konfigurasi membuat semua query gagal
+            await asyncio.to_thread(verify_vector_index, vectorstore.index.client)
+    if HYBRID_SEARCH:
+        with report.stage("bm25_index"):
+            if await asyncio.to_thread(get_bm25_index) is None:
+                raise RuntimeError(f"{BM25_KEY} belum tersedia, jalankan create_vectorstore.py")
+    with report.stage("checkpointer", required=True):
+        checkpointer = await create_checkpointer()
+    with report.stage("graph_compile", required=True):
+        get_react_graph(checkpointer=checkpointer)
+
+    if not STARTUP_WARMUP:
+        return checkpointer
+    with report.stage("warmup_database"):
+        await asyncio.to_thread(ping_database)
+    if vectorstore is not None:
+        with report.stage("warmup_embeddings"):
+            vector = await vectorstore.embeddings.aembed_query("songket palembang")
+            if len(vector) != EMBEDDING_DIM:
+                raise RuntimeError(f"Dimensi embedding {len(vector)} != EMBEDDING_DIM {EMBEDDING_DIM}")
+    if WARMUP_LLM:
+        with report.stage("warmup_llm"):
+            await get_llm().ainvoke("ping")
+    return checkpointer
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    report = StartupReport()
+    report.add("import", time.perf_counter() - _IMPORT_STARTED)
+    checkpointer = await initialize_services(report)
+    report.log()
+    app.state.startup_report = report.as_dict()
+    yield
+    await close_checkpointer(checkpointer)
+    from tools.thread_pool import shutdown_thread_pool
+    shutdown_thread_pool()
+    shutdown_logging()
+
+def create_app() -> FastAPI:
+    """App factory: semua inisialisasi berat terjadi di lifespan, sekali per worker"""
+    configure_logging()
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"], 
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Request-ID"],
+    )
+    app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+    app.include_router(router)
+    app.add_exception_handler(AdmissionRejected, admission_rejected_handler)
+    app.add_middleware(TraceIdMiddleware)
+    return app
+
+app = create_app()
 
 if __name__ == '__main__':
+    port = int(os.getenv("PORT", "8000"))
     logger.info(f"Starting Uvicorn server on http://0.0.0.0:{port}")
-    uvicorn.run("app:app", host="127.0.0.1", port=port, reload=True, log_level="info")
+    uvicorn.run("app:create_app", factory=True, host="127.0.0.1", port=port, reload=True, log_level="info")
@@ -0,0 +1,217 @@
+"""
+Stand-in lokal untuk benchmark offline: fake chat model ber-skrip, fake chat model
+dengan latency/error yang disuntikkan, fake embeddings deterministik, memory store
+in-memory, vector store in-memory, dan fixture SQLite yang menggantikan Postgres.
+Tidak ada panggilan jaringan.
+"""
+import asyncio
+import itertools
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.vectorstores import InMemoryVectorStore
+from langgraph.store.memory import InMemoryStore
+
+EMBEDDING_DIMS = 256
+
+def fake_embeddings():
+    return DeterministicFakeEmbedding(size=EMBEDDING_DIMS)
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Fake tool-calling chat model: mengembalikan AIMessage dari skrip secara berurutan
+    (berputar). bind_tools mengembalikan model yang sama.
+    """
+    script: List[AIMessage]
+    _cursor: Any = None
+
+    def model_post_init(self, __context: Any) -> None:
+        self._cursor = itertools.cycle(self.script)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _next_message(self) -> AIMessage:
+        template = next(self._cursor)
+        # tool call id harus unik per pemanggilan
+        tool_calls = [{**call, "id": f"call-{uuid.uuid4().hex[:12]}"} for call in template.tool_calls]
+        return AIMessage(
+            content=template.content,
+            tool_calls=tool_calls,
+            usage_metadata={"input_tokens": 1200, "output_tokens": 80, "total_tokens": 1280},
+        )
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._next_message())])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._next_message())])
+
+class LatencyInjectingChatModel(BaseChatModel):
+    """
+    Fake chat model dengan latency acak: sebagian kecil panggilan jatuh ke ekor lambat,
+    dan sebagian bisa gagal dengan error transient (503). Untuk menguji ResilientLLM.
+    """
+    fast_ms: float = 5.0
+    slow_ms: float = 200.0
+    slow_rate: float = 0.1
+    error_rate: float = 0.0
+    seed: int = 0
+    calls: int = 0
+    _rng: Any = None
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "latency-fake"
+
+    def _draw(self):
+        self.calls += 1
+        delay = self.slow_ms if self._rng.random() < self.slow_rate else self.fast_ms
+        fail = self._rng.random() < self.error_rate
+        return delay / 1000, fail
+
+    def _result(self, fail: bool) -> ChatResult:
+        if fail:
+            raise ConnectionError("503 Service Unavailable (fake)")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs) -> ChatResult:
+        delay, fail = self._draw()
+        time.sleep(delay)
+        return self._result(fail)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs) -> ChatResult:
+        delay, fail = self._draw()
+        await asyncio.sleep(delay)
+        return self._result(fail)
+
+def react_turn_script() -> List[AIMessage]:
+    """Satu turn ReAct: tiga tool call paralel, lalu jawaban final"""
+    return [
+        AIMessage(content="", tool_calls=[
+            {"name": "analyze_and_save_info", "args": {"user_message": "nama saya Widya, saya suka motif lepus"}, "id": ""},
+            {"name": "search_documents", "args": {"query": "sejarah songket lepus", "top_k": 5}, "id": ""},
+            {"name": "search_product_by_name", "args": {"product_name": "lepus"}, "id": ""},
+        ]),
+        AIMessage(content="Halo Widya! Songket lepus adalah ... -SriBot"),
+    ]
+
+def memory_store():
+    return InMemoryStore(index={"dims": EMBEDDING_DIMS, "embed": fake_embeddings()})
+
+SAMPLE_PASSAGES = [
+    "Songket lepus adalah songket dengan motif benang emas yang menutupi hampir seluruh kain.",
+    "Motif pucuk rebung melambangkan harapan dan kesuburan dalam tradisi Palembang.",
+    "Songket limar dibuat dengan teknik ikat pada benang pakan sebelum ditenun.",
+    "Perawatan songket: simpan dengan digulung, hindari lipatan tajam dan sinar matahari langsung.",
+    "Alat tenun songket tradisional disebut dayan, terdiri dari beberapa bagian kayu.",
+    "Motif tajuk sering dipakai pada acara adat dan pernikahan.",
+]
+
+def kb_documents(count: int = 120) -> List[Document]:
+    doc_types = ["KB_Sejarah_Songket", "KB_Jenis_Songket", "KB_Perawatan_Songket", "KB_Alat_dan_Pembuatan_Songket"]
+    docs = []
+    for i in range(count):
+        text = " ".join(SAMPLE_PASSAGES[(i + j) % len(SAMPLE_PASSAGES)] for j in range(6))
+        docs.append(Document(
+            page_content=text,
+            metadata={"doc_type": doc_types[i % len(doc_types)], "page": i % 20, "source": f"kb_{i}.pdf"},
+        ))
+    return docs
+
+def vector_store(count: int = 120, embeddings=None) -> InMemoryVectorStore:
+    store = InMemoryVectorStore(embedding=embeddings or fake_embeddings())
+    store.add_documents(kb_documents(count))
+    return store
+
+class _SQLiteCursor:
+    """Cursor yang menerjemahkan dialek psycopg2/Postgres yang dipakai tools ke SQLite"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, params=()):
+        return self._cursor.execute(sql.replace("%s", "?").replace("ILIKE", "LIKE"), params)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+class _SQLiteConnection:
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path)
+
+    def cursor(self):
+        return _SQLiteCursor(self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+def sqlite_catalog(umkm_count: int = 20, products_per_umkm: int = 50) -> str:
+    """Buat database SQLite sementara dengan skema UMKM_Profile/Product. Return path."""
+    path = os.path.join(tempfile.mkdtemp(prefix="sribot-bench-"), "catalog.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE UMKM_Profile (
+            umkm_id INTEGER PRIMARY KEY, umkm_name TEXT, umkm_about TEXT, umkm_notelp TEXT,
+            umkm_email TEXT, umkm_alamat TEXT, umkm_sosmed TEXT, umkm_image TEXT
+        );
+        CREATE TABLE Product (
+            product_id INTEGER PRIMARY KEY, umkm_id INTEGER, product_name TEXT, product_desc TEXT,
+            product_price REAL, product_stock INTEGER, product_image TEXT
+        );
+    """)
+    motifs = ["Lepus", "Limar", "Tajuk", "Pucuk Rebung", "Bungo", "Tabur"]
+    product_id = 1
+    for umkm_id in range(1, umkm_count + 1):
+        conn.execute(
+            "INSERT INTO UMKM_Profile VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (umkm_id, f"Songket Palembang {umkm_id}", "Pengrajin songket sejak 1980",
+             "0711-000000", f"umkm{umkm_id}@example.com", "Jl. Ki Gede Ing Suro, Palembang",
+             "@songket", f"umkm_{umkm_id}.jpg"),
+        )
+        for i in range(products_per_umkm):
+            motif = motifs[i % len(motifs)]
+            conn.execute(
+                "INSERT INTO Product VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (product_id, umkm_id, f"Songket {motif} {i}", f"Songket motif {motif} benang emas",
+                 1500000 + i * 1000, i % 7, f"product_{product_id}.jpg"),
+            )
+            product_id += 1
+    conn.commit()
+    conn.close()
+    return path
+
+def sqlite_connection_factory(path: str):
+    """Pengganti database_tools.get_connection"""
+    return lambda: _SQLiteConnection(path)
@@ -0,0 +1,114 @@
+"""
+Skenario ResilientLLM terhadap fake model dengan latency/error yang disuntikkan.
+
+    python -m benchmarks.llm_resilience
+
+Mencetak p50/p95/p99 tanpa dan dengan hedging, lalu memeriksa retry, deadline, dan
+circuit breaker. Keluar dengan exit code 1 jika ada perilaku yang tidak sesuai.
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks import fakes
+from services.resilient_llm import (
+    CallPolicy, CircuitBreaker, CircuitOpenError, LLMDeadlineExceeded, ResilientLLM, request_budget
+)
+
+PROMPT = [HumanMessage(content="halo")]
+
+def _percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50": statistics.median(ordered), "p95": pick(0.95), "p99": pick(0.99)}
+
+async def _latencies(llm, calls=300, concurrency=20):
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await llm.ainvoke(PROMPT)
+            samples.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return _percentiles(samples)
+
+async def scenario_hedging():
+    model = fakes.LatencyInjectingChatModel(fast_ms=5, slow_ms=200, slow_rate=0.05, seed=1)
+    plain = await _latencies(ResilientLLM(model, CallPolicy("bench", hedging=False)))
+    hedged_model = fakes.LatencyInjectingChatModel(fast_ms=5, slow_ms=200, slow_rate=0.05, seed=1)
+    hedged = await _latencies(ResilientLLM(hedged_model, CallPolicy("bench", hedging=True, hedge_delay=0.02)))
+    extra = hedged_model.calls / 300 - 1
+    print(f"tanpa hedging   p50 {plain['p50']:7.1f} ms  p95 {plain['p95']:7.1f} ms  p99 {plain['p99']:7.1f} ms")
+    print(f"dengan hedging  p50 {hedged['p50']:7.1f} ms  p95 {hedged['p95']:7.1f} ms  p99 {hedged['p99']:7.1f} ms"
+          f"  (panggilan tambahan {extra:.0%})")
+    return hedged["p99"] < plain["p99"]
+
+async def scenario_retry():
+    model = fakes.LatencyInjectingChatModel(fast_ms=1, slow_rate=0, error_rate=0.3, seed=2)
+    llm = ResilientLLM(model, CallPolicy("bench", max_retries=5, breaker=CircuitBreaker(threshold=50)))
+    failures = 0
+    for _ in range(100):
+        try:
+            await llm.ainvoke(PROMPT)
+        except ConnectionError:
+            failures += 1
+    print(f"retry: 100 panggilan dengan 30% error transient -> {failures} gagal, {model.calls} attempt")
+    return failures == 0
+
+async def scenario_deadline():
+    model = fakes.LatencyInjectingChatModel(fast_ms=500, slow_rate=0)
+    llm = ResilientLLM(model, CallPolicy("bench", timeout=5, max_retries=0))
+    start = time.perf_counter()
+    try:
+        with request_budget(0.05):
+            await llm.ainvoke(PROMPT)
+    except LLMDeadlineExceeded:
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"deadline: budget 50 ms, dibatalkan setelah {elapsed:.1f} ms")
+        return elapsed < 200
+    print("deadline: panggilan tidak dibatalkan")
+    return False
+
+async def scenario_circuit_breaker():
+    model = fakes.LatencyInjectingChatModel(fast_ms=1, slow_rate=0, error_rate=1.0)
+    llm = ResilientLLM(model, CallPolicy("bench", max_retries=0, breaker=CircuitBreaker(threshold=3, cooldown=0.1)))
+    for _ in range(3):
+        try:
+            await llm.ainvoke(PROMPT)
+        except ConnectionError:
+            pass
+    calls_when_open = model.calls
+    try:
+        await llm.ainvoke(PROMPT)
+        rejected = False
+    except CircuitOpenError:
+        rejected = True
+    await asyncio.sleep(0.12)
+    model.error_rate = 0.0
+    await llm.ainvoke(PROMPT)
+    closed = llm.policy.breaker.state == "closed"
+    print(f"circuit breaker: ditolak saat terbuka={rejected}, tanpa panggilan ke provider={model.calls == calls_when_open + 1}, "
+          f"tertutup lagi setelah cooldown={closed}")
+    return rejected and closed and model.calls == calls_when_open + 1
+
+async def main():
+    results = {
+        "hedging": await scenario_hedging(),
+        "retry": await scenario_retry(),
+        "deadline": await scenario_deadline(),
+        "circuit_breaker": await scenario_circuit_breaker(),
+    }
+    failed = [name for name, ok in results.items() if not ok]
+    if failed:
+        print(f"\nGagal: {', '.join(failed)}")
+        sys.exit(1)
+    print("\nSemua skenario sesuai.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
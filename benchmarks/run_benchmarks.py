@@ -0,0 +1,237 @@
+"""
+Benchmark komponen hot path SriBot tanpa akses jaringan.
+
+    python -m benchmarks.run_benchmarks                      # jalankan, simpan ke benchmarks/results/latest.json
+    python -m benchmarks.run_benchmarks --save-baseline      # simpan juga sebagai baseline
+    python -m benchmarks.run_benchmarks --compare benchmarks/baselines/baseline.json
+
+--compare keluar dengan exit code 1 jika ada benchmark yang melambat melebihi --threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+# Semua layanan eksternal diganti stand-in lokal; key dummy hanya agar client bisa dibuat
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+os.environ.setdefault("PORT", "8000")
+os.environ["ANSWER_CACHE_ENABLED"] = "false"
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+import LangGraph
+from benchmarks import fakes
+from tools import database_tools, memory_tool, rag_tools
+from tools.bm25_index import BM25Index
+from services import embedding_service
+
+# LangGraph.py menyalakan tracing LangSmith saat import
+os.environ["LANGCHAIN_TRACING_V2"] = "false"
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+# Selisih absolut di bawah ini dianggap noise dan tidak dihitung regresi
+NOISE_FLOOR_MS = 0.05
+
+def _summarize(samples_ms):
+    samples_ms = sorted(samples_ms)
+    p95_index = max(0, int(round(0.95 * len(samples_ms))) - 1)
+    return {
+        "iterations": len(samples_ms),
+        "mean_ms": statistics.fmean(samples_ms),
+        "median_ms": statistics.median(samples_ms),
+        "p95_ms": samples_ms[p95_index],
+        "min_ms": samples_ms[0],
+    }
+
+def bench(func, iterations, warmup=3):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return _summarize(samples)
+
+def abench(coro_factory, iterations, warmup=3):
+    async def run():
+        for _ in range(warmup):
+            await coro_factory()
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await coro_factory()
+            samples.append((time.perf_counter() - start) * 1000)
+        return samples
+    return _summarize(asyncio.run(run()))
+
+def install_stand_ins():
+    """Pasang stand-in lokal ke modul tools"""
+    memory_tool.set_redis_store(fakes.memory_store())
+    memory_tool.set_memory_llm(fakes.ScriptedChatModel(script=[AIMessage(content="NONE")]))
+    embedding_service.set_embeddings(fakes.fake_embeddings(), persistent=False)
+    rag_tools.set_vectorstore(fakes.vector_store(embeddings=embedding_service.get_embeddings()))
+    rag_tools.set_bm25_index(BM25Index(fakes.kb_documents()))
+    database_tools.get_connection = fakes.sqlite_connection_factory(fakes.sqlite_catalog())
+
+def bench_react_graph(iterations):
+    graph = LangGraph.build_graph(
+        model=fakes.ScriptedChatModel(script=fakes.react_turn_script()),
+        checkpointer=MemorySaver(),
+    )
+
+    async def one_turn():
+        config = {"configurable": {"thread_id": uuid.uuid4().hex, "user_id": "bench-user"}}
+        await graph.ainvoke(
+            {"messages": [HumanMessage(content="Nama saya Widya, ceritakan sejarah songket lepus")]},
+            config=config,
+        )
+
+    return abench(one_turn, iterations)
+
+def _large_history(turns):
+    products = {
+        "status": "success",
+        "data": [
+            {"product_id": i, "product_name": f"Songket Lepus {i}", "product_price": 1500000.0,
+             "product_image": f"http://localhost:8000/uploads/product_{i}.jpg"}
+            for i in range(20)
+        ],
+        "count": 20,
+    }
+    messages = []
+    for t in range(turns):
+        messages.append(HumanMessage(content=f"Produk songket lepus apa saja? ({t})"))
+        messages.append(AIMessage(content="", tool_calls=[
+            {"name": "search_product_by_name", "args": {"product_name": "lepus"}, "id": f"c{t}"}
+        ]))
+        messages.append(ToolMessage(
+            content=json.dumps(products), artifact=products, name="search_product_by_name", tool_call_id=f"c{t}"
+        ))
+        messages.append(ToolMessage(
+            content="**Pencarian Dokumen Berhasil** lihat http://localhost:8000/uploads/x.jpg",
+            name="search_documents", tool_call_id=f"d{t}",
+        ))
+        messages.append(AIMessage(content="Berikut produk songket lepus ... -SriBot"))
+    return messages
+
+def bench_chat_response(iterations):
+    import app
+    messages = _large_history(200)
+    return bench(lambda: app.build_chat_response(messages), iterations)
+
+REGEX_MESSAGES = [
+    "Halo, nama saya Widya dan saya tinggal di Palembang",
+    "Saya suka motif pucuk rebung, warna favorit saya emas",
+    "Budget saya sekitar 2 juta untuk acara pernikahan",
+    "Apa saja jenis songket yang ada?",
+    "Ukuran saya XL, saya suka kebaya modern",
+    "Bagaimana cara merawat songket agar tidak rusak?",
+] * 10
+
+def bench_analyze_regex(iterations):
+    return bench(lambda: [memory_tool.extract_rule_based_info(m) for m in REGEX_MESSAGES], iterations)
+
+def bench_search_documents(iterations):
+    docs = fakes.kb_documents(10)
+    return bench(lambda: rag_tools._format_results("sejarah songket lepus", docs, 10), iterations)
+
+def bench_search_documents_tool(iterations):
+    return bench(lambda: rag_tools.search_documents("sejarah songket lepus", top_k=10), iterations)
+
+def bench_db_row_mapping(iterations):
+    return bench(lambda: (
+        database_tools.get_products_by_umkm(1),
+        database_tools.search_product_by_name("lepus"),
+        database_tools.get_umkm_by_id(1),
+    ), iterations)
+
+BENCHMARKS = {
+    "react_graph_turn": (bench_react_graph, 50),
+    "chat_response_200_turns": (bench_chat_response, 50),
+    "analyze_and_save_info_regex": (bench_analyze_regex, 200),
+    "search_documents_format": (bench_search_documents, 500),
+    "search_documents_tool": (bench_search_documents_tool, 100),
+    "db_tools_sqlite_row_mapping": (bench_db_row_mapping, 100),
+}
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+def run(selected=None):
+    install_stand_ins()
+    results = {}
+    for name, (func, iterations) in BENCHMARKS.items():
+        if selected and name not in selected:
+            continue
+        results[name] = func(iterations)
+        print(f"{name:40s} median {results[name]['median_ms']:9.3f} ms   p95 {results[name]['p95_ms']:9.3f} ms")
+    return {
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "benchmarks": results,
+    }
+
+def compare(current, baseline, threshold):
+    """Return daftar benchmark yang median-nya melambat melebihi threshold"""
+    regressions = []
+    for name, stats in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if not base:
+            continue
+        ratio = stats["median_ms"] / base["median_ms"] if base["median_ms"] else 1.0
+        slower = stats["median_ms"] - base["median_ms"] > NOISE_FLOOR_MS
+        status = "REGRESI" if ratio > 1 + threshold and slower else "ok"
+        print(f"{name:40s} {base['median_ms']:9.3f} -> {stats['median_ms']:9.3f} ms  ({ratio:5.2f}x)  {status}")
+        if status != "ok":
+            regressions.append(name)
+    return regressions
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+    print(f"Hasil disimpan ke {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline komponen SriBot")
+    parser.add_argument("--only", nargs="*", help="Nama benchmark yang dijalankan")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "latest.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="Simpan hasil sebagai baseline")
+    parser.add_argument("--baseline", default=os.path.join(BASELINES_DIR, "baseline.json"))
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="Bandingkan dengan baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Batas perlambatan relatif (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    current = run(args.only)
+    _write_json(args.output, current)
+    if args.save_baseline:
+        _write_json(args.baseline, current)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nDibandingkan dengan baseline commit {baseline.get('commit')}:")
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegresi terdeteksi: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nTidak ada regresi.")
+
+if __name__ == "__main__":
+    main()
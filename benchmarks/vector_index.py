@@ -0,0 +1,129 @@
+"""
+Trade-off recall vs latency vs memori Redis untuk konfigurasi index vector_db.
+
+    python -m benchmarks.vector_index                         # butuh REDIS_URL (Redis Stack / Redis 8)
+    python -m benchmarks.vector_index --n 20000 --dim 768 --k 5
+
+Setiap konfigurasi (FLAT/HNSW x float32/float16, plus variasi M / EF_CONSTRUCTION /
+EF_RUNTIME) dibuat sebagai index sementara "bench_vec_*" dengan skema dari
+services/index_schema.py, diisi vektor acak yang sama, lalu diukur terhadap ground truth
+KNN exact (numpy). Index dihapus setelah diukur.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+import uuid
+
+import numpy as np
+from redis import Redis
+from redisvl.index import SearchIndex
+from redisvl.redis.utils import array_to_buffer
+
+from services.index_schema import EMBEDDING_FIELD, VECTOR_DIM, build_search_query, vector_index_schema
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+
+# (label, atribut field vektor, ef_runtime per query)
+CONFIGS = [
+    ("flat/float32", {"algorithm": "flat", "datatype": "float32"}, None),
+    ("flat/float16", {"algorithm": "flat", "datatype": "float16"}, None),
+    ("hnsw/float32 m16 efc200", {"algorithm": "hnsw", "datatype": "float32", "m": 16, "ef_construction": 200}, 10),
+    ("hnsw/float16 m16 efc200", {"algorithm": "hnsw", "datatype": "float16", "m": 16, "ef_construction": 200}, 10),
+    ("hnsw/float16 m16 efc200 ef50", {"algorithm": "hnsw", "datatype": "float16", "m": 16, "ef_construction": 200}, 50),
+    ("hnsw/float16 m32 efc400 ef100", {"algorithm": "hnsw", "datatype": "float16", "m": 32, "ef_construction": 400}, 100),
+    ("hnsw/float16 m8 efc100", {"algorithm": "hnsw", "datatype": "float16", "m": 8, "ef_construction": 100}, 10),
+]
+
+def _normalized(rng, n, dim):
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def _ground_truth(corpus, queries, k):
+    """KNN exact cosine (vektor sudah dinormalisasi, jadi cukup dot product)"""
+    scores = queries @ corpus.T
+    return [set(np.argsort(-row)[:k].tolist()) for row in scores]
+
+def _load(index, corpus, datatype, batch=1000):
+    prefix = index.schema.index.prefix
+    for start in range(0, len(corpus), batch):
+        rows = range(start, min(start + batch, len(corpus)))
+        records = [{"id": str(i), "text": "", EMBEDDING_FIELD: array_to_buffer(corpus[i].tolist(), dtype=datatype)}
+                   for i in rows]
+        index.load(records, keys=[f"{prefix}:{i}" for i in rows])
+
+def _wait_indexed(client, name, timeout=600):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = client.ft(name).info()
+        if float(info.get("percent_indexed", 1)) >= 1 and not int(info.get("indexing", 0)):
+            return info
+        time.sleep(0.2)
+    raise TimeoutError(f"index {name} belum selesai di-index")
+
+def _memory_mb(info):
+    """Memori index vektor + data hash yang di-index"""
+    return float(info.get("vector_index_sz_mb", 0)) + float(info.get("doc_table_size_mb", 0))
+
+def run_config(client, label, attrs, ef_runtime, corpus, queries, truth, k):
+    name = f"bench_vec_{uuid.uuid4().hex[:8]}"
+    index = SearchIndex(vector_index_schema(name, dim=corpus.shape[1], **attrs), redis_client=client)
+    index.create(overwrite=True, drop=True)
+    try:
+        started = time.perf_counter()
+        _load(index, corpus, attrs["datatype"])
+        info = _wait_indexed(client, name)
+        build_seconds = time.perf_counter() - started
+
+        latencies = []
+        hits = 0
+        for vector, expected in zip(queries, truth):
+            query = build_search_query(vector.tolist(), k, ef_runtime=ef_runtime, datatype=attrs["datatype"])
+            start = time.perf_counter()
+            results = index.query(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found = {int(r["id"].rsplit(":", 1)[-1]) for r in results}
+            hits += len(found & expected)
+        ordered = sorted(latencies)
+        return {
+            "config": label,
+            "recall": hits / (len(queries) * k),
+            "p50_ms": statistics.median(ordered),
+            "p95_ms": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+            "memory_mb": _memory_mb(info),
+            "build_s": build_seconds,
+        }
+    finally:
+        index.delete(drop=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=10000, help="jumlah vektor corpus")
+    parser.add_argument("--dim", type=int, default=VECTOR_DIM)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="simpan hasil sebagai JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    corpus = _normalized(rng, args.n, args.dim)
+    queries = _normalized(rng, args.queries, args.dim)
+    truth = _ground_truth(corpus, queries, args.k)
+
+    client = Redis.from_url(REDIS_URL)
+    print(f"n={args.n} dim={args.dim} queries={args.queries} k={args.k}")
+    print(f"{'konfigurasi':<32} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8} {'memori MB':>10} {'build s':>8}")
+    results = []
+    for label, attrs, ef_runtime in CONFIGS:
+        row = run_config(client, label, attrs, ef_runtime, corpus, queries, truth, args.k)
+        results.append(row)
+        print(f"{row['config']:<32} {row['recall']:>9.3f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+              f"{row['memory_mb']:>10.2f} {row['build_s']:>8.1f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
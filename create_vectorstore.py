@@ -1,140 +1,136 @@
-# import asyncio
+import argparse
+import asyncio
 import os
-import glob
+import time
 from dotenv import load_dotenv
 from langchain.text_splitter import CharacterTextSplitter
 # from langchain_openai import OpenAIEmbeddings
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 # from langchain_chroma import Chroma
-from langchain_community.document_loaders import PyPDFLoader
 from langchain_redis import RedisVectorStore
 import redis
+from services.answer_cache import invalidate_answer_cache
+from services.embedding_service import get_embeddings
+from services.index_schema import redis_config, schema_mismatches
+from services.ingest_manifest import IngestCheckpoint, IngestManifest, PageCache
+from services.ingest_pipeline import (
+    KB_ROOT, IngestPipeline, StageStats, discover_pdfs, doc_type_for, iter_file_chunks, iter_parsed_files,
+    throughput_report
+)
+from tools.bm25_index import BM25Index
+from tools.rag_tools import load_bm25_index, save_bm25_index
 
 load_dotenv()
 # OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 REDIS_URL=os.getenv("REDIS_URL")
 r = redis.from_url(REDIS_URL)
 
-INDEX_CONFIG = {
-    "embedding": {
-        "dimension": 1536,              
-        "distance_metric": "cosine"
-    }
-}
+def open_vectorstore(db_name):
+    """RedisVectorStore untuk index db_name (index dibuat jika belum ada)"""
+    # Lewat embedding service: chunk yang sudah pernah di-embed diambil dari cache Redis
+    # Skema (dimensi, datatype, FLAT/HNSW) dari services/index_schema.py, sama dengan yang dipakai search
+    return RedisVectorStore(embeddings=get_embeddings(), config=redis_config(db_name))
 
-def add_metadata(doc, doc_type):
-    """Add metadata to document"""
-    doc.metadata["doc_type"] = doc_type
-    return doc
-
-def load_and_chunk_documents():
-    """Load PDF documents and split them into chunks"""
-    print("Scanning for PDF files...")
-    pdf_files = glob.glob("**/*.pdf", recursive=True)
-    print(f"Found PDF files: {pdf_files}")
+def index_exists(db_name) -> bool:
+    try:
+        r.execute_command("FT.INFO", db_name)
+        return True
+    except redis.exceptions.ResponseError:
+        return False
 
-    documents = []
-    for pdf_file in pdf_files:
-        print(f"Loading: {pdf_file}")
-        file_name = os.path.basename(pdf_file)
-        doc_type = file_name.replace('.pdf', '').replace('.PDF', '')
-        
-        try:
-            # Load PDF directly
-            loader = PyPDFLoader(pdf_file)
-            pdf_docs = loader.load()
-            
-            # Add metadata to each page
-            docs_with_metadata = [add_metadata(doc, doc_type) for doc in pdf_docs]
-            documents.extend(docs_with_metadata)
-            print(f"Loaded {len(pdf_docs)} pages")
-        except Exception as e:
-            print(f"Error loading {pdf_file}: {e}")
+def reset_vectorstore(db_name, manifest: IngestManifest, checkpoint: IngestCheckpoint):
+    """Rebuild penuh: hapus index lama beserta dokumennya, manifest, dan checkpoint"""
+    if index_exists(db_name):
+        print(f"Deleting existing vectorstore: {db_name}")
+        # delete all indexes and documents
+        r.execute_command("FT.DROPINDEX", db_name, "DD")
+    else:
+        print(f"Tidak ada vectorstore bernama: {db_name}")
+    manifest.clear()
+    checkpoint.clear()
 
-    print(f"\n Total documents loaded: {len(documents)}")
-    
-    if not documents:
-        print("No documents were loaded!")
-        print(f"Current directory: {os.getcwd()}")
+def kept_bm25_chunks(paths) -> list:
+    """Chunk BM25 lama milik file yang gagal di-parse, agar dokumennya tetap ada di index lexical"""
+    if not paths:
         return []
+    index = load_bm25_index(r)
+    if index is None:
+        return []
+    doc_types = {doc_type_for(path) for path in paths}
+    return [doc for doc in index.documents if doc.metadata.get("doc_type") in doc_types]
 
-    # Split documents into chunks
-    print("Splitting documents into chunks...")
-    text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = text_splitter.split_documents(documents)
-    print(f"Total number of chunks: {len(chunks)}")
-    print(f"Document types found: {set(doc.metadata['doc_type'] for doc in documents)}")
-    return chunks
+def finalize(chunks):
+    """Index BM25 dibangun ulang dari semua chunk, dan answer cache di-invalidate"""
+    # Index lexical untuk hybrid search, dibangun dari chunk yang sama
+    save_bm25_index(r, BM25Index(chunks))
+    print(f"BM25 index ({len(chunks)} chunks) disimpan")
+    # Jawaban yang di-cache berasal dari isi vector_db lama
+    invalidate_answer_cache(r)
 
-def create_vectorstore(chunks, db_name):
-    """Create and save vectorstore from chunks"""
-    print("Creating embeddings and vectorstore...")
-    # Initialize embeddings
-    # embeddings = OpenAIEmbeddings()
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001")
-    # Delete existing collection if exists
-    if os.path.exists(db_name):
-        print(f"Deleting existing vectorstore: {db_name}")
-        # Chroma(persist_directory=db_name, embedding_function=embeddings).delete_collection()
-        
-    # Create new vectorstore
-    # vectorstore = Chroma.from_documents(
-    #     documents=chunks, 
-    #     embedding=embeddings, 
-    #     persist_directory=db_name
-    # )
+async def ingest(kb_root: str, db_name: str, full: bool = False):
+    """
+    Pipeline ingestion: parsing PDF paralel (process pool) -> chunking streaming ->
+    embedding batch (rate limited) -> tulis ke Redis. Hanya chunk baru/berubah yang
+    di-embed; run yang crash dilanjutkan dari checkpoint saat dijalankan ulang.
+    """
+    page_cache = PageCache()
+    manifest = IngestManifest(r, db_name)
+    checkpoint = IngestCheckpoint(r, db_name)
 
-    # collection = vectorstore._collection
-    # count = collection.count()
-    # sample_embedding = collection.get(limit=1, include=["embeddings"])["embeddings"][0]
-    # dimensions = len(sample_embedding)
-    # print(f"Vectorstore created successfully!")
-    # print(f"{count:,} vectors with {dimensions:,} dimensions stored in '{db_name}'")
-    # return vectorstore
+    print(f"Scanning for PDF files in {kb_root}...")
+    pdf_files = discover_pdfs(kb_root)
+    print(f"Found PDF files: {pdf_files}")
+    if not pdf_files:
+        print("No documents were loaded!")
+        return
 
-    try:
-        r.execute_command("FT.INFO", db_name)
-        print(f"Deleting existing vectorstore: {db_name}")
-        # delete all indexes and documents
-        r.execute_command("FT.DROPINDEX", db_name, "DD")
-    except redis.exceptions.ResponseError:
-        print(f"Tidak ada vectorstore bernama: {db_name}")
+    # Index lama tanpa manifest (dibuat sebelum ingestion incremental) tidak bisa di-diff;
+    # manifest kosong tapi ada checkpoint berarti rebuild penuh sebelumnya terputus
+    # Index dengan skema vektor lama (dimensi/datatype/algoritma) harus dibangun ulang penuh
+    mismatches = schema_mismatches(r, db_name)
+    if mismatches:
+        print(f"Skema index berubah ({'; '.join(mismatches)}), rebuild penuh")
+    if full or mismatches or not index_exists(db_name) or not (manifest.exists() or checkpoint.load()):
+        if full:
+            page_cache.clear()
+        reset_vectorstore(db_name, manifest, checkpoint)
+        previous = {}
+    else:
+        previous = manifest.load()
 
-    print("Creating new vectorstore...")
-    # Create new vectorstore (redis)
-    vectorstore = RedisVectorStore(
-        embeddings=embeddings,
-        index_name=db_name,
-        redis_url=REDIS_URL,
-        index_config=INDEX_CONFIG
+    failed = set()
+    parse_stats = StageStats("parse", "pages")
+    chunk_stats = StageStats("chunk", "chunks")
+    text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    pipeline = IngestPipeline(open_vectorstore(db_name), manifest, checkpoint)
+    started = time.perf_counter()
+    chunks = await pipeline.run(
+        iter_file_chunks(iter_parsed_files(pdf_files, page_cache, parse_stats, failed), text_splitter, chunk_stats),
+        previous,
+        failed,
     )
-
-    vectorstore.add_documents(chunks)
-    # sample_embedding = vectorstore._collection.get(limit=1, include=["embeddings"])["embeddings"][0]
-    # dimensions = len(sample_embedding) 
-    # res = r.execute_command("FT.SEARCH", db_name, "*", "RETURN", "2", "content", "embedding", "LIMIT", "0", "1")
-    # #print(res)  
-    # sample_embedding = embeddings.embed_query("contoh teks")
-    # print(len(sample_embedding))
-    # print(sample_embedding[:10])
-    # dimensions = len(sample_embedding)
-    print(f"Vectorstore created successfully!")
-    # print(f"vectors with {dimensions:,} dimensions stored in Redis under index '{db_name}'")
-    return vectorstore
+    counts = pipeline.counts
+    print(
+        f"\n{counts['new_files']} file baru, {counts['changed_files']} berubah, {counts['removed_files']} dihapus, "
+        f"{counts['unchanged_files']} tetap; {counts['added']} chunk di-embed, {counts['resumed']} dari checkpoint, "
+        f"{counts['deleted']} chunk dihapus ({time.perf_counter() - started:.1f} s)"
+    )
+    if failed:
+        print(f"{counts['failed_files']} file gagal di-parse, isi index lamanya dipertahankan: {sorted(failed)}")
+    print(throughput_report([parse_stats, chunk_stats, pipeline.embed_stats, pipeline.write_stats]))
+    if not pipeline.changed:
+        print("Tidak ada perubahan.")
+        return
+    finalize(chunks + kept_bm25_chunks(failed & previous.keys()))
+    print(f"Process completed! Vectorstore saved to '{db_name}'")
 
 def main():
-    """Main function to create vectorstore"""
+    """Main function to create or update the vectorstore"""
+    parser = argparse.ArgumentParser(description="Index knowledge base PDF ke Redis (vector_db)")
+    parser.add_argument("--full", action="store_true", help="Rebuild penuh: drop index, parse dan embed ulang semua file")
+    parser.add_argument("--kb-root", default=KB_ROOT, help=f"Folder PDF knowledge base (default: {KB_ROOT})")
+    args = parser.parse_args()
     print("Starting vectorstore creation process...")
-    
-    chunks = load_and_chunk_documents()
-    
-    if not chunks:
-        print("No chunks created. Exiting...")
-        return
-    # Create vectorstore
-    db_name = "vector_db"
-    vectorstore = create_vectorstore(chunks, db_name)
-    print(f"Process completed! Vectorstore saved to '{db_name}'")
+    asyncio.run(ingest(args.kb_root, "vector_db", full=args.full))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,6 +1,15 @@
+from typing import Literal, Optional
 from pydantic import BaseModel, Field
 
+# Nama dokumen knowledge base (nama file PDF di knowledgebase/KB tanpa .pdf)
+KnowledgeBaseDocType = Literal[
+    "KB_Sejarah_Songket", "KB_Jenis_Songket", "KB_Perawatan_Songket", "KB_Alat_dan_Pembuatan_Songket"
+]
+
 class DocumentSearchArgs(BaseModel):
     """Input untuk tool document search."""
     query: str = Field(description="Query atau pertanyaan untuk mencari dalam dokumen")
     top_k: int = Field(default=5, description="Jumlah hasil pencarian yang dikembalikan (1-10)", ge=1, le=10)
+    doc_type: Optional[KnowledgeBaseDocType] = Field(
+        default=None, description="Batasi pencarian ke satu dokumen knowledge base; kosongkan untuk semua dokumen"
+    )
@@ -0,0 +1,7 @@
+from langgraph.graph import MessagesState
+
+class ChatState(MessagesState):
+    """State graph SriBot: messages + ringkasan percakapan lama + konteks user + waktu mulai turn"""
+    summary: str
+    user_context: str
+    turn_started_at: float
@@ -0,0 +1,119 @@
+import logging
+import os
+from typing import List
+from langchain_core.messages import (
+    AIMessage, BaseMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+)
+from models.state_models import ChatState
+
+logger = logging.getLogger(__name__)
+
+# Sliding window: jika history melewati HISTORY_MAX_TURNS atau HISTORY_TOKEN_BUDGET,
+# turn lama dilipat ke ringkasan sampai tersisa HISTORY_KEEP_TURNS turn terakhir
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "4000"))
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "8"))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "4"))
+HISTORY_SUMMARY_MAX_WORDS = int(os.getenv("HISTORY_SUMMARY_MAX_WORDS", "200"))
+
+# Potongan isi message saat dikirim ke summarizer
+_SUMMARY_SNIPPET_CHARS = 600
+
+SUMMARY_SYSTEM_PROMPT = (
+    "Anda meringkas percakapan antara user dan SriBot (asisten songket Palembang). "
+    "Pertahankan fakta penting: preferensi user, UMKM/produk yang dibahas beserta ID-nya, "
+    "dan pertanyaan yang belum terjawab. Tulis dalam Bahasa Indonesia, ringkas, "
+    f"maksimal {HISTORY_SUMMARY_MAX_WORDS} kata."
+)
+
+def _message_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return " ".join(
+        part if isinstance(part, str) else str(part.get("text", ""))
+        for part in content
+    )
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    """Estimasi kasar jumlah token (~4 karakter per token) tanpa panggilan API"""
+    total = 0
+    for m in messages:
+        total += len(_message_text(m)) // 4 + 4
+        for call in getattr(m, "tool_calls", None) or []:
+            total += len(str(call.get("args", ""))) // 4
+    return total
+
+def split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Pisahkan history per turn; setiap turn diawali HumanMessage"""
+    turns: List[List[BaseMessage]] = []
+    for m in messages:
+        if isinstance(m, HumanMessage) or not turns:
+            turns.append([m])
+        else:
+            turns[-1].append(m)
+    return turns
+
+def _render_for_summary(messages: List[BaseMessage]) -> str:
+    lines = []
+    for m in messages:
+        text = _message_text(m).strip()
+        if len(text) > _SUMMARY_SNIPPET_CHARS:
+            text = text[:_SUMMARY_SNIPPET_CHARS] + "..."
+        if isinstance(m, HumanMessage):
+            lines.append(f"User: {text}")
+        elif isinstance(m, ToolMessage):
+            lines.append(f"Tool ({m.name}): {text}")
+        elif isinstance(m, AIMessage):
+            if text:
+                lines.append(f"SriBot: {text}")
+            for call in m.tool_calls:
+                lines.append(f"SriBot memanggil {call['name']}({call['args']})")
+    return "\n".join(lines)
+
+def select_messages_to_fold(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """
+    Tentukan message lama yang perlu dilipat ke ringkasan.
+    Pemotongan selalu di batas turn agar pasangan tool call / ToolMessage tetap utuh.
+    """
+    turns = split_turns(messages)
+    if len(turns) <= HISTORY_MAX_TURNS and estimate_tokens(messages) <= HISTORY_TOKEN_BUDGET:
+        return []
+
+    keep = turns[-HISTORY_KEEP_TURNS:] if HISTORY_KEEP_TURNS > 0 else turns[-1:]
+    # Perkecil window sampai muat di budget (turn aktif selalu dipertahankan)
+    while len(keep) > 1 and estimate_tokens([m for t in keep for m in t]) > HISTORY_TOKEN_BUDGET:
+        keep = keep[1:]
+
+    fold_count = len(turns) - len(keep)
+    return [m for t in turns[:fold_count] for m in t]
+
+def create_history_manager(summarizer):
+    """Buat node graph yang menjaga history tetap dalam budget token"""
+
+    async def manage_history(state: ChatState):
+        to_fold = select_messages_to_fold(state["messages"])
+        if not to_fold:
+            return {}
+
+        previous = state.get("summary", "")
+        prompt = ""
+        if previous:
+            prompt += f"Ringkasan sebelumnya:\n{previous}\n\n"
+        prompt += f"Percakapan lanjutan yang perlu digabung ke ringkasan:\n{_render_for_summary(to_fold)}"
+
+        try:
+            response = await summarizer.ainvoke([
+                SystemMessage(content=SUMMARY_SYSTEM_PROMPT),
+                HumanMessage(content=prompt),
+            ])
+        except Exception as e:
+            # Gagal meringkas bukan alasan untuk menggagalkan request; coba lagi di turn berikutnya
+            logger.warning(f"Gagal meringkas history: {e}")
+            return {}
+
+        return {
+            "summary": _message_text(response).strip(),
+            "messages": [RemoveMessage(id=m.id) for m in to_fold],
+        }
+
+    return manage_history
@@ -0,0 +1,109 @@
+import json
+import os
+import time
+from typing import List, Optional
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph.graph import END
+from models.state_models import ChatState
+from services.metrics import LOOP_BUDGET_EXHAUSTED
+
+# Budget ReAct loop per turn; jika salah satu habis, graph memaksa jawaban final
+LOOP_MAX_TOOL_CALLS = int(os.getenv("LOOP_MAX_TOOL_CALLS", "8"))
+# Tool call identik (nama + argumen sama) yang boleh diulang dalam satu turn
+LOOP_MAX_REPEATED_CALLS = int(os.getenv("LOOP_MAX_REPEATED_CALLS", "1"))
+LOOP_MAX_TOKENS = int(os.getenv("LOOP_MAX_TOKENS", "30000"))
+LOOP_MAX_SECONDS = float(os.getenv("LOOP_MAX_SECONDS", "25"))
+
+FORCED_ANSWER_INSTRUCTION = (
+    "Batas pemanggilan tool untuk pertanyaan ini sudah tercapai. Jangan memanggil tool lagi. "
+    "Jawab pertanyaan user sekarang hanya dengan informasi yang sudah didapat di atas; "
+    "jika informasinya belum cukup, sampaikan dengan jujur apa yang belum bisa dijawab."
+)
+
+FALLBACK_ANSWER = (
+    "Mohon maaf, saya belum bisa menemukan jawaban lengkap untuk pertanyaan ini. "
+    "Silakan coba dengan pertanyaan yang lebih spesifik. -SriBot"
+)
+
+def _current_turn(messages: List[BaseMessage]) -> List[BaseMessage]:
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return messages[i:]
+    return messages
+
+def _call_signature(call: dict) -> str:
+    return call["name"] + ":" + json.dumps(call.get("args", {}), sort_keys=True, default=str)
+
+def exhausted_budget(state: ChatState, now: Optional[float] = None) -> Optional[str]:
+    """Return alasan budget habis untuk tool call yang sedang diminta, atau None"""
+    turn = _current_turn(state["messages"])
+    pending = turn[-1].tool_calls
+    previous_calls = [call for m in turn[:-1] if isinstance(m, AIMessage) for call in m.tool_calls]
+
+    if len(previous_calls) + len(pending) > LOOP_MAX_TOOL_CALLS:
+        return "tool_calls"
+
+    seen = {}
+    for call in previous_calls:
+        signature = _call_signature(call)
+        seen[signature] = seen.get(signature, 0) + 1
+    for call in pending:
+        signature = _call_signature(call)
+        if seen.get(signature, 0) > LOOP_MAX_REPEATED_CALLS:
+            return "repeated_calls"
+        seen[signature] = seen.get(signature, 0) + 1
+
+    tokens = sum(
+        (m.usage_metadata or {}).get("total_tokens", 0)
+        for m in turn if isinstance(m, AIMessage) and m.usage_metadata
+    )
+    if tokens > LOOP_MAX_TOKENS:
+        return "tokens"
+
+    started = state.get("turn_started_at")
+    if started and (now or time.time()) - started > LOOP_MAX_SECONDS:
+        return "wall_time"
+    return None
+
+def route_after_assistant(state: ChatState) -> str:
+    """Pengganti tools_condition: jalankan tool selama budget masih ada"""
+    last_message = state["messages"][-1]
+    if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
+        return END
+    reason = exhausted_budget(state)
+    if reason is None:
+        return "tools"
+    LOOP_BUDGET_EXHAUSTED.labels(reason=reason).inc()
+    return "force_final_answer"
+
+def create_final_answer_node(model, build_system_message):
+    """
+    Node yang dipakai saat budget habis: tool call yang tertunda dijawab dengan ToolMessage
+    pembatalan (agar history tetap valid), lalu model menjawab tanpa tool.
+    """
+
+    async def force_final_answer(state: ChatState):
+        pending = state["messages"][-1].tool_calls
+        cancelled = [
+            ToolMessage(
+                content="Tidak dijalankan: batas pemanggilan tool untuk pertanyaan ini sudah tercapai.",
+                name=call["name"],
+                tool_call_id=call["id"],
+                status="error",
+            )
+            for call in pending
+        ]
+        system_message = SystemMessage(
+            content=build_system_message(state).content + f"\n---INSTRUKSI---\n{FORCED_ANSWER_INSTRUCTION}\n"
+        )
+        response = await model.ainvoke(
+            [system_message] + state["messages"] + cancelled, config={"tags": ["role:final_answer"]}
+        )
+        if response.tool_calls:
+            # Model tetap meminta tool: pakai teksnya saja agar turn selesai tanpa tool call tertunda
+            response = AIMessage(
+                content=response.content or FALLBACK_ANSWER, usage_metadata=response.usage_metadata
+            )
+        return {"messages": cancelled + [response]}
+
+    return force_final_answer
@@ -0,0 +1,213 @@
+import logging
+import os
+import re
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.graph import END
+from models.state_models import ChatState
+from tools.database_tools import aget_umkm_by_id, aget_products_by_umkm, asearch_product_by_name
+from tools.thread_pool import run_blocking
+from services.metrics import ROUTER_REQUESTS
+from tools.rendering import render_tool_result
+
+logger = logging.getLogger(__name__)
+
+# Classifier lokal opsional (sentence-transformers) untuk pesan yang tidak cocok pola
+ROUTER_CLASSIFIER_MODEL = os.getenv("ROUTER_CLASSIFIER_MODEL", "")
+ROUTER_CLASSIFIER_THRESHOLD = float(os.getenv("ROUTER_CLASSIFIER_THRESHOLD", "0.6"))
+
+_ID = r"(?:id\s*|nomor\s*|no\.?\s*|#)?(\d+)"
+_PREFIX = r"(?:tolong\s+|coba\s+|bisa\s+)?(?:tampilkan\s+|lihat\s+|cari\s+|kasih\s+)?"
+_SUFFIX = r"(?:\s+(?:dong|ya|kak|min))?\s*[?.!]*"
+
+# Hanya pesan yang SELURUHNYA berupa query katalog yang di-fast-path (fullmatch),
+# sehingga pesan yang juga berisi info personal tetap lewat ReAct loop
+INTENT_PATTERNS = [
+    ("get_products_by_umkm", re.compile(
+        _PREFIX + r"(?:semua\s+|daftar\s+)?produk\s+(?:apa\s+saja\s+)?(?:dari\s+|milik\s+)?umkm\s+" + _ID + _SUFFIX)),
+    ("get_umkm_by_id", re.compile(
+        _PREFIX + r"(?:detail|info|informasi|profil)\s+(?:dari\s+)?umkm\s+" + _ID + _SUFFIX)),
+    ("search_product_by_name", re.compile(
+        _PREFIX + r"harga\s+(?:produk\s+)?(songket\s+[a-z][a-z\s]*?)" + _SUFFIX)),
+]
+
+# Contoh kalimat per intent untuk classifier lokal (hanya intent berbasis ID)
+INTENT_EXAMPLES = {
+    "get_umkm_by_id": [
+        "detail umkm nomor 3",
+        "informasi lengkap tentang umkm 5",
+        "alamat dan kontak umkm 2",
+    ],
+    "get_products_by_umkm": [
+        "produk dari umkm 2",
+        "apa saja yang dijual umkm 4",
+        "daftar barang umkm nomor 1",
+    ],
+}
+
+ROUTER_STATS = Counter()
+
+_classifier = None
+_intent_embeddings = None
+
+def get_router_stats() -> Dict[str, Any]:
+    """Counter fast-path router: berapa banyak pesan yang tidak perlu LLM"""
+    total = ROUTER_STATS["total"]
+    hits = ROUTER_STATS["fast_path"]
+    return {
+        "total": total,
+        "fast_path": hits,
+        "fallback": ROUTER_STATS["fallback"],
+        "hit_rate": hits / total if total else 0.0,
+        "by_intent": {k[len("intent:"):]: v for k, v in ROUTER_STATS.items() if k.startswith("intent:")},
+    }
+
+def _load_classifier():
+    global _classifier, _intent_embeddings
+    if _classifier is None:
+        from sentence_transformers import SentenceTransformer
+        _classifier = SentenceTransformer(ROUTER_CLASSIFIER_MODEL)
+        _intent_embeddings = {
+            intent: _classifier.encode(examples, normalize_embeddings=True)
+            for intent, examples in INTENT_EXAMPLES.items()
+        }
+    return _classifier
+
+def _classify(message: str) -> Tuple[Optional[str], float]:
+    model = _load_classifier()
+    vector = model.encode([message], normalize_embeddings=True)[0]
+    best_intent, best_score = None, 0.0
+    for intent, examples in _intent_embeddings.items():
+        score = float((examples @ vector).max())
+        if score > best_score:
+            best_intent, best_score = intent, score
+    return best_intent, best_score
+
+async def match_intent(message: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Cocokkan pesan ke (nama tool, args). None jika tidak yakin."""
+    text = " ".join(message.lower().split())
+
+    for intent, pattern in INTENT_PATTERNS:
+        match = pattern.fullmatch(text)
+        if match:
+            value = match.group(1).strip()
+            if intent == "search_product_by_name":
+                return intent, {"product_name": value}
+            return intent, {"umkm_id": int(value)}
+
+    # Fallback classifier: hanya untuk pesan pendek tentang UMKM dengan tepat satu ID
+    numbers = re.findall(r"\d+", text)
+    if ROUTER_CLASSIFIER_MODEL and "umkm" in text and len(numbers) == 1 and len(text.split()) <= 8:
+        try:
+            intent, score = await run_blocking(_classify, text)
+        except Exception as e:
+            logger.warning(f"Router classifier gagal: {e}")
+            return None
+        if intent and score >= ROUTER_CLASSIFIER_THRESHOLD:
+            return intent, {"umkm_id": int(numbers[0])}
+    return None
+
+def _format_price(price) -> str:
+    if price is None:
+        return "harga belum tersedia"
+    return "Rp " + f"{price:,.0f}".replace(",", ".")
+
+def render_response(intent: str, args: Dict[str, Any], result: Dict[str, Any]) -> str:
+    """Template jawaban untuk hasil tool katalog"""
+    if intent == "get_umkm_by_id":
+        if result.get("status") != "success":
+            return f"Mohon maaf, UMKM dengan ID {args['umkm_id']} tidak ditemukan. -SriBot"
+        u = result["data"]
+        lines = [
+            "Berikut adalah informasi UMKM yang Anda cari:",
+            "",
+            f"**{u['umkm_name']}**",
+            f"- Tentang: {u.get('umkm_about') or '-'}",
+            f"- Alamat: {u.get('umkm_alamat') or '-'}",
+            f"- Kontak: {u.get('umkm_notelp') or '-'}",
+            f"- Email: {u.get('umkm_email') or '-'}",
+            f"- Media Sosial: {u.get('umkm_sosmed') or '-'}",
+        ]
+        if u.get("umkm_image"):
+            lines.append("- Gambar profil tersedia dan akan ditampilkan.")
+        lines += ["", "Semoga membantu! -SriBot"]
+        return "\n".join(lines)
+
+    products = result.get("data") or []
+    if intent == "get_products_by_umkm":
+        if not products:
+            return f"Mohon maaf, belum ada produk yang terdaftar untuk UMKM dengan ID {args['umkm_id']}. -SriBot"
+        header = f"Berikut adalah {len(products)} produk dari UMKM dengan ID {args['umkm_id']}:"
+    else:
+        if not products:
+            return f"Mohon maaf, produk '{args['product_name']}' tidak ditemukan. -SriBot"
+        header = f"Berikut adalah produk yang cocok dengan '{args['product_name']}':"
+
+    lines = [header, ""]
+    for i, p in enumerate(products, 1):
+        line = f"{i}. **{p['product_name']}** - {_format_price(p.get('product_price'))}"
+        if p.get("product_stock") is not None:
+            line += f" (stok: {p['product_stock']})"
+        if p.get("umkm_name"):
+            line += f" - {p['umkm_name']}"
+        lines.append(line)
+    if any(p.get("product_image") for p in products):
+        lines += ["", "Gambar produk akan ditampilkan."]
+    lines += ["", "Semoga membantu! -SriBot"]
+    return "\n".join(lines)
+
+_TOOL_FUNCS = {
+    "get_umkm_by_id": aget_umkm_by_id,
+    "get_products_by_umkm": aget_products_by_umkm,
+    "search_product_by_name": asearch_product_by_name,
+}
+
+async def route_intent(state: ChatState):
+    """
+    Fast path: query katalog yang jelas langsung dijawab dari database dengan template,
+    tanpa memanggil LLM. Pesan lain diteruskan ke ReAct loop.
+    """
+    # Node pertama setiap turn: catat waktu mulai untuk budget wall time ReAct loop
+    turn_start = {"turn_started_at": time.time()}
+    last_message = state["messages"][-1]
+    if not isinstance(last_message, HumanMessage) or not isinstance(last_message.content, str):
+        return turn_start
+
+    ROUTER_STATS["total"] += 1
+    matched = await match_intent(last_message.content)
+    if matched is None:
+        ROUTER_STATS["fallback"] += 1
+        ROUTER_REQUESTS.labels(result="fallback", intent="none").inc()
+        return turn_start
+
+    intent, args = matched
+    result = await _TOOL_FUNCS[intent](**args)
+    not_found = intent == "get_umkm_by_id" and result.get("message") == "UMKM tidak ditemukan"
+    if result.get("status") != "success" and not not_found:
+        # Error database: biarkan ReAct loop yang menangani
+        ROUTER_STATS["fallback"] += 1
+        ROUTER_REQUESTS.labels(result="fallback", intent=intent).inc()
+        return turn_start
+
+    ROUTER_STATS["fast_path"] += 1
+    ROUTER_STATS[f"intent:{intent}"] += 1
+    ROUTER_REQUESTS.labels(result="fast_path", intent=intent).inc()
+
+    # Simpan sebagai pasangan tool call / ToolMessage agar history tetap valid untuk LLM
+    call_id = f"router-{uuid.uuid4()}"
+    return {**turn_start, "messages": [
+        AIMessage(content="", tool_calls=[{"name": intent, "args": args, "id": call_id}]),
+        ToolMessage(
+            content=render_tool_result(intent, result, args), artifact=result, name=intent, tool_call_id=call_id
+        ),
+        AIMessage(content=render_response(intent, args, result)),
+    ]}
+
+def route_after_router(state: ChatState) -> str:
+    """Jika router sudah menjawab, selesai; jika tidak, lanjut ke ReAct loop"""
+    if isinstance(state["messages"][-1], AIMessage):
+        return END
+    return "manage_history"
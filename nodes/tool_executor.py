@@ -0,0 +1,91 @@
+import asyncio
+import os
+import time
+from typing import Dict
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from models.state_models import ChatState
+from tools.thread_pool import run_blocking
+from services.metrics import TOOL_LATENCY
+
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "20"))
+
+def _parse_tool_timeouts(raw: str) -> Dict[str, float]:
+    """Parse override timeout per tool, format: "search_documents=10,analyze_and_save_info=15" """
+    timeouts = {}
+    for item in raw.split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            timeouts[name.strip()] = float(value)
+    return timeouts
+
+TOOL_TIMEOUTS = _parse_tool_timeouts(os.getenv("TOOL_TIMEOUTS", ""))
+
+def get_tool_timeout(tool_name: str) -> float:
+    return TOOL_TIMEOUTS.get(tool_name, TOOL_TIMEOUT_SECONDS)
+
+async def _run_tool_call(tool, call: dict, config: RunnableConfig) -> ToolMessage:
+    """Jalankan satu tool call dan catat durasinya per tool"""
+    start = time.perf_counter()
+    message = await _invoke_tool_call(tool, call, config)
+    TOOL_LATENCY.labels(tool=call["name"], status=message.status).observe(time.perf_counter() - start)
+    return message
+
+async def _invoke_tool_call(tool, call: dict, config: RunnableConfig) -> ToolMessage:
+    """Jalankan satu tool call dengan timeout; error dikembalikan sebagai ToolMessage"""
+    name = call["name"]
+    if tool is None:
+        return ToolMessage(
+            content=f"Error: tool '{name}' tidak tersedia.",
+            name=name,
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+    tool_call = {**call, "type": "tool_call"}
+    timeout = get_tool_timeout(name)
+    try:
+        if getattr(tool, "coroutine", None) is not None:
+            result = await asyncio.wait_for(tool.ainvoke(tool_call, config), timeout)
+        else:
+            # Tool sync dijalankan di thread pool terbatas
+            result = await asyncio.wait_for(run_blocking(tool.invoke, tool_call, config), timeout)
+    except asyncio.TimeoutError:
+        return ToolMessage(
+            content=f"Error: tool '{name}' melebihi batas waktu {timeout:g} detik.",
+            name=name,
+            tool_call_id=call["id"],
+            status="error",
+        )
+    except Exception as e:
+        return ToolMessage(
+            content=f"Error menjalankan tool '{name}': {str(e)}",
+            name=name,
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+    if isinstance(result, ToolMessage):
+        return result
+    return ToolMessage(content=str(result), name=name, tool_call_id=call["id"])
+
+def create_tool_executor(tools):
+    """
+    Buat node pengganti ToolNode: semua tool call dalam satu AIMessage dijalankan
+    bersamaan, sehingga satu step selesai selama tool paling lambat (bukan jumlah semuanya).
+    Urutan ToolMessage selalu mengikuti urutan tool_calls.
+    """
+    tools_by_name = {tool.name: tool for tool in tools}
+
+    async def execute_tools(state: ChatState, config: RunnableConfig):
+        last_message = state["messages"][-1]
+        if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
+            return {}
+
+        results = await asyncio.gather(*(
+            _run_tool_call(tools_by_name.get(call["name"]), call, config)
+            for call in last_message.tool_calls
+        ))
+        return {"messages": list(results)}
+
+    return execute_tools
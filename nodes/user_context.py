@@ -0,0 +1,23 @@
+import logging
+from langchain_core.runnables import RunnableConfig
+from models.state_models import ChatState
+from tools.memory_tool import get_redis_store, format_user_context
+
+logger = logging.getLogger(__name__)
+
+async def load_user_context(state: ChatState, config: RunnableConfig):
+    """
+    Muat memori user langsung dari memory store sebelum LLM dipanggil,
+    sehingga model tidak perlu round trip tambahan untuk `get_user_context`.
+    """
+    user_id = config.get("configurable", {}).get("user_id")
+    if not user_id:
+        return {"user_context": ""}
+
+    try:
+        memories = await get_redis_store().asearch(("memories", user_id), query="")
+    except Exception as e:
+        logger.warning(f"Gagal memuat konteks user {user_id}: {e}")
+        return {"user_context": ""}
+
+    return {"user_context": format_user_context(memories) or ""}
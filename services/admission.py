@@ -0,0 +1,168 @@
+import asyncio
+import math
+import os
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+from services.metrics import ADMISSION_ACTIVE, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT
+
+# Batas eksekusi graph (dan panggilan LLM di dalamnya) yang berjalan bersamaan
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+ADMISSION_MAX_PER_USER = int(os.getenv("ADMISSION_MAX_PER_USER", "2"))
+# Antrian tunggu dibatasi secara global dan per user agar satu user tidak memenuhi antrian
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_MAX_QUEUE_PER_USER = int(os.getenv("ADMISSION_MAX_QUEUE_PER_USER", "4"))
+# Request ditolak jika perkiraan waktu tunggunya melebihi batas ini
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "15"))
+# Perkiraan awal durasi satu eksekusi sebelum ada data (diperbarui dengan EWMA)
+ADMISSION_INITIAL_SERVICE_SECONDS = float(os.getenv("ADMISSION_INITIAL_SERVICE_SECONDS", "5"))
+
+class AdmissionRejected(Exception):
+    """Request tidak mendapat slot; retry_after dalam detik untuk header Retry-After"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Server sedang sibuk ({reason}), coba lagi dalam {math.ceil(retry_after)} detik")
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Batasi eksekusi bersamaan secara global dan per user. Request yang tidak langsung
+    mendapat slot masuk antrian per user; slot yang lepas dibagikan round-robin antar
+    user sehingga user dengan banyak request tidak bisa menghabiskan semua slot.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+        max_per_user: int = ADMISSION_MAX_PER_USER,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        max_queue_per_user: int = ADMISSION_MAX_QUEUE_PER_USER,
+        max_wait: float = ADMISSION_MAX_WAIT_SECONDS,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.max_wait = max_wait
+        self._active = 0
+        self._active_per_user: Counter = Counter()
+        self._queues: Dict[str, Deque[asyncio.Future]] = {}
+        self._rr: Deque[str] = deque()
+        self._waiting = 0
+        self._service_time = ADMISSION_INITIAL_SERVICE_SECONDS
+
+    def estimated_wait(self, position: int) -> float:
+        """Perkiraan waktu tunggu untuk posisi antrian tertentu (0 = paling depan)"""
+        return (position + 1) / self.max_concurrent * self._service_time
+
+    def _reject(self, reason: str, retry_after: float):
+        ADMISSION_REJECTED.labels(reason=reason).inc()
+        raise AdmissionRejected(reason, max(1.0, retry_after))
+
+    def _grant(self, user_id: str):
+        self._active += 1
+        self._active_per_user[user_id] += 1
+        ADMISSION_ACTIVE.inc()
+
+    def _dispatch(self):
+        """Bagikan slot kosong ke antrian user secara round-robin"""
+        while self._active < self.max_concurrent and self._rr:
+            granted = False
+            for _ in range(len(self._rr)):
+                user_id = self._rr.popleft()
+                queue = self._queues.get(user_id)
+                if not queue:
+                    self._queues.pop(user_id, None)
+                    continue
+                if self._active_per_user[user_id] >= self.max_per_user:
+                    self._rr.append(user_id)
+                    continue
+                waiter = queue.popleft()
+                self._waiting -= 1
+                ADMISSION_QUEUE_DEPTH.dec()
+                if queue:
+                    self._rr.append(user_id)
+                else:
+                    del self._queues[user_id]
+                self._grant(user_id)
+                waiter.set_result(None)
+                granted = True
+                break
+            if not granted:
+                break
+
+    async def acquire(self, user_id: str, max_wait: Optional[float] = None):
+        max_wait = self.max_wait if max_wait is None else max_wait
+        if (
+            self._active < self.max_concurrent
+            and self._active_per_user[user_id] < self.max_per_user
+            and not self._queues.get(user_id)
+        ):
+            self._grant(user_id)
+            ADMISSION_WAIT.observe(0)
+            return
+
+        estimate = self.estimated_wait(self._waiting)
+        if self._waiting >= self.max_queue:
+            self._reject("queue_full", estimate)
+        if len(self._queues.get(user_id, ())) >= self.max_queue_per_user:
+            self._reject("user_queue_full", estimate)
+        if estimate > max_wait:
+            self._reject("deadline", estimate)
+
+        waiter = asyncio.get_running_loop().create_future()
+        if user_id not in self._queues:
+            self._queues[user_id] = deque()
+            self._rr.append(user_id)
+        self._queues[user_id].append(waiter)
+        self._waiting += 1
+        ADMISSION_QUEUE_DEPTH.inc()
+
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Slot sudah diberikan tepat saat menyerah: kembalikan
+                self.release(user_id)
+            else:
+                waiter.cancel()
+                self._queues.get(user_id, deque()).remove(waiter)
+                self._waiting -= 1
+                ADMISSION_QUEUE_DEPTH.dec()
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject("timeout", self.estimated_wait(self._waiting))
+            raise
+        ADMISSION_WAIT.observe(time.monotonic() - start)
+
+    def release(self, user_id: str, service_seconds: Optional[float] = None):
+        self._active -= 1
+        self._active_per_user[user_id] -= 1
+        if self._active_per_user[user_id] <= 0:
+            del self._active_per_user[user_id]
+        ADMISSION_ACTIVE.dec()
+        if service_seconds is not None:
+            self._service_time = 0.8 * self._service_time + 0.2 * service_seconds
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, user_id: str, max_wait: Optional[float] = None):
+        """Tahan satu slot selama blok berjalan; raise AdmissionRejected jika ditolak"""
+        await self.acquire(user_id, max_wait)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(user_id, time.monotonic() - start)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "active": self._active,
+            "waiting": self._waiting,
+            "users_waiting": len(self._queues),
+            "avg_service_seconds": round(self._service_time, 3),
+        }
+
+admission = AdmissionController()
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+import redis
+import redis.asyncio as aioredis
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from redis.commands.search.field import TagField, TextField, VectorField
+from redis.commands.search.index_definition import IndexDefinition, IndexType
+from redis.commands.search.query import Query
+from services.embedding_service import get_embeddings
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Semantic cache untuk jawaban knowledge base yang tidak dipersonalisasi
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_INDEX = os.getenv("ANSWER_CACHE_INDEX", "answer_cache")
+# Jarak cosine maksimum agar dua pertanyaan dianggap sama (0 = identik)
+ANSWER_CACHE_DISTANCE_THRESHOLD = float(os.getenv("ANSWER_CACHE_DISTANCE_THRESHOLD", "0.08"))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+# Hanya jawaban yang seluruh tool call-nya berasal dari tool ini yang boleh di-cache
+CACHEABLE_TOOLS = {"search_documents"}
+
+# Pernyataan orang pertama tentang fakta personal (nama, domisili, asal, kontak, umur, pekerjaan).
+# Sengaja tidak memakai pola ekstraksi memory_tool yang juga cocok dengan pertanyaan KB biasa
+# seperti "sejarah songket dari palembang"
+_FIRST_PERSON = r"(?:saya|aku|gue|gw)"
+PERSONAL_FACT_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in (
+        rf"\bnama\s*(?:{_FIRST_PERSON}|ku)\b",
+        rf"\bpanggil\s+{_FIRST_PERSON}\b",
+        rf"\b{_FIRST_PERSON}\s+(?:tinggal|berdomisili|menetap|berasal|asli|lahir)\b",
+        rf"\b{_FIRST_PERSON}\s+(?:bekerja|kerja)\s+(?:di|sebagai)\b",
+        rf"\b{_FIRST_PERSON}\s+(?:seorang|adalah\s+seorang)\b",
+        rf"\b(?:nomor|no|nomer)\.?\s*(?:hp|handphone|telepon|telp|wa|whatsapp)\s*(?:{_FIRST_PERSON}|ku)\b",
+        rf"\b(?:alamat|email|umur|usia|domisili|pekerjaan)\s*(?:{_FIRST_PERSON}|ku)\b",
+        r"(?:\+62|\b0)8\d{7,}",
+    )
+]
+
+_PREFIX = f"{ANSWER_CACHE_INDEX}:"
+_LRU_KEY = f"{ANSWER_CACHE_INDEX}:lru"
+# Waktu expire tiap entri: entri yang hilang karena TTL harus dibuang juga dari sorted set LRU
+_EXPIRY_KEY = f"{ANSWER_CACHE_INDEX}:expiry"
+
+_client = None
+
+def _get_client():
+    global _client
+    if _client is None:
+        _client = aioredis.from_url(REDIS_URL)
+    return _client
+
+def _to_bytes(vector: List[float]) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+def is_cacheable_query(message: str) -> bool:
+    """Pertanyaan yang berisi pernyataan fakta personal user tidak dilayani dari cache"""
+    return not any(pattern.search(message) for pattern in PERSONAL_FACT_PATTERNS)
+
+def is_cacheable_turn(turn_messages: List[BaseMessage], user_context: str) -> bool:
+    """
+    Jawaban boleh di-cache jika tidak dipersonalisasi: user belum punya memori
+    yang bisa disebut di jawaban, dan turn ini hanya memakai tool knowledge base.
+    Jawaban dari turn yang pencarian dokumennya gagal atau kosong tidak di-cache,
+    agar gangguan sesaat tidak tersimpan sebagai jawaban selama TTL.
+    """
+    if user_context:
+        return False
+    tool_messages = [m for m in turn_messages if isinstance(m, ToolMessage)]
+    if not tool_messages or not {m.name for m in tool_messages} <= CACHEABLE_TOOLS:
+        return False
+    return all(
+        m.status == "success" and isinstance(m.artifact, dict) and m.artifact.get("documents", 0) > 0
+        for m in tool_messages
+    )
+
+async def _ensure_index(client, dim: int):
+    try:
+        await client.ft(ANSWER_CACHE_INDEX).info()
+    except redis.exceptions.ResponseError:
+        await client.ft(ANSWER_CACHE_INDEX).create_index(
+            [
+                TextField("query"),
+                VectorField("embedding", "FLAT", {
+                    "TYPE": "FLOAT32",
+                    "DIM": dim,
+                    "DISTANCE_METRIC": "COSINE",
+                }),
+            ],
+            definition=IndexDefinition(prefix=[_PREFIX], index_type=IndexType.HASH),
+        )
+
+async def lookup(message: str) -> Optional[Dict[str, Any]]:
+    """Cari jawaban tersimpan untuk pertanyaan yang mirip. Return payload atau None."""
+    if not ANSWER_CACHE_ENABLED or not is_cacheable_query(message):
+        return None
+    client = _get_client()
+    try:
+        vector = await get_embeddings().aembed_query(message)
+        query = (
+            Query("*=>[KNN 1 @embedding $vec AS distance]")
+            .sort_by("distance")
+            .return_fields("response", "distance")
+            .dialect(2)
+        )
+        result = await client.ft(ANSWER_CACHE_INDEX).search(query, query_params={"vec": _to_bytes(vector)})
+    except redis.exceptions.ResponseError:
+        # Index belum ada (cache kosong atau baru di-invalidate)
+        return None
+    except Exception as e:
+        logger.warning(f"Answer cache lookup gagal: {e}")
+        return None
+
+    if not result.docs:
+        return None
+    doc = result.docs[0]
+    if float(doc.distance) > ANSWER_CACHE_DISTANCE_THRESHOLD:
+        return None
+
+    # LRU: catat waktu akses terakhir
+    await client.zadd(_LRU_KEY, {doc.id: time.time()})
+    return json.loads(doc.response)
+
+async def store(message: str, payload: Dict[str, Any]):
+    """Simpan jawaban ke cache dengan TTL, lalu evict entri paling lama tidak dipakai"""
+    if not ANSWER_CACHE_ENABLED or not is_cacheable_query(message):
+        return
+    client = _get_client()
+    try:
+        vector = await get_embeddings().aembed_query(message)
+        await _ensure_index(client, len(vector))
+
+        key = _PREFIX + hashlib.sha256(" ".join(message.lower().split()).encode()).hexdigest()
+        pipe = client.pipeline(transaction=False)
+        pipe.hset(key, mapping={
+            "query": message,
+            "response": json.dumps(payload, ensure_ascii=False),
+            "embedding": _to_bytes(vector),
+        })
+        pipe.expire(key, ANSWER_CACHE_TTL_SECONDS)
+        now = time.time()
+        pipe.zadd(_LRU_KEY, {key: now})
+        pipe.zadd(_EXPIRY_KEY, {key: now + ANSWER_CACHE_TTL_SECONDS})
+        await pipe.execute()
+
+        # Entri yang sudah expire tidak dihitung, agar entri yang masih hidup tidak ter-evict lebih awal
+        expired = await client.zrangebyscore(_EXPIRY_KEY, "-inf", now)
+        if expired:
+            await client.zrem(_LRU_KEY, *expired)
+            await client.zrem(_EXPIRY_KEY, *expired)
+
+        overflow = await client.zcard(_LRU_KEY) - ANSWER_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            evicted = await client.zpopmin(_LRU_KEY, overflow)
+            if evicted:
+                evicted_keys = [k for k, _ in evicted]
+                await client.delete(*evicted_keys)
+                await client.zrem(_EXPIRY_KEY, *evicted_keys)
+    except Exception as e:
+        logger.warning(f"Answer cache store gagal: {e}")
+
+def invalidate_answer_cache(client: Optional[redis.Redis] = None):
+    """Hapus seluruh cache jawaban (dipanggil saat vector_db dibangun ulang)"""
+    client = client or redis.from_url(REDIS_URL)
+    try:
+        client.execute_command("FT.DROPINDEX", ANSWER_CACHE_INDEX, "DD")
+        logger.info(f"Answer cache '{ANSWER_CACHE_INDEX}' di-invalidate")
+    except redis.exceptions.ResponseError:
+        pass
+    client.delete(_LRU_KEY, _EXPIRY_KEY)
@@ -0,0 +1,46 @@
+import logging
+import os
+from dotenv import load_dotenv
+from langgraph.checkpoint.memory import MemorySaver
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+# "redis" agar state percakapan bisa dibagi antar worker/node; "memory" untuk development lokal
+CHECKPOINTER_BACKEND = os.getenv("CHECKPOINTER_BACKEND", "redis").lower()
+# Thread yang tidak disentuh selama TTL ini dihapus dari Redis (dalam menit, -1 = tanpa TTL)
+CHECKPOINT_TTL_MINUTES = float(os.getenv("CHECKPOINT_TTL_MINUTES", str(24 * 60)))
+# Shallow saver hanya menyimpan checkpoint terakhir per thread, bukan seluruh riwayat super-step
+CHECKPOINT_SHALLOW = os.getenv("CHECKPOINT_SHALLOW", "true").lower() == "true"
+
+def _ttl_config():
+    if CHECKPOINT_TTL_MINUTES < 0:
+        return None
+    # refresh_on_read: TTL dihitung dari aktivitas terakhir, bukan dari pesan pertama
+    return {"default_ttl": CHECKPOINT_TTL_MINUTES, "refresh_on_read": True}
+
+async def create_checkpointer():
+    """Buat checkpointer sesuai CHECKPOINTER_BACKEND. Harus dipanggil di dalam event loop."""
+    if CHECKPOINTER_BACKEND == "memory":
+        logger.warning("Checkpointer memakai MemorySaver: state percakapan tidak dibagi antar worker")
+        return MemorySaver()
+    if CHECKPOINTER_BACKEND != "redis":
+        raise ValueError(f"CHECKPOINTER_BACKEND tidak dikenal: {CHECKPOINTER_BACKEND}")
+
+    if CHECKPOINT_SHALLOW:
+        from langgraph.checkpoint.redis.ashallow import AsyncShallowRedisSaver as Saver
+    else:
+        from langgraph.checkpoint.redis.aio import AsyncRedisSaver as Saver
+
+    saver = Saver(redis_url=REDIS_URL, ttl=_ttl_config())
+    await saver.asetup()
+    return saver
+
+async def close_checkpointer(checkpointer):
+    """Tutup koneksi Redis milik checkpointer (no-op untuk MemorySaver)"""
+    if isinstance(checkpointer, MemorySaver):
+        return
+    await checkpointer.__aexit__(None, None, None)
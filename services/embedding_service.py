@@ -0,0 +1,325 @@
+import asyncio
+import hashlib
+import inspect
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import redis
+import redis.asyncio as aioredis
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from services.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_CACHE_REQUESTS, InstrumentedEmbeddings
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Satu embedding service untuk RAG, memory store, answer cache, dan ingestion
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/gemini-embedding-001")
+# Dimensi output (768, 1536, atau 3072); dipakai skema vector_db (services/index_schema.py) dan memory store
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "1536"))
+# Cache in-process (jumlah vektor) dan tier Redis yang bertahan antar restart/worker
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+EMBEDDING_REDIS_CACHE = os.getenv("EMBEDDING_REDIS_CACHE", "true").lower() == "true"
+EMBEDDING_CACHE_TTL_SECONDS = int(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+# Query tunggal yang datang bersamaan dikumpulkan selama jendela ini lalu dikirim satu batch
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "64"))
+# Setelah Redis error, tier Redis dilewati selama ini agar request tidak ikut lambat
+EMBEDDING_REDIS_RETRY_SECONDS = float(os.getenv("EMBEDDING_REDIS_RETRY_SECONDS", "30"))
+
+_KEY_PREFIX = "emb:"
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+def _to_bytes(vector: List[float]) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+def _from_bytes(data: bytes) -> List[float]:
+    return np.frombuffer(data, dtype=np.float32).tolist()
+
+def _accepts(embeddings: Embeddings, parameter: str) -> bool:
+    try:
+        return parameter in inspect.signature(embeddings.aembed_documents).parameters
+    except (TypeError, ValueError):
+        return False
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings dengan cache dua tingkat (LRU in-process lalu Redis), key = model + dimensi +
+    jenis (query/document) + teks yang dinormalisasi. aembed_query yang bersamaan dan belum
+    ter-cache digabung menjadi satu panggilan batch ke provider.
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str = EMBEDDING_MODEL, dim: int = EMBEDDING_DIM,
+                 cache_size: int = EMBEDDING_CACHE_SIZE, persistent: bool = EMBEDDING_REDIS_CACHE):
+        self._embeddings = InstrumentedEmbeddings(embeddings)
+        self.model = model
+        self.dim = dim
+        self.cache_size = cache_size
+        self.persistent = persistent and bool(REDIS_URL)
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._aredis = None
+        self._redis_down_until = 0.0
+        # Dimensi dikirim ke provider (output_dimensionality Gemini) agar sama dengan skema index
+        self._provider_kwargs = {"output_dimensionality": dim} if _accepts(embeddings, "output_dimensionality") else {}
+        # Query kind di-batch lewat aembed_documents; provider Google butuh task_type query
+        self._query_batch_kwargs = dict(self._provider_kwargs)
+        if _accepts(embeddings, "task_type"):
+            self._query_batch_kwargs["task_type"] = "RETRIEVAL_QUERY"
+        self._pending: List[Tuple[str, str, asyncio.Future]] = []
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._flush_timer: Optional[asyncio.Task] = None
+        self._tasks = set()
+        self.stats = Counter()
+
+    def __getattr__(self, name):
+        return getattr(self._embeddings, name)
+
+    def cache_key(self, text: str, kind: str) -> str:
+        digest = hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{_KEY_PREFIX}{self.model}:{self.dim}:{kind}:{digest}"
+
+    def _record(self, result: str, count: int = 1):
+        if count:
+            self.stats[result] += count
+            EMBEDDING_CACHE_REQUESTS.labels(result=result).inc(count)
+
+    def _lru_get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+            return vector
+
+    def _lru_put(self, key: str, vector: List[float]):
+        with self._lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.cache_size:
+                self._lru.popitem(last=False)
+
+    def _redis_available(self) -> bool:
+        return self.persistent and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, e: Exception):
+        logger.warning(f"Embedding cache Redis tidak tersedia: {e}")
+        self._redis_down_until = time.monotonic() + EMBEDDING_REDIS_RETRY_SECONDS
+
+    def _get_redis(self):
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+        return self._redis
+
+    def _get_aredis(self):
+        if self._aredis is None:
+            self._aredis = aioredis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+        return self._aredis
+
+    def _redis_mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        if not keys or not self._redis_available():
+            return [None] * len(keys)
+        try:
+            return self._get_redis().mget(keys)
+        except Exception as e:
+            self._redis_failed(e)
+            return [None] * len(keys)
+
+    async def _aredis_mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        if not keys or not self._redis_available():
+            return [None] * len(keys)
+        try:
+            return await self._get_aredis().mget(keys)
+        except Exception as e:
+            self._redis_failed(e)
+            return [None] * len(keys)
+
+    def _redis_pipeline(self, client, items: Dict[str, List[float]]):
+        pipe = client.pipeline(transaction=False)
+        for key, vector in items.items():
+            pipe.set(key, _to_bytes(vector), ex=EMBEDDING_CACHE_TTL_SECONDS)
+        return pipe
+
+    def _redis_store(self, items: Dict[str, List[float]]):
+        if not items or not self._redis_available():
+            return
+        try:
+            self._redis_pipeline(self._get_redis(), items).execute()
+        except Exception as e:
+            self._redis_failed(e)
+
+    async def _aredis_store(self, items: Dict[str, List[float]]):
+        if not items or not self._redis_available():
+            return
+        try:
+            await self._redis_pipeline(self._get_aredis(), items).execute()
+        except Exception as e:
+            self._redis_failed(e)
+
+    def _from_lru(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        for key in keys:
+            vector = self._lru_get(key)
+            if vector is not None:
+                found[key] = vector
+        self._record("lru_hit", len(found))
+        return found
+
+    def _from_redis(self, keys: List[str], values: List[Optional[bytes]]) -> Dict[str, List[float]]:
+        found = {}
+        for key, data in zip(keys, values):
+            if data is not None:
+                found[key] = _from_bytes(data)
+                self._lru_put(key, found[key])
+        self._record("redis_hit", len(found))
+        return found
+
+    def _remember(self, items: Dict[str, List[float]]):
+        for key, vector in items.items():
+            self._lru_put(key, vector)
+
+    def _embed(self, texts: List[str], kind: str) -> List[List[float]]:
+        keys = [self.cache_key(t, kind) for t in texts]
+        found = self._from_lru(keys)
+        missing = list(dict.fromkeys(k for k in keys if k not in found))
+        found.update(self._from_redis(missing, self._redis_mget(missing)))
+
+        texts_by_key = dict(zip(keys, texts))
+        missing = [k for k in missing if k not in found]
+        self._record("miss", len(missing))
+        if missing:
+            miss_texts = [texts_by_key[k] for k in missing]
+            if kind == "query" and len(miss_texts) == 1:
+                vectors = [self._embeddings.embed_query(miss_texts[0], **self._provider_kwargs)]
+            else:
+                vectors = self._embeddings.embed_documents(miss_texts, **self._provider_kwargs)
+            computed = dict(zip(missing, vectors))
+            self._remember(computed)
+            self._redis_store(computed)
+            found.update(computed)
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], "query")[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "document")
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.cache_key(t, "document") for t in texts]
+        found = self._from_lru(keys)
+        missing = list(dict.fromkeys(k for k in keys if k not in found))
+        found.update(self._from_redis(missing, await self._aredis_mget(missing)))
+
+        texts_by_key = dict(zip(keys, texts))
+        missing = [k for k in missing if k not in found]
+        self._record("miss", len(missing))
+        if missing:
+            vectors = await self._embeddings.aembed_documents(
+                [texts_by_key[k] for k in missing], **self._provider_kwargs
+            )
+            computed = dict(zip(missing, vectors))
+            self._remember(computed)
+            await self._aredis_store(computed)
+            found.update(computed)
+        return [found[k] for k in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self.cache_key(text, "query")
+        vector = self._lru_get(key)
+        if vector is not None:
+            self._record("lru_hit")
+            return vector
+        # Teks yang sama sedang di-embed oleh request lain: tunggu hasil yang sama
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._record("coalesced")
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self._pending.append((key, text, future))
+        if len(self._pending) >= EMBEDDING_MAX_BATCH:
+            batch, self._pending = self._pending, []
+            self._spawn(self._flush(batch))
+        elif self._flush_timer is None:
+            self._flush_timer = self._spawn(self._flush_later())
+        return await asyncio.shield(future)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _flush_later(self):
+        await asyncio.sleep(EMBEDDING_BATCH_WINDOW_MS / 1000)
+        self._flush_timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[str, str, asyncio.Future]]):
+        """Satu lookup Redis dan satu panggilan provider untuk semua query di batch"""
+        try:
+            keys = [key for key, _, _ in batch]
+            found = self._from_redis(keys, await self._aredis_mget(keys))
+            missing = [(key, text) for key, text, _ in batch if key not in found]
+            self._record("miss", len(missing))
+            computed = {}
+            if missing:
+                EMBEDDING_BATCH_SIZE.observe(len(missing))
+                texts = [text for _, text in missing]
+                if len(texts) == 1:
+                    vectors = [await self._embeddings.aembed_query(texts[0], **self._provider_kwargs)]
+                else:
+                    vectors = await self._embeddings.aembed_documents(texts, **self._query_batch_kwargs)
+                computed = {key: vector for (key, _), vector in zip(missing, vectors)}
+                self._remember(computed)
+                found.update(computed)
+            for key, _, future in batch:
+                if not future.done():
+                    future.set_result(found[key])
+            await self._aredis_store(computed)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for key, _, future in batch:
+                if not future.done():
+                    future.cancel()
+                self._inflight.pop(key, None)
+
+_embeddings: Optional[CachedEmbeddings] = None
+
+def _create_base_embeddings() -> Embeddings:
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    return GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+
+def get_embeddings() -> CachedEmbeddings:
+    """Embedding service bersama (dibuat saat pertama dipakai)"""
+    global _embeddings
+    if _embeddings is None:
+        _embeddings = CachedEmbeddings(_create_base_embeddings())
+    return _embeddings
+
+def set_embeddings(embeddings: Optional[Embeddings], persistent: bool = EMBEDDING_REDIS_CACHE):
+    """Ganti provider embedding, misal fake embeddings untuk benchmark offline (tetap di-cache)"""
+    global _embeddings
+    _embeddings = CachedEmbeddings(embeddings, persistent=persistent) if embeddings is not None else None
+
+def get_embedding_stats() -> Dict[str, float]:
+    stats = dict(_embeddings.stats) if _embeddings is not None else {}
+    lookups = sum(stats.get(k, 0) for k in ("lru_hit", "redis_hit", "coalesced", "miss"))
+    stats["hit_rate"] = round((lookups - stats.get("miss", 0)) / lookups, 4) if lookups else 0.0
+    return stats
@@ -0,0 +1,125 @@
+import logging
+import os
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from langchain_redis import RedisConfig
+from redisvl.index import SearchIndex
+from redisvl.query import RangeQuery, VectorQuery
+from redisvl.schema import IndexSchema
+from services.embedding_service import EMBEDDING_DIM
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Satu-satunya definisi skema vector_db, dipakai ingestion (create_vectorstore.py) dan search (rag_tools)
+VECTOR_INDEX_NAME = "vector_db"
+# Dimensi mengikuti EMBEDDING_DIM (output_dimensionality gemini-embedding-001: 768, 1536, atau 3072)
+VECTOR_DIM = EMBEDDING_DIM
+VECTOR_DISTANCE_METRIC = "cosine"
+# float16 memakai setengah memori float32; butuh Redis 7.4+ / RediSearch 2.10+
+VECTOR_DATATYPE = os.getenv("VECTOR_DATATYPE", "float16").lower()
+# flat = exact KNN (cocok untuk KB kecil), hnsw = ANN dengan parameter di bawah
+VECTOR_ALGORITHM = os.getenv("VECTOR_ALGORITHM", "flat").lower()
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_RUNTIME = int(os.getenv("HNSW_EF_RUNTIME", "10"))
+
+CONTENT_FIELD = "text"
+EMBEDDING_FIELD = "embedding"
+# Metadata yang di-index agar search_documents bisa memfilter doc_type dan
+# mengembalikan doc_type/page langsung dari query Redis
+METADATA_SCHEMA = [
+    {"name": "doc_type", "type": "tag"},
+    {"name": "page", "type": "numeric"},
+]
+# Field yang dikembalikan query pencarian (yang dipakai render_documents)
+SEARCH_RETURN_FIELDS = [CONTENT_FIELD, "doc_type", "page"]
+
+class IndexSchemaMismatch(RuntimeError):
+    """Index di Redis dibuat dengan skema vektor yang berbeda dari konfigurasi saat ini"""
+
+def vector_field_attrs(dim: int = VECTOR_DIM, algorithm: str = VECTOR_ALGORITHM, datatype: str = VECTOR_DATATYPE,
+                       m: int = HNSW_M, ef_construction: int = HNSW_EF_CONSTRUCTION,
+                       ef_runtime: int = HNSW_EF_RUNTIME) -> Dict[str, Any]:
+    attrs = {"dims": dim, "distance_metric": VECTOR_DISTANCE_METRIC, "algorithm": algorithm, "datatype": datatype}
+    if algorithm == "hnsw":
+        attrs.update({"m": m, "ef_construction": ef_construction, "ef_runtime": ef_runtime})
+    return attrs
+
+def vector_index_schema(index_name: str = VECTOR_INDEX_NAME, **attrs) -> IndexSchema:
+    """Skema redisvl index knowledge base; attrs meng-override atribut field vektor (dipakai benchmark)"""
+    return IndexSchema.from_dict({
+        "index": {"name": index_name, "prefix": index_name, "storage_type": "hash"},
+        "fields": [
+            {"name": "id", "type": "tag"},
+            {"name": CONTENT_FIELD, "type": "text"},
+            {"name": EMBEDDING_FIELD, "type": "vector", "attrs": vector_field_attrs(**attrs)},
+            *METADATA_SCHEMA,
+        ],
+    })
+
+def redis_config(index_name: str = VECTOR_INDEX_NAME) -> RedisConfig:
+    """RedisConfig untuk RedisVectorStore dengan skema di atas (datatype dipakai saat menulis vektor)"""
+    return RedisConfig(
+        index_name=index_name,
+        redis_url=REDIS_URL,
+        index_schema=vector_index_schema(index_name),
+        vector_datatype=VECTOR_DATATYPE.upper(),
+        embedding_dimensions=VECTOR_DIM,
+        content_field=CONTENT_FIELD,
+        embedding_field=EMBEDDING_FIELD,
+    )
+
+def build_search_query(embedding: List[float], top_k: int, filter_expression=None,
+                       distance_threshold: Optional[float] = None, ef_runtime: Optional[int] = None,
+                       datatype: str = VECTOR_DATATYPE):
+    """
+    Query KNN (atau range jika ada batas jarak) dengan datatype dan field return sesuai skema.
+    ef_runtime meng-override EF_RUNTIME index HNSW per query (hanya untuk query KNN);
+    datatype harus sama dengan datatype field vektor index yang di-query.
+    """
+    kwargs = {
+        "vector": embedding,
+        "vector_field_name": EMBEDDING_FIELD,
+        "return_fields": SEARCH_RETURN_FIELDS,
+        "filter_expression": filter_expression,
+        "dtype": datatype,
+        "num_results": top_k,
+    }
+    if distance_threshold is not None:
+        return RangeQuery(distance_threshold=distance_threshold, **kwargs)
+    return VectorQuery(ef_runtime=ef_runtime, **kwargs)
+
+def schema_mismatches(redis_client, index_name: str = VECTOR_INDEX_NAME) -> Optional[List[str]]:
+    """
+    Bandingkan field vektor index yang ada di Redis dengan konfigurasi saat ini.
+    Return None jika index belum ada, list kosong jika cocok.
+    """
+    index = SearchIndex(vector_index_schema(index_name), redis_client=redis_client)
+    if not index.exists():
+        return None
+    existing = SearchIndex.from_existing(index_name, redis_client=redis_client).schema.fields.get(EMBEDDING_FIELD)
+    if existing is None:
+        return [f"field '{EMBEDDING_FIELD}' tidak ada"]
+    expected = vector_field_attrs()
+    mismatches = []
+    for name in ("dims", "algorithm", "datatype", "distance_metric"):
+        actual = getattr(existing.attrs, name)
+        actual = getattr(actual, "value", actual)
+        if str(actual).lower() != str(expected[name]).lower():
+            mismatches.append(f"{name}: index={actual}, konfigurasi={expected[name]}")
+    return mismatches
+
+def verify_vector_index(redis_client, index_name: str = VECTOR_INDEX_NAME):
+    """Cek startup: gagal jika index dibuat dengan dimensi/datatype/algoritma yang berbeda"""
+    mismatches = schema_mismatches(redis_client, index_name)
+    if mismatches is None:
+        logger.warning(f"Index '{index_name}' belum ada, jalankan create_vectorstore.py")
+    elif mismatches:
+        raise IndexSchemaMismatch(
+            f"Skema index '{index_name}' tidak sesuai konfigurasi ({'; '.join(mismatches)}); "
+            f"jalankan create_vectorstore.py --full"
+        )
@@ -0,0 +1,117 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, List, Optional, Set, Tuple
+from langchain_core.documents import Document
+
+# Cache hasil parsing PDF per isi file (sha256), agar file yang tidak berubah tidak di-parse ulang
+INGEST_CACHE_DIR = os.getenv("INGEST_CACHE_DIR", ".ingest_cache")
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def chunk_key(chunk: Document) -> str:
+    """
+    Key deterministik chunk di vector index: hash isi + dokumen + halaman. Chunk yang sama
+    selalu mendapat key yang sama, sehingga chunk baru/berubah/hilang bisa dihitung per key.
+    """
+    doc_type = chunk.metadata.get("doc_type", "doc")
+    digest = hashlib.sha1(
+        f"{doc_type}|{chunk.metadata.get('page', '')}|{chunk.page_content}".encode("utf-8")
+    ).hexdigest()[:20]
+    return f"{doc_type}:{digest}"
+
+class PageCache:
+    """Halaman hasil parsing PDF, disimpan sebagai JSON gzip per sha256 file"""
+
+    def __init__(self, directory: str = INGEST_CACHE_DIR):
+        self.directory = os.path.join(directory, "pages")
+
+    def _path(self, file_hash: str) -> str:
+        return os.path.join(self.directory, f"{file_hash}.json.gz")
+
+    def get(self, file_hash: str) -> Optional[List[Document]]:
+        try:
+            with gzip.open(self._path(file_hash), "rt", encoding="utf-8") as f:
+                return [Document(page_content=p["page_content"], metadata=p["metadata"]) for p in json.load(f)]
+        except FileNotFoundError:
+            return None
+
+    def put(self, file_hash: str, pages: List[Document]):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._path(file_hash) + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump([{"page_content": p.page_content, "metadata": p.metadata} for p in pages], f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(file_hash))
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+class IngestManifest:
+    """
+    Manifest ingestion di Redis (hash "<index>:manifest"): per file PDF disimpan sha256 file
+    dan key semua chunk-nya. Disimpan di Redis agar selalu sejalan dengan isi index.
+    """
+
+    def __init__(self, client, index_name: str):
+        self.client = client
+        self.key = f"{index_name}:manifest"
+
+    def exists(self) -> bool:
+        return bool(self.client.exists(self.key))
+
+    def load(self) -> Dict[str, Dict]:
+        raw = self.client.hgetall(self.key)
+        return {
+            (path.decode() if isinstance(path, bytes) else path): json.loads(entry)
+            for path, entry in raw.items()
+        }
+
+    def save_file(self, path: str, file_hash: str, chunk_keys: List[str]):
+        self.client.hset(self.key, path, json.dumps({"sha256": file_hash, "chunks": chunk_keys}))
+
+    def remove_file(self, path: str):
+        self.client.hdel(self.key, path)
+
+    def clear(self):
+        self.client.delete(self.key)
+
+def diff_file(previous: Optional[Dict], chunks: List[Document]) -> Tuple[List[Tuple[str, Document]], List[str]]:
+    """Chunk yang perlu di-embed dan key lama yang perlu dihapus untuk satu file"""
+    old_keys = set(previous["chunks"]) if previous is not None else set()
+    new_keys = set()
+    add = []
+    for chunk in chunks:
+        key = chunk_key(chunk)
+        if key in new_keys:
+            continue
+        new_keys.add(key)
+        if key not in old_keys:
+            add.append((key, chunk))
+    return add, sorted(old_keys - new_keys)
+
+class IngestCheckpoint:
+    """
+    Key chunk yang sudah tertulis di run yang sedang berjalan (set "<index>:ingest_checkpoint").
+    Jika run crash, run berikutnya melewati chunk ini; dihapus setelah run selesai.
+    """
+
+    def __init__(self, client, index_name: str):
+        self.client = client
+        self.key = f"{index_name}:ingest_checkpoint"
+
+    def load(self) -> Set[str]:
+        return {k.decode() if isinstance(k, bytes) else k for k in self.client.smembers(self.key)}
+
+    def add(self, keys: List[str]):
+        if keys:
+            self.client.sadd(self.key, *keys)
+
+    def clear(self):
+        self.client.delete(self.key)
@@ -0,0 +1,271 @@
+import asyncio
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from langchain_core.documents import Document
+from redisvl.redis.utils import array_to_buffer
+from services.ingest_manifest import (
+    IngestCheckpoint, IngestManifest, PageCache, chunk_key, diff_file, file_sha256
+)
+
+# Root knowledge base yang di-index (bukan seluruh tree tempat script dijalankan)
+KB_ROOT = os.getenv("KB_ROOT", "knowledgebase")
+INGEST_PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Ukuran batch embedding dan jumlah batch yang berjalan bersamaan
+INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "64"))
+INGEST_EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+# Batas rate provider embedding (request dan perkiraan token per menit)
+INGEST_EMBED_RPM = int(os.getenv("INGEST_EMBED_RPM", "300"))
+INGEST_EMBED_TPM = int(os.getenv("INGEST_EMBED_TPM", "1000000"))
+
+def discover_pdfs(kb_root: str = KB_ROOT) -> List[str]:
+    return sorted(
+        path for path in glob.glob(os.path.join(kb_root, "**", "*"), recursive=True)
+        if path.lower().endswith(".pdf")
+    )
+
+def doc_type_for(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+def parse_pdf(path: str) -> List[Dict]:
+    """Parse satu PDF (dijalankan di process pool); return halaman sebagai dict agar murah di-pickle"""
+    from langchain_community.document_loaders import PyPDFLoader
+    doc_type = doc_type_for(path)
+    pages = []
+    for doc in PyPDFLoader(path).load():
+        doc.metadata["doc_type"] = doc_type
+        pages.append({"page_content": doc.page_content, "metadata": doc.metadata})
+    return pages
+
+class StageStats:
+    """Jumlah item dan rentang waktu (wall clock) satu tahap pipeline"""
+
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def record(self, items: int, started: float):
+        self.items += items
+        self.started = started if self.started is None else min(self.started, started)
+        self.finished = time.perf_counter()
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished - self.started) if self.started is not None else 0.0
+
+    def line(self) -> str:
+        rate = self.items / self.seconds if self.seconds > 0 else 0.0
+        return f"{self.name:<10} {self.items:>8} {self.unit:<8} {self.seconds:>9.2f} s {rate:>10.1f} {self.unit}/s"
+
+class TokenBucket:
+    """Rate limiter token bucket async: kapasitas satu menit, diisi ulang kontinu"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, cost: float = 1.0):
+        cost = min(cost, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+                await asyncio.sleep((cost - self.tokens) / self.rate)
+
+def iter_parsed_files(pdf_files: List[str], page_cache: PageCache, stats: StageStats,
+                      failed: Optional[Set[str]] = None,
+                      workers: int = INGEST_PARSE_WORKERS) -> Iterator[Tuple[str, str, List[Document]]]:
+    """
+    Yield (path, sha256, halaman) per file: file yang ada di page cache langsung, sisanya
+    di-parse paralel di process pool dan di-yield sesuai urutan selesai.
+    File yang gagal di-parse tidak di-yield dan dicatat di failed.
+    """
+    pending = {}
+    for path in pdf_files:
+        started = time.perf_counter()
+        file_hash = file_sha256(path)
+        pages = page_cache.get(file_hash)
+        if pages is not None:
+            stats.record(len(pages), started)
+            yield path, file_hash, pages
+        else:
+            pending[path] = file_hash
+    if not pending:
+        return
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(parse_pdf, path): path for path in pending}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                pages = [Document(page_content=p["page_content"], metadata=p["metadata"]) for p in future.result()]
+            except Exception as e:
+                print(f"Error loading {path}: {e}")
+                if failed is not None:
+                    failed.add(path)
+                continue
+            page_cache.put(pending[path], pages)
+            stats.record(len(pages), started)
+            yield path, pending[path], pages
+
+def iter_file_chunks(parsed: Iterator[Tuple[str, str, List[Document]]], splitter,
+                     stats: StageStats) -> Iterator[Tuple[str, str, List[Document]]]:
+    """Yield (path, sha256, chunks) per file, streaming dari tahap parsing"""
+    for path, file_hash, pages in parsed:
+        started = time.perf_counter()
+        chunks = splitter.split_documents(pages)
+        stats.record(len(chunks), started)
+        yield path, file_hash, chunks
+
+class IngestPipeline:
+    """
+    Tahap embed + tulis: chunk baru dikumpulkan per batch, di-embed bersamaan (dibatasi
+    concurrency dan token bucket), lalu ditulis ke Redis lewat pipeline sementara batch
+    berikutnya masih di-embed. Manifest satu file diperbarui setelah semua chunk-nya tertulis.
+    """
+
+    def __init__(self, vectorstore, manifest: IngestManifest, checkpoint: IngestCheckpoint,
+                 batch_size: int = INGEST_EMBED_BATCH, concurrency: int = INGEST_EMBED_CONCURRENCY,
+                 rpm: int = INGEST_EMBED_RPM, tpm: int = INGEST_EMBED_TPM):
+        self.vectorstore = vectorstore
+        self.manifest = manifest
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self.embed_stats = StageStats("embed", "chunks")
+        self.write_stats = StageStats("write", "chunks")
+        self.counts = {"new_files": 0, "changed_files": 0, "unchanged_files": 0, "removed_files": 0,
+                       "failed_files": 0, "added": 0, "deleted": 0, "resumed": 0}
+        self._remaining: Dict[str, int] = {}
+        self._finish: Dict[str, Tuple[str, List[str], List[str]]] = {}
+
+    def _records(self, batch: List[Tuple[str, str, Document]], vectors: List[List[float]]) -> List[Dict]:
+        """Record hash dengan format yang sama seperti RedisVectorStore.add_texts"""
+        config = self.vectorstore.config
+        records = []
+        for (_, _, chunk), vector in zip(batch, vectors):
+            record = {
+                config.content_field: chunk.page_content,
+                config.embedding_field: array_to_buffer(vector, dtype=config.vector_datatype),
+                "_index_name": config.index_name,
+                "_metadata_json": json.dumps(chunk.metadata),
+            }
+            for name, value in chunk.metadata.items():
+                if value is None:
+                    continue
+                record[name] = config.default_tag_separator.join(value) if isinstance(value, list) else value
+            records.append(record)
+        return records
+
+    def _write(self, batch: List[Tuple[str, str, Document]], vectors: List[List[float]]):
+        started = time.perf_counter()
+        keys = [key for _, key, _ in batch]
+        prefix = self.vectorstore.config.key_prefix
+        self.vectorstore.index.load(self._records(batch, vectors), keys=[f"{prefix}:{k}" for k in keys])
+        self.checkpoint.add(keys)
+        self.write_stats.record(len(batch), started)
+
+    def _complete_file(self, path: str):
+        """Semua chunk baru file sudah tertulis: hapus chunk lama dan catat file di manifest"""
+        file_hash, keys, delete = self._finish.pop(path)
+        if delete:
+            self.vectorstore.delete(ids=delete)
+            self.counts["deleted"] += len(delete)
+        self.manifest.save_file(path, file_hash, keys)
+
+    async def _process_batch(self, batch: List[Tuple[str, str, Document]]):
+        async with self._semaphore:
+            texts = [chunk.page_content for _, _, chunk in batch]
+            await self._requests.acquire()
+            await self._tokens.acquire(sum(len(t) for t in texts) / 4)
+            started = time.perf_counter()
+            vectors = await self.vectorstore.embeddings.aembed_documents(texts)
+            self.embed_stats.record(len(batch), started)
+        await asyncio.to_thread(self._write, batch, vectors)
+        for path, _, _ in batch:
+            self._remaining[path] -= 1
+            if self._remaining[path] == 0:
+                await asyncio.to_thread(self._complete_file, path)
+
+    async def run(self, file_chunks: Iterator[Tuple[str, str, List[Document]]], previous: Dict[str, Dict],
+                  failed: Optional[Set[str]] = None) -> List[Document]:
+        """
+        Proses semua file dari generator; return semua chunk saat ini (untuk index BM25).
+        Generator (parsing di process pool) dijalankan di thread agar event loop tetap jalan.
+        File di failed (gagal di-parse) bukan file yang dihapus: chunk dan manifest-nya dibiarkan.
+        """
+        failed = failed if failed is not None else set()
+        done = await asyncio.to_thread(self.checkpoint.load)
+        all_chunks: List[Document] = []
+        seen: Set[str] = set()
+        tasks = []
+        batch: List[Tuple[str, str, Document]] = []
+        iterator = iter(file_chunks)
+        while True:
+            item = await asyncio.to_thread(next, iterator, None)
+            if item is None:
+                break
+            path, file_hash, chunks = item
+            seen.add(path)
+            all_chunks.extend(chunks)
+            entry = previous.get(path)
+            if entry is not None and entry["sha256"] == file_hash:
+                self.counts["unchanged_files"] += 1
+                continue
+            self.counts["changed_files" if entry is not None else "new_files"] += 1
+
+            add, delete = diff_file(entry, chunks)
+            keys = sorted({chunk_key(chunk) for chunk in chunks})
+            pending = [(key, chunk) for key, chunk in add if key not in done]
+            self.counts["added"] += len(pending)
+            self.counts["resumed"] += len(add) - len(pending)
+            self._finish[path] = (file_hash, keys, delete)
+            self._remaining[path] = len(pending)
+            if not pending:
+                await asyncio.to_thread(self._complete_file, path)
+                continue
+            for key, chunk in pending:
+                batch.append((path, key, chunk))
+                if len(batch) >= self.batch_size:
+                    tasks.append(asyncio.create_task(self._process_batch(batch)))
+                    batch = []
+        if batch:
+            tasks.append(asyncio.create_task(self._process_batch(batch)))
+        await asyncio.gather(*tasks)
+
+        self.counts["failed_files"] = len(failed)
+        for path, entry in previous.items():
+            if path not in seen and path not in failed:
+                self.counts["removed_files"] += 1
+                if entry["chunks"]:
+                    await asyncio.to_thread(self.vectorstore.delete, entry["chunks"])
+                    self.counts["deleted"] += len(entry["chunks"])
+                await asyncio.to_thread(self.manifest.remove_file, path)
+        await asyncio.to_thread(self.checkpoint.clear)
+        return all_chunks
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.counts["added"] or self.counts["resumed"] or self.counts["deleted"]
+                    or self.counts["new_files"] or self.counts["changed_files"] or self.counts["removed_files"])
+
+def throughput_report(stages: List[StageStats]) -> str:
+    lines = [f"{'tahap':<10} {'jumlah':>8} {'satuan':<8} {'durasi':>11} {'throughput':>12}"]
+    lines += [stage.line() for stage in stages]
+    return "\n".join(lines)
@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional, Tuple
+from uuid import UUID
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.outputs import LLMResult
+from services.metrics import LLM_CALL_LATENCY, LLM_COST_USD, LLM_TOKENS
+from services.resilient_llm import CallPolicy, ResilientLLM
+
+load_dotenv()
+
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+
+# Role -> "provider:model". Override per role lewat env, misal LLM_MEMORY_EXTRACTION=ollama:qwen3:4b
+ROLES = ("planner", "final_answer", "memory_extraction", "summarization")
+DEFAULT_ROLE_MODELS = {
+    # planner: ReAct loop dengan tool calling, butuh model yang kuat
+    "planner": "google:gemini-2.5-flash",
+    # final_answer sama dengan planner = jawaban planner langsung dipakai (tanpa panggilan tambahan)
+    "final_answer": "google:gemini-2.5-flash",
+    # klasifikasi dan ringkasan cukup memakai model kecil
+    "memory_extraction": "google:gemini-2.5-flash-lite",
+    "summarization": "google:gemini-2.5-flash-lite",
+}
+
+# Harga USD per 1 juta token (input, output); override lewat LLM_PRICES="model=in:out,..."
+DEFAULT_PRICES = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+def _parse_prices(raw: str) -> Dict[str, Tuple[float, float]]:
+    prices = dict(DEFAULT_PRICES)
+    for item in raw.split(","):
+        if "=" not in item:
+            continue
+        model, _, price = item.partition("=")
+        try:
+            input_price, output_price = (float(p) for p in price.split(":"))
+        except ValueError:
+            continue
+        prices[model.strip()] = (input_price, output_price)
+    return prices
+
+LLM_PRICES = _parse_prices(os.getenv("LLM_PRICES", ""))
+
+def get_role_spec(role: str) -> Tuple[str, str]:
+    """Return (provider, model) untuk role dari env LLM_<ROLE> atau default"""
+    if role not in ROLES:
+        raise ValueError(f"Role LLM tidak dikenal: {role}")
+    spec = os.getenv(f"LLM_{role.upper()}", DEFAULT_ROLE_MODELS[role])
+    provider, _, model = spec.partition(":")
+    if not model:
+        raise ValueError(f"Format LLM_{role.upper()} harus provider:model, didapat '{spec}'")
+    return provider.strip().lower(), model.strip()
+
+def _google(model: str, **kwargs) -> BaseChatModel:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=GOOGLE_API_KEY,
+        temperature=0,
+        convert_system_message_to_human=True,
+        # Satu attempt saja: retry, deadline, dan hedging diatur oleh ResilientLLM
+        max_retries=1,
+        **kwargs,
+    )
+
+def _ollama(model: str, **kwargs) -> BaseChatModel:
+    from langchain_ollama import ChatOllama
+    return ChatOllama(model=model, base_url=OLLAMA_BASE_URL, temperature=0, **kwargs)
+
+def _openrouter(model: str, **kwargs) -> BaseChatModel:
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        model=model,
+        openai_api_base=OPENROUTER_BASE_URL,
+        openai_api_key=OPENROUTER_API_KEY,
+        temperature=0,
+        max_retries=0,
+        **kwargs,
+    )
+
+PROVIDERS: Dict[str, Callable[..., BaseChatModel]] = {
+    "google": _google,
+    "ollama": _ollama,
+    "openrouter": _openrouter,
+}
+
+def register_provider(name: str, factory: Callable[..., BaseChatModel]):
+    """Daftarkan provider baru: factory(model, callbacks=[...]) -> chat model"""
+    PROVIDERS[name] = factory
+
+class RoleStats:
+    """Statistik panggilan LLM per role (proses ini saja; agregat antar worker ada di /metrics)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {
+            "calls": 0, "errors": 0, "total_seconds": 0.0,
+            "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+        })
+
+    def record(self, role: str, model: str, seconds: float, input_tokens: int = 0,
+               output_tokens: int = 0, cost: float = 0.0, error: bool = False):
+        with self._lock:
+            stats = self._stats[(role, model)]
+            stats["calls"] += 1
+            stats["errors"] += int(error)
+            stats["total_seconds"] += seconds
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            stats["cost_usd"] += cost
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            result = {}
+            for (role, model), stats in self._stats.items():
+                result[role] = {
+                    "model": model,
+                    **stats,
+                    "total_seconds": round(stats["total_seconds"], 3),
+                    "avg_seconds": round(stats["total_seconds"] / stats["calls"], 3) if stats["calls"] else 0.0,
+                    "cost_usd": round(stats["cost_usd"], 6),
+                }
+            return result
+
+role_stats = RoleStats()
+
+def _usage_from_result(response: LLMResult) -> Tuple[int, int]:
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    return 0, 0
+
+class RoleCallbackHandler(BaseCallbackHandler):
+    """Catat latency, token, dan biaya setiap panggilan model milik satu role"""
+
+    run_inline = True
+
+    def __init__(self, role: str, model: str):
+        self.role = role
+        self.model = model
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        seconds = time.perf_counter() - self._started.pop(run_id, time.perf_counter())
+        input_tokens, output_tokens = _usage_from_result(response)
+        input_price, output_price = LLM_PRICES.get(self.model, (0.0, 0.0))
+        cost = (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+        LLM_CALL_LATENCY.labels(role=self.role, model=self.model, status="ok").observe(seconds)
+        LLM_TOKENS.labels(role=self.role, model=self.model, direction="in").inc(input_tokens)
+        LLM_TOKENS.labels(role=self.role, model=self.model, direction="out").inc(output_tokens)
+        LLM_COST_USD.labels(role=self.role, model=self.model).inc(cost)
+        role_stats.record(self.role, self.model, seconds, input_tokens, output_tokens, cost)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        seconds = time.perf_counter() - self._started.pop(run_id, time.perf_counter())
+        LLM_CALL_LATENCY.labels(role=self.role, model=self.model, status="error").observe(seconds)
+        role_stats.record(self.role, self.model, seconds, error=True)
+
+_models: Dict[str, ResilientLLM] = {}
+_models_lock = threading.Lock()
+
+def get_model(role: str) -> ResilientLLM:
+    """Chat model untuk role (dibungkus ResilientLLM), dibuat sekali per proses dari konfigurasi provider"""
+    if role not in _models:
+        with _models_lock:
+            if role not in _models:
+                provider, model = get_role_spec(role)
+                if provider not in PROVIDERS:
+                    raise ValueError(f"Provider LLM tidak dikenal untuk role {role}: {provider}")
+                chat_model = PROVIDERS[provider](model, callbacks=[RoleCallbackHandler(role, model)])
+                _models[role] = ResilientLLM(chat_model, CallPolicy(role))
+    return _models[role]
+
+def set_model(role: str, model: Optional[BaseChatModel]):
+    """Ganti model untuk role (misal fake model untuk benchmark); None = kembali ke konfigurasi"""
+    with _models_lock:
+        if model is None:
+            _models.pop(role, None)
+        else:
+            _models[role] = ResilientLLM(model, CallPolicy(role))
+
+def has_separate_final_answer_model() -> bool:
+    """True jika jawaban akhir dibuat oleh model yang berbeda dari planner"""
+    return get_role_spec("final_answer") != get_role_spec("planner")
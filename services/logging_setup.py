@@ -0,0 +1,143 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+# Level default dan override per modul, format: "httpx=WARNING,tools.memory_tool=DEBUG"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "httpx=WARNING,httpcore=WARNING,urllib3=WARNING,redisvl=WARNING")
+# json (satu objek per baris) atau text untuk development lokal
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Payload besar (isi pesan, response, hasil tool) hanya dicatat untuk sebagian request
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "2000"))
+
+_trace_id: ContextVar[str] = ContextVar("trace_id", default="-")
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# Atribut bawaan LogRecord; atribut lain (dari extra=...) ikut ditulis sebagai field JSON
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "trace_id"}
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+def set_trace_id(trace_id: Optional[str] = None) -> str:
+    """Pasang trace ID untuk context saat ini (diwarisi node graph, tool, dan thread pool)"""
+    trace_id = trace_id or new_trace_id()
+    _trace_id.set(trace_id)
+    return trace_id
+
+def get_trace_id() -> str:
+    return _trace_id.get()
+
+class TraceIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = _trace_id.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "trace_id": getattr(record, "trace_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def _parse_levels(raw: str) -> Dict[str, str]:
+    levels = {}
+    for item in raw.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def configure_logging():
+    """
+    Pasang logging proses: semua record masuk ke QueueHandler (non-blocking), lalu
+    ditulis ke stdout oleh thread QueueListener. Aman dipanggil berkali-kali.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s"
+        ))
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # Trace ID harus diambil di thread pemanggil, sebelum record masuk antrian
+    queue_handler.addFilter(TraceIdFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+    for name, level in _parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+def shutdown_logging():
+    """Flush antrian log dan hentikan thread listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def log_payload(logger: logging.Logger, message: str, payload: Any, rate: Optional[float] = None):
+    """Catat payload verbose di level DEBUG, hanya untuk sebagian kecil panggilan (sampling)"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if random.random() >= (LOG_PAYLOAD_SAMPLE_RATE if rate is None else rate):
+        return
+    text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+    if len(text) > LOG_PAYLOAD_MAX_CHARS:
+        text = text[:LOG_PAYLOAD_MAX_CHARS] + "...(dipotong)"
+    logger.debug(message, extra={"payload": text})
+
+class TraceIdMiddleware:
+    """
+    Middleware ASGI: trace ID dari header X-Request-ID (atau baru) dipasang di context
+    request, sehingga ikut ke node graph, tool, dan body streaming; dikembalikan di response.
+    """
+
+    header = b"x-request-id"
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        incoming = dict(scope.get("headers") or []).get(self.header, b"").decode("latin-1")
+        trace_id = set_trace_id(incoming[:64] or None)
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(self.header, trace_id.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_with_trace_id)
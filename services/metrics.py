@@ -0,0 +1,171 @@
+import functools
+import os
+import time
+from typing import Iterable, List
+from langchain_core.embeddings import Embeddings
+from langgraph.store.base import BaseStore, GetOp, ListNamespacesOp, PutOp, SearchOp
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+CHAT_REQUEST_LATENCY = Histogram(
+    "sribot_chat_request_seconds", "Durasi request chat end-to-end", ["endpoint"], buckets=_LATENCY_BUCKETS
+)
+NODE_LATENCY = Histogram(
+    "sribot_graph_node_seconds", "Durasi eksekusi node graph", ["node"], buckets=_LATENCY_BUCKETS
+)
+TOOL_LATENCY = Histogram(
+    "sribot_tool_seconds", "Durasi eksekusi tool", ["tool", "status"], buckets=_LATENCY_BUCKETS
+)
+DB_QUERY_LATENCY = Histogram(
+    "sribot_db_query_seconds", "Durasi query Postgres", ["query"], buckets=_LATENCY_BUCKETS
+)
+REDIS_LATENCY = Histogram(
+    "sribot_redis_seconds", "Durasi operasi Redis (vector search, memory store)", ["operation"], buckets=_LATENCY_BUCKETS
+)
+EMBEDDING_LATENCY = Histogram(
+    "sribot_embedding_seconds", "Durasi panggilan embedding", ["operation"], buckets=_LATENCY_BUCKETS
+)
+EMBEDDING_CACHE_REQUESTS = Counter(
+    "sribot_embedding_cache_total", "Lookup embedding cache per hasil", ["result"]
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "sribot_embedding_batch_size", "Jumlah query per panggilan batch embedding", buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+LLM_TOKENS_PER_TURN = Histogram(
+    "sribot_llm_tokens_per_turn", "Token LLM per turn", ["direction"], buckets=_TOKEN_BUCKETS
+)
+REACT_LOOP_DEPTH = Histogram(
+    "sribot_react_loop_depth", "Jumlah panggilan LLM assistant per request", buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20)
+)
+LLM_CALL_LATENCY = Histogram(
+    "sribot_llm_call_seconds", "Durasi satu panggilan LLM per role", ["role", "model", "status"], buckets=_LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "sribot_llm_tokens_total", "Token LLM per role", ["role", "model", "direction"]
+)
+LLM_COST_USD = Counter(
+    "sribot_llm_cost_usd_total", "Perkiraan biaya LLM (USD) per role", ["role", "model"]
+)
+LLM_RESILIENCE_EVENTS = Counter(
+    "sribot_llm_resilience_events_total", "Hedge, retry, timeout, dan circuit breaker LLM", ["role", "event"]
+)
+LOOP_BUDGET_EXHAUSTED = Counter(
+    "sribot_loop_budget_exhausted_total", "ReAct loop yang dihentikan karena budget habis", ["reason"]
+)
+PREFETCH_REQUESTS = Counter(
+    "sribot_prefetch_total", "Hasil speculative prefetch per jenis", ["kind", "result"]
+)
+ROUTER_REQUESTS = Counter(
+    "sribot_router_requests_total", "Hasil fast-path router", ["result", "intent"]
+)
+CHAT_DEDUP_REQUESTS = Counter(
+    "sribot_chat_dedup_requests_total", "Request /chat per hasil single-flight", ["outcome"]
+)
+ADMISSION_ACTIVE = Gauge(
+    "sribot_admission_active", "Eksekusi graph yang sedang berjalan", multiprocess_mode="livesum"
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "sribot_admission_queue_depth", "Request yang menunggu slot eksekusi", multiprocess_mode="livesum"
+)
+ADMISSION_REJECTED = Counter(
+    "sribot_admission_rejected_total", "Request yang ditolak admission control", ["reason"]
+)
+ADMISSION_WAIT = Histogram(
+    "sribot_admission_wait_seconds", "Waktu tunggu di antrian admission",
+    buckets=_LATENCY_BUCKETS
+)
+
+def render_metrics():
+    """Return (body, content_type) untuk endpoint /metrics"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Mode multi-worker uvicorn: gabungkan metrik dari semua proses
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+def timed_node(name: str, func):
+    """Bungkus node graph async agar durasinya tercatat di NODE_LATENCY"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            NODE_LATENCY.labels(node=name).observe(time.perf_counter() - start)
+    return wrapper
+
+def observe_turn(turn_messages: List) -> None:
+    """Catat token in/out dan kedalaman ReAct loop dari message satu turn"""
+    llm_messages = [m for m in turn_messages if getattr(m, "usage_metadata", None)]
+    REACT_LOOP_DEPTH.observe(len(llm_messages))
+    if llm_messages:
+        LLM_TOKENS_PER_TURN.labels(direction="in").observe(
+            sum(m.usage_metadata.get("input_tokens", 0) for m in llm_messages)
+        )
+        LLM_TOKENS_PER_TURN.labels(direction="out").observe(
+            sum(m.usage_metadata.get("output_tokens", 0) for m in llm_messages)
+        )
+
+_STORE_OP_NAMES = {
+    GetOp: "store_get",
+    SearchOp: "store_search",
+    PutOp: "store_put",
+    ListNamespacesOp: "store_list_namespaces",
+}
+
+def _store_operation(ops: List) -> str:
+    if not ops:
+        return "store_batch"
+    op = ops[0]
+    if isinstance(op, PutOp) and op.value is None:
+        return "store_delete"
+    return _STORE_OP_NAMES.get(type(op), "store_batch")
+
+class InstrumentedStore(BaseStore):
+    """BaseStore wrapper: semua operasi memory store tercatat di REDIS_LATENCY"""
+
+    def __init__(self, store: BaseStore):
+        self._store = store
+
+    def __getattr__(self, name):
+        return getattr(self._store, name)
+
+    def batch(self, ops: Iterable) -> list:
+        ops = list(ops)
+        with REDIS_LATENCY.labels(operation=_store_operation(ops)).time():
+            return self._store.batch(ops)
+
+    async def abatch(self, ops: Iterable) -> list:
+        ops = list(ops)
+        with REDIS_LATENCY.labels(operation=_store_operation(ops)).time():
+            return await self._store.abatch(ops)
+
+class InstrumentedEmbeddings(Embeddings):
+    """Embeddings wrapper: setiap panggilan tercatat di EMBEDDING_LATENCY"""
+
+    def __init__(self, embeddings: Embeddings):
+        self._embeddings = embeddings
+
+    def __getattr__(self, name):
+        return getattr(self._embeddings, name)
+
+    def embed_query(self, text: str, **kwargs) -> List[float]:
+        with EMBEDDING_LATENCY.labels(operation="query").time():
+            return self._embeddings.embed_query(text, **kwargs)
+
+    def embed_documents(self, texts: List[str], **kwargs) -> List[List[float]]:
+        with EMBEDDING_LATENCY.labels(operation="documents").time():
+            return self._embeddings.embed_documents(texts, **kwargs)
+
+    async def aembed_query(self, text: str, **kwargs) -> List[float]:
+        with EMBEDDING_LATENCY.labels(operation="query").time():
+            return await self._embeddings.aembed_query(text, **kwargs)
+
+    async def aembed_documents(self, texts: List[str], **kwargs) -> List[List[float]]:
+        with EMBEDDING_LATENCY.labels(operation="documents").time():
+            return await self._embeddings.aembed_documents(texts, **kwargs)
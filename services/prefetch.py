@@ -0,0 +1,113 @@
+import asyncio
+import os
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+from services.metrics import PREFETCH_REQUESTS
+from services.text_terms import tokenize
+
+# Speculative prefetch: retrieval untuk pesan user dimulai bersamaan dengan panggilan LLM
+# pertama; tool memakai hasilnya jika query dari model cukup mirip dengan pesan user
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+PREFETCH_CATALOG = os.getenv("PREFETCH_CATALOG", "false").lower() == "true"
+# Kemiripan minimum (Jaccard kata penting) antara query model dan pesan user
+PREFETCH_SIMILARITY = float(os.getenv("PREFETCH_SIMILARITY", "0.6"))
+# Pesan dengan kata penting lebih sedikit dari ini (misal "halo") tidak di-prefetch
+PREFETCH_MIN_TERMS = int(os.getenv("PREFETCH_MIN_TERMS", "2"))
+
+# Kata umum katalog yang tidak membantu pencarian nama produk
+CATALOG_GENERIC_WORDS = {"songket", "kain", "produk", "harga", "jual", "beli", "cari", "berapa", "info"}
+
+_current: ContextVar[Optional["SpeculativePrefetch"]] = ContextVar("speculative_prefetch", default=None)
+
+PREFETCH_STATS = Counter()
+
+def get_prefetch_stats() -> Dict[str, int]:
+    return dict(PREFETCH_STATS)
+
+def key_terms(text: str) -> Set[str]:
+    return set(tokenize(text))
+
+def query_similarity(a: str, b: str) -> float:
+    terms_a, terms_b = key_terms(a), key_terms(b)
+    if not terms_a or not terms_b:
+        return 0.0
+    return len(terms_a & terms_b) / len(terms_a | terms_b)
+
+def catalog_query(message: str) -> Optional[str]:
+    """Tebakan nama produk dari pesan: kata penting tanpa kata umum katalog (1-3 kata)"""
+    terms = [t for t in tokenize(message) if t not in CATALOG_GENERIC_WORDS]
+    if 1 <= len(terms) <= 3:
+        return " ".join(terms)
+    return None
+
+def _record(kind: str, result: str):
+    PREFETCH_STATS[f"{kind}:{result}"] += 1
+    PREFETCH_REQUESTS.labels(kind=kind, result=result).inc()
+
+class SpeculativePrefetch:
+    """Task prefetch untuk satu request; tool mengambil hasilnya lewat take()"""
+
+    def __init__(self):
+        self._tasks: Dict[str, Tuple[str, asyncio.Task, Callable[[str, str], bool]]] = {}
+        self._used: Set[str] = set()
+
+    def start(self, kind: str, query: str, fetch: Callable[[str], Awaitable[Any]],
+              matches: Callable[[str, str], bool]):
+        self._tasks[kind] = (query, asyncio.create_task(fetch(query)), matches)
+
+    async def take(self, kind: str, query: str) -> Optional[Any]:
+        """Hasil prefetch jika query mirip; None jika tidak ada, tidak mirip, atau gagal"""
+        entry = self._tasks.get(kind)
+        if entry is None or kind in self._used:
+            return None
+        prefetched_query, task, matches = entry
+        if not matches(prefetched_query, query):
+            _record(kind, "miss")
+            return None
+        try:
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            _record(kind, "error")
+            return None
+        self._used.add(kind)
+        _record(kind, "hit")
+        return result
+
+    def close(self):
+        """Batalkan prefetch yang tidak terpakai"""
+        for kind, (_, task, _) in self._tasks.items():
+            if kind in self._used:
+                continue
+            task.cancel()
+            _record(kind, "unused")
+        self._tasks.clear()
+
+def _similar(prefetched: str, query: str) -> bool:
+    return query_similarity(prefetched, query) >= PREFETCH_SIMILARITY
+
+def _same(prefetched: str, query: str) -> bool:
+    return " ".join(prefetched.lower().split()) == " ".join(query.lower().split())
+
+def start_prefetch(message: str) -> Optional[SpeculativePrefetch]:
+    """
+    Mulai prefetch untuk pesan user dan pasang di context saat ini (diwarisi node dan tool
+    graph). Return None jika prefetch dimatikan atau pesan terlalu pendek.
+    """
+    if not PREFETCH_ENABLED or len(key_terms(message)) < PREFETCH_MIN_TERMS:
+        return None
+    from tools.rag_tools import aretrieve_documents
+    from tools.database_tools import asearch_product_by_name
+
+    prefetch = SpeculativePrefetch()
+    prefetch.start("search_documents", message, aretrieve_documents, _similar)
+    product_query = catalog_query(message) if PREFETCH_CATALOG else None
+    if product_query:
+        prefetch.start("search_product_by_name", product_query, asearch_product_by_name, _same)
+    _current.set(prefetch)
+    return prefetch
+
+def current_prefetch() -> Optional[SpeculativePrefetch]:
+    return _current.get()
@@ -0,0 +1,279 @@
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional
+from langchain_core.tracers._streaming import _StreamingCallbackHandler
+from services.metrics import LLM_RESILIENCE_EVENTS
+
+# Batas waktu satu panggilan LLM; dipotong lagi oleh sisa budget request jika ada
+LLM_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "4"))
+# Hedging: kirim duplikat jika panggilan pertama belum selesai setelah p95 latency.
+# Trade-off: memotong p99 (ekor lambat provider), tetapi menambah panggilan ke provider dan
+# memperburuk p50/p95 (benchmarks/llm_resilience.py: p50 sekitar 8 -> 11 ms, p95 bisa naik hingga 2x). Panggilan yang di-stream ke client tidak di-hedge.
+LLM_HEDGING = os.getenv("LLM_HEDGING", "false").lower() == "true"
+LLM_HEDGE_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "8"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Circuit breaker: buka setelah N kegagalan berturut-turut, coba lagi setelah cooldown
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+# Budget total per request chat (detik), dipasang oleh endpoint lewat request_budget()
+CHAT_REQUEST_BUDGET_SECONDS = float(os.getenv("CHAT_REQUEST_BUDGET_SECONDS", "60"))
+
+_request_deadline: ContextVar[Optional[float]] = ContextVar("llm_request_deadline", default=None)
+
+@contextmanager
+def request_budget(seconds: float = CHAT_REQUEST_BUDGET_SECONDS):
+    """Pasang deadline request; semua panggilan LLM di dalamnya dibatasi sisa budget"""
+    token = _request_deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+def start_request_budget(seconds: float = CHAT_REQUEST_BUDGET_SECONDS):
+    """Seperti request_budget(), tanpa reset: untuk task/generator yang context-nya milik sendiri"""
+    _request_deadline.set(time.monotonic() + seconds)
+
+def remaining_budget() -> Optional[float]:
+    deadline = _request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+class LLMDeadlineExceeded(TimeoutError):
+    """Panggilan LLM melewati deadline (per panggilan atau sisa budget request)"""
+
+class CircuitOpenError(RuntimeError):
+    """Circuit breaker terbuka: provider dianggap sedang bermasalah"""
+
+_TRANSIENT_NAMES = {
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError",
+    "TooManyRequests", "RateLimitError", "APIConnectionError", "APITimeoutError",
+}
+_TRANSIENT_STATUS = re.compile(r"\b(429|500|502|503|504)\b")
+
+def is_transient_error(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in _TRANSIENT_NAMES:
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status in (429, 500, 502, 503, 504):
+        return True
+    return bool(_TRANSIENT_STATUS.search(str(error)))
+
+class CircuitBreaker:
+    """closed -> open setelah `threshold` kegagalan berturut-turut -> half-open setelah cooldown"""
+
+    def __init__(self, threshold: int = LLM_BREAKER_THRESHOLD, cooldown: float = LLM_BREAKER_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                # Satu panggilan percobaan; hasilnya menentukan circuit ditutup atau dibuka lagi
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Return True jika kegagalan ini membuka circuit"""
+        with self._lock:
+            self._failures += 1
+            was_open = self._opened_at is not None
+            if self._trial_in_flight or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+                return not was_open
+            return False
+
+class CallPolicy:
+    """State bersama untuk satu role: latency terakhir (untuk p95) dan circuit breaker"""
+
+    def __init__(self, role: str, timeout: float = LLM_CALL_TIMEOUT_SECONDS, max_retries: int = LLM_MAX_RETRIES,
+                 hedging: bool = LLM_HEDGING, hedge_delay: float = LLM_HEDGE_DELAY_SECONDS,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.role = role
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.hedging = hedging
+        self.hedge_delay = hedge_delay
+        self.breaker = breaker or CircuitBreaker()
+        self._latencies = deque(maxlen=200)
+
+    def observe(self, seconds: float):
+        self._latencies.append(seconds)
+
+    def hedge_after(self) -> float:
+        """Delay sebelum duplikat dikirim: p95 latency terakhir, atau default jika sampel kurang"""
+        if len(self._latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return self.hedge_delay
+        ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def event(self, name: str):
+        LLM_RESILIENCE_EVENTS.labels(role=self.role, event=name).inc()
+
+    def attempt_timeout(self) -> float:
+        remaining = remaining_budget()
+        timeout = self.timeout if remaining is None else min(self.timeout, remaining)
+        if timeout <= 0:
+            self.event("budget_exhausted")
+            raise LLMDeadlineExceeded(f"Budget request habis sebelum panggilan LLM ({self.role})")
+        return timeout
+
+    def backoff(self, attempt: int) -> float:
+        # Full jitter: acak di [0, base * 2^attempt]
+        return random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * (2 ** attempt)))
+
+def _is_streaming(config) -> bool:
+    """Config punya handler token stream (astream_events / stream_mode="messages")"""
+    callbacks = (config or {}).get("callbacks")
+    handlers = getattr(callbacks, "handlers", callbacks) or []
+    return any(isinstance(handler, _StreamingCallbackHandler) for handler in handlers)
+
+class ResilientLLM:
+    """
+    Bungkus chat model (atau hasil bind_tools) dengan deadline, retry ber-jitter,
+    hedging opsional, dan circuit breaker. Interface: invoke/ainvoke/bind_tools.
+    """
+
+    def __init__(self, runnable: Any, policy: CallPolicy):
+        self.runnable = runnable
+        self.policy = policy
+
+    def bind_tools(self, tools, **kwargs) -> "ResilientLLM":
+        return ResilientLLM(self.runnable.bind_tools(tools, **kwargs), self.policy)
+
+    def __getattr__(self, name):
+        return getattr(self.runnable, name)
+
+    async def _hedged(self, input, config, timeout: float, **kwargs):
+        """Panggilan pertama, plus duplikat setelah p95; hasil yang datang duluan dipakai"""
+        primary = asyncio.ensure_future(self.runnable.ainvoke(input, config, **kwargs))
+        if not self.policy.hedging:
+            return await asyncio.wait_for(primary, timeout)
+        if _is_streaming(config):
+            # Token panggilan pertama sudah terkirim ke client; jawaban duplikat yang menang
+            # akan berbeda dari token tersebut, jadi panggilan yang di-stream tidak di-hedge
+            self.policy.event("hedge_skipped_streaming")
+            return await asyncio.wait_for(primary, timeout)
+
+        deadline = time.monotonic() + timeout
+        done, _ = await asyncio.wait({primary}, timeout=min(self.policy.hedge_after(), timeout))
+        if done:
+            return primary.result()
+
+        self.policy.event("hedge_started")
+        # Duplikat memakai config yang sama agar tercatat di trace run parent
+        hedge = asyncio.ensure_future(self.runnable.ainvoke(input, config, **kwargs))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.policy.event("hedge_won")
+                        return task.result()
+            # Keduanya gagal: naikkan error dari panggilan pertama
+            return primary.result()
+        finally:
+            for task in (primary, hedge):
+                if not task.done():
+                    task.cancel()
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        policy = self.policy
+        attempt = 0
+        while True:
+            if not policy.breaker.allow():
+                policy.event("circuit_rejected")
+                raise CircuitOpenError(f"Circuit breaker LLM '{policy.role}' sedang terbuka")
+            timeout = policy.attempt_timeout()
+            start = time.monotonic()
+            try:
+                result = await self._hedged(input, config, timeout, **kwargs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    policy.event("timeout")
+                    e = LLMDeadlineExceeded(f"Panggilan LLM '{policy.role}' melewati {timeout:.1f}s")
+                transient = is_transient_error(e)
+                if not transient:
+                    # Provider menjawab (misal 400): bukan tanda provider bermasalah
+                    policy.breaker.record_success()
+                elif policy.breaker.record_failure():
+                    policy.event("circuit_opened")
+                delay = policy.backoff(attempt)
+                remaining = remaining_budget()
+                if not transient or attempt >= policy.max_retries or (remaining is not None and remaining <= delay):
+                    raise e
+                attempt += 1
+                policy.event("retry")
+                await asyncio.sleep(delay)
+                continue
+            policy.breaker.record_success()
+            policy.observe(time.monotonic() - start)
+            return result
+
+    def invoke(self, input, config=None, **kwargs):
+        """Versi sync: circuit breaker dan retry saja (panggilan sync tidak bisa dibatalkan)"""
+        policy = self.policy
+        attempt = 0
+        while True:
+            if not policy.breaker.allow():
+                policy.event("circuit_rejected")
+                raise CircuitOpenError(f"Circuit breaker LLM '{policy.role}' sedang terbuka")
+            start = time.monotonic()
+            try:
+                result = self.runnable.invoke(input, config, **kwargs)
+            except Exception as e:
+                transient = is_transient_error(e)
+                if not transient:
+                    policy.breaker.record_success()
+                elif policy.breaker.record_failure():
+                    policy.event("circuit_opened")
+                if not transient or attempt >= policy.max_retries:
+                    raise
+                time.sleep(policy.backoff(attempt))
+                attempt += 1
+                policy.event("retry")
+                continue
+            policy.breaker.record_success()
+            policy.observe(time.monotonic() - start)
+            return result
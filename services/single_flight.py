@@ -0,0 +1,79 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from services.metrics import CHAT_DEDUP_REQUESTS
+
+# Hasil yang sudah selesai disimpan sebentar agar retry klien tidak menjalankan graph lagi
+CHAT_DEDUP_WINDOW_SECONDS = float(os.getenv("CHAT_DEDUP_WINDOW_SECONDS", "30"))
+CHAT_DEDUP_MAX_ENTRIES = int(os.getenv("CHAT_DEDUP_MAX_ENTRIES", "1000"))
+
+def chat_request_key(user_id: str, session_id: str, message: str, idempotency_key: Optional[str] = None) -> str:
+    """
+    Key coalescing untuk satu request chat. Idempotency key dari klien dipakai jika ada
+    (tetap di-scope per user agar key milik user lain tidak bisa dipakai ulang).
+    """
+    if idempotency_key:
+        return f"idem:{user_id}:{idempotency_key}"
+    normalized = " ".join(message.split()).lower()
+    digest = hashlib.sha256(f"{user_id}\x00{session_id}\x00{normalized}".encode("utf-8")).hexdigest()
+    return f"msg:{digest}"
+
+class SingleFlight:
+    """
+    Gabungkan eksekusi async dengan key yang sama: request yang datang saat eksekusi
+    masih berjalan menunggu hasil yang sama, dan hasil sukses disimpan selama `window`
+    detik. Exception tidak disimpan sehingga retry setelah error dijalankan ulang.
+    """
+
+    def __init__(self, window: float = CHAT_DEDUP_WINDOW_SECONDS, max_entries: int = CHAT_DEDUP_MAX_ENTRIES):
+        self.window = window
+        self.max_entries = max_entries
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._completed: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def _get_completed(self, key: str):
+        entry = self._completed.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self._completed[key]
+            return None
+        return entry
+
+    def _store(self, key: str, result: Any):
+        if self.window <= 0:
+            return
+        self._completed[key] = (time.monotonic() + self.window, result)
+        self._completed.move_to_end(key)
+        while len(self._completed) > self.max_entries:
+            self._completed.popitem(last=False)
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        completed = self._get_completed(key)
+        if completed is not None:
+            CHAT_DEDUP_REQUESTS.labels(outcome="replayed").inc()
+            return completed[1]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            CHAT_DEDUP_REQUESTS.labels(outcome="coalesced").inc()
+        else:
+            CHAT_DEDUP_REQUESTS.labels(outcome="executed").inc()
+            task = asyncio.create_task(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t))
+
+        # shield: klien yang disconnect tidak membatalkan eksekusi yang ditunggu request lain
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self._store(key, task.result())
+
+    def stats(self) -> Dict[str, int]:
+        return {"inflight": len(self._inflight), "completed": len(self._completed)}
@@ -0,0 +1,45 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+class StartupReport:
+    """Catat durasi setiap tahap startup worker agar cold start bisa diukur"""
+
+    def __init__(self):
+        self.stages: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def stage(self, name: str, required: bool = False):
+        """
+        Ukur satu tahap. Tahap opsional yang gagal hanya dicatat (komponennya akan
+        dicoba lagi secara lazy saat dipakai); tahap required menggagalkan startup.
+        """
+        start = time.perf_counter()
+        entry = {"stage": name, "status": "ok"}
+        try:
+            yield
+        except Exception as e:
+            entry["status"] = "error"
+            entry["error"] = str(e)
+            if required:
+                raise
+            logger.warning(f"Startup stage '{name}' gagal: {e}")
+        finally:
+            entry["seconds"] = round(time.perf_counter() - start, 4)
+            self.stages.append(entry)
+
+    def add(self, name: str, seconds: float):
+        self.stages.append({"stage": name, "status": "ok", "seconds": round(seconds, 4)})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_seconds": round(sum(s["seconds"] for s in self.stages), 4),
+            "stages": self.stages,
+        }
+
+    def log(self):
+        lines = [f"  {s['stage']:<24} {s['seconds']:>8.3f}s  {s['status']}" for s in self.stages]
+        logger.info("Startup breakdown:\n" + "\n".join(lines) + f"\n  {'total':<24} {self.as_dict()['total_seconds']:>8.3f}s")
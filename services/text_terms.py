@@ -0,0 +1,16 @@
+import re
+from typing import List
+
+# Kata umum (pertanyaan, kata sambung, sapaan) yang tidak membantu pencarian;
+# dipakai tokenizer BM25 dan pencocokan query speculative prefetch
+STOPWORDS = {
+    "apa", "apakah", "bagaimana", "gimana", "kenapa", "mengapa", "siapa", "kapan", "dimana", "mana",
+    "yang", "dan", "atau", "di", "ke", "dari", "untuk", "dengan", "pada", "dalam", "itu", "ini",
+    "saya", "aku", "kamu", "anda", "sri", "sribot", "tolong", "mohon", "dong", "ya", "kah", "sih",
+    "ceritakan", "jelaskan", "sebutkan", "tentang", "mengenai", "tahu", "tau", "ingin", "mau",
+    "bisa", "boleh", "ada", "adalah", "saja", "aja", "juga", "lagi", "nya", "the", "is", "what", "how",
+}
+
+def tokenize(text: str) -> List[str]:
+    """Kata penting (lowercase, tanpa stopword dan kata satu huruf), urutan dan duplikat dipertahankan"""
+    return [t for t in re.findall(r"\w+", text.lower()) if t not in STOPWORDS and len(t) > 1]
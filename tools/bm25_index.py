@@ -0,0 +1,86 @@
+"""
+Index BM25 sendiri (bukan bm25-retriever / rank_bm25 di requirements.txt) karena:
+- index disimpan di Redis di samping vector_db sebagai JSON terkompresi, sehingga semua
+  worker memuat index yang sama; bm25-retriever mem-pickle ke folder lokal, dan unpickle
+  data dari Redis bersama tidak aman
+- saat dimuat ulang, bm25-retriever membangun BM25Okapi dengan split spasi, sehingga
+  tokenizer (stopword Indonesia) hilang
+- filter doc_type harus diterapkan sebelum top-k; BM25Okapi menghitung skor semua dokumen
+  tanpa filter, sedangkan posting list di sini hanya menyentuh dokumen yang memuat term query
+"""
+import json
+import math
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from services.text_terms import tokenize
+
+# Parameter BM25 standar (Okapi)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+class BM25Index:
+    """
+    Index lexical BM25 in-process untuk chunk knowledge base. Melengkapi vector search
+    untuk query dengan nama motif/istilah langka yang kurang tertangkap embedding.
+    """
+
+    def __init__(self, documents: Optional[List[Document]] = None):
+        self.documents: List[Document] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.avgdl = 0.0
+        if documents:
+            self.build(documents)
+
+    def build(self, documents: List[Document]):
+        self.documents = list(documents)
+        self.doc_lengths = []
+        self.postings = {}
+        for doc_id, doc in enumerate(self.documents):
+            terms = tokenize(doc.page_content)
+            self.doc_lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+        self.avgdl = sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.documents) - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 10, doc_type: Optional[str] = None) -> List[Document]:
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self._idf(term)
+            for doc_id, tf in self.postings.get(term, ()):
+                if doc_type and self.documents[doc_id].metadata.get("doc_type") != doc_type:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / (self.avgdl or 1))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [self.documents[doc_id] for doc_id, _ in ranked]
+
+    def to_bytes(self) -> bytes:
+        """Serialisasi (JSON terkompresi) untuk disimpan di Redis di samping vector index"""
+        payload = [{"page_content": d.page_content, "metadata": d.metadata} for d in self.documents]
+        return zlib.compress(json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8"))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BM25Index":
+        payload = json.loads(zlib.decompress(data).decode("utf-8"))
+        return cls([Document(page_content=d["page_content"], metadata=d["metadata"]) for d in payload])
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 60) -> List[Document]:
+    """Gabungkan beberapa ranking dengan RRF: skor = sum(1 / (k + rank)), duplikat digabung per isi chunk"""
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
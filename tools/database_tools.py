@@ -1,8 +1,13 @@
 from langchain.tools import StructuredTool
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+import functools
 import psycopg2
 import os
 from dotenv import load_dotenv
+from tools.thread_pool import run_blocking
+from services.metrics import DB_QUERY_LATENCY
+from services.prefetch import current_prefetch
+from tools.rendering import render_tool_result
 from models.db_models import GetUMKMByIdArgs, GetProductsByUMKMArgs, SearchUMKMByNameArgs, SearchProductByNameArgs
 
 load_dotenv()
@@ -26,6 +31,17 @@ def get_connection():
         password=DB_PASS
     )
 
+def ping_database():
+    """Cek koneksi database (dipakai saat warmup startup)"""
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT 1")
+        cur.fetchone()
+        cur.close()
+    finally:
+        conn.close()
+
 def format_image_url(image_filename: str) -> Optional[str]:
     """Format image filename menjadi full URL"""
     if not image_filename:
@@ -41,13 +57,14 @@ def get_umkm_by_id(umkm_id: int) -> Dict[str, Any]:
     try:
         conn = get_connection()
         cur = conn.cursor()
-        cur.execute("""
-            SELECT umkm_id, umkm_name, umkm_about, umkm_notelp, umkm_email, 
-                   umkm_alamat, umkm_sosmed, umkm_image
-            FROM UMKM_Profile
-            WHERE umkm_id = %s
-        """, (umkm_id,))
-        row = cur.fetchone()
+        with DB_QUERY_LATENCY.labels(query="get_umkm_by_id").time():
+            cur.execute("""
+                SELECT umkm_id, umkm_name, umkm_about, umkm_notelp, umkm_email, 
+                       umkm_alamat, umkm_sosmed, umkm_image
+                FROM UMKM_Profile
+                WHERE umkm_id = %s
+            """, (umkm_id,))
+            row = cur.fetchone()
         cur.close()
         conn.close()
         
@@ -74,13 +91,14 @@ def get_products_by_umkm(umkm_id: int) -> Dict[str, Any]:
     try:
         conn = get_connection()
         cur = conn.cursor()
-        cur.execute("""
-            SELECT product_id, product_name, product_desc, product_price, 
-                   product_stock, product_image
-            FROM Product
-            WHERE umkm_id = %s
-        """, (umkm_id,))
-        rows = cur.fetchall()
+        with DB_QUERY_LATENCY.labels(query="get_products_by_umkm").time():
+            cur.execute("""
+                SELECT product_id, product_name, product_desc, product_price, 
+                       product_stock, product_image
+                FROM Product
+                WHERE umkm_id = %s
+            """, (umkm_id,))
+            rows = cur.fetchall()
         cur.close()
         conn.close()
         
@@ -108,12 +126,13 @@ def search_umkm_by_name(name: str) -> Dict[str, Any]:
     try:
         conn = get_connection()
         cur = conn.cursor()
-        cur.execute("""
-            SELECT umkm_id, umkm_name, umkm_alamat, umkm_sosmed, umkm_image
-            FROM UMKM_Profile
-            WHERE umkm_name ILIKE %s
-        """, (f"%{name}%",))
-        rows = cur.fetchall()
+        with DB_QUERY_LATENCY.labels(query="search_umkm_by_name").time():
+            cur.execute("""
+                SELECT umkm_id, umkm_name, umkm_alamat, umkm_sosmed, umkm_image
+                FROM UMKM_Profile
+                WHERE umkm_name ILIKE %s
+            """, (f"%{name}%",))
+            rows = cur.fetchall()
         cur.close()
         conn.close()
         
@@ -140,14 +159,15 @@ def search_product_by_name(product_name: str) -> Dict[str, Any]:
     try:
         conn = get_connection()
         cur = conn.cursor()
-        cur.execute("""
-            SELECT p.product_id, p.product_name, p.product_desc, p.product_price, 
-                   p.product_stock, p.product_image, u.umkm_name, p.umkm_id
-            FROM Product p
-            JOIN UMKM_Profile u ON p.umkm_id = u.umkm_id
-            WHERE p.product_name ILIKE %s
-        """, (f"%{product_name}%",))
-        rows = cur.fetchall()
+        with DB_QUERY_LATENCY.labels(query="search_product_by_name").time():
+            cur.execute("""
+                SELECT p.product_id, p.product_name, p.product_desc, p.product_price, 
+                       p.product_stock, p.product_image, u.umkm_name, p.umkm_id
+                FROM Product p
+                JOIN UMKM_Profile u ON p.umkm_id = u.umkm_id
+                WHERE p.product_name ILIKE %s
+            """, (f"%{product_name}%",))
+            rows = cur.fetchall()
         cur.close()
         conn.close()
         
@@ -172,29 +192,83 @@ def search_product_by_name(product_name: str) -> Dict[str, Any]:
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+# Versi async: psycopg2 bersifat blocking, jadi query dijalankan di thread pool tool
+# agar event loop tetap bebas melayani request lain
+async def aget_umkm_by_id(umkm_id: int) -> Dict[str, Any]:
+    """Versi async dari get_umkm_by_id"""
+    return await run_blocking(get_umkm_by_id, umkm_id)
+
+async def aget_products_by_umkm(umkm_id: int) -> Dict[str, Any]:
+    """Versi async dari get_products_by_umkm"""
+    return await run_blocking(get_products_by_umkm, umkm_id)
+
+async def asearch_umkm_by_name(name: str) -> Dict[str, Any]:
+    """Versi async dari search_umkm_by_name"""
+    return await run_blocking(search_umkm_by_name, name)
+
+async def asearch_product_by_name(product_name: str) -> Dict[str, Any]:
+    """Versi async dari search_product_by_name"""
+    return await run_blocking(search_product_by_name, product_name)
+
+async def _search_product_tool(product_name: str) -> Dict[str, Any]:
+    """Coroutine tool search_product_by_name: pakai hasil speculative prefetch jika ada"""
+    prefetch = current_prefetch()
+    if prefetch is not None:
+        result = await prefetch.take("search_product_by_name", product_name)
+        if result is not None:
+            return result
+    return await asearch_product_by_name(product_name)
+
+def _tool_output(tool_name: str, result: Dict[str, Any], tool_args: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """(content ringkas untuk LLM, artifact lengkap untuk response API)"""
+    return render_tool_result(tool_name, result, tool_args), result
+
+def _artifact_tool(func, coroutine, **kwargs) -> StructuredTool:
+    """
+    Bungkus fungsi query sebagai tool content_and_artifact: LLM menerima teks ringkas
+    (tools/rendering.py), sedangkan dict hasil query disimpan utuh di ToolMessage.artifact
+    """
+    name = kwargs["name"]
+
+    @functools.wraps(func)
+    def run(**tool_args):
+        return _tool_output(name, func(**tool_args), tool_args)
+
+    @functools.wraps(coroutine)
+    async def arun(**tool_args):
+        return _tool_output(name, await coroutine(**tool_args), tool_args)
+
+    return StructuredTool.from_function(
+        func=run, coroutine=arun, response_format="content_and_artifact", **kwargs
+    )
+
 db_tools = [
-    StructuredTool.from_function(
-        func=get_umkm_by_id,
+    _artifact_tool(
+        get_umkm_by_id,
+        aget_umkm_by_id,
         name="get_umkm_by_id",
         args_schema=GetUMKMByIdArgs,
         description="Mengambil detail UMKM berdasarkan ID, termasuk gambar profil UMKM"
     ),
-    StructuredTool.from_function(
-        func=get_products_by_umkm,
+    _artifact_tool(
+        get_products_by_umkm,
+        aget_products_by_umkm,
         name="get_products_by_umkm",
         args_schema=GetProductsByUMKMArgs,
         description="Mengambil daftar produk dari sebuah UMKM berdasarkan umkm_id, termasuk gambar produk"
     ),
-    StructuredTool.from_function(
-        func=search_umkm_by_name,
+    _artifact_tool(
+        search_umkm_by_name,
+        asearch_umkm_by_name,
         name="search_umkm_by_name",
         args_schema=SearchUMKMByNameArgs,
         description="Mencari UMKM berdasarkan nama (mirip/LIKE), termasuk gambar profil UMKM"
     ),
-    StructuredTool.from_function(
-        func=search_product_by_name,
+    _artifact_tool(
+        search_product_by_name,
+        _search_product_tool,
         name="search_product_by_name",
         args_schema=SearchProductByNameArgs,
         description="Mencari produk berdasarkan nama (mirip/LIKE), termasuk gambar produk dan info UMKM"
     ),
-]
\ No newline at end of file
+]
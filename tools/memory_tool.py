@@ -1,70 +1,117 @@
+import logging
 import os
 import uuid
 from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
 from langgraph.store.redis import RedisStore
-from langgraph.store.base import IndexConfig
+from langgraph.store.base import BaseStore, IndexConfig
 from langchain.tools import StructuredTool
 from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import SystemMessage, HumanMessage
 from pydantic import BaseModel
+from tools.thread_pool import run_blocking
+from services.metrics import InstrumentedStore
+from services.embedding_service import EMBEDDING_DIM, get_embeddings
+from services.llm_registry import get_model, set_model
+from services.logging_setup import log_payload
 from models.memory_models import EmptyArgs, SaveInfoArgs, AnalyzeMessageArgs, DeleteMemoryArgs, UpdateMemoryArgs
 import re
+import threading
+from redis import Redis
 from typing import List, Optional
 
 load_dotenv()
+
+logger = logging.getLogger(__name__)
+
 REDIS_URL = os.getenv("REDIS_URL")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-# Redis setup
-index_config: IndexConfig = {
-    "dims": 1536,
-    "embed": GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001"),
-    "ann_index_config": {"vector_type":     "vector"},
-    "distance_type": "cosine",
-}
+# Store dan LLM dibuat saat pertama dipakai (bukan saat import), sehingga modul
+# ini bisa di-import tanpa koneksi Redis/API, dan bisa diganti lewat set_*()
+_redis_store = None
+_init_lock = threading.Lock()
+
+def _build_index_config() -> IndexConfig:
+    return {
+        # Sama dengan output_dimensionality yang dikirim embedding service
+        "dims": EMBEDDING_DIM,
+        "embed": get_embeddings(),
+        "ann_index_config": {"vector_type":     "vector"},
+        "distance_type": "cosine",
+    }
+
+def get_redis_store() -> BaseStore:
+    """Redis store untuk memori user (dibuat dan di-setup saat pertama dipakai)"""
+    global _redis_store
+    if _redis_store is None:
+        with _init_lock:
+            if _redis_store is None:
+                store = RedisStore(Redis.from_url(REDIS_URL), index=_build_index_config())
+                store.setup()
+                _redis_store = InstrumentedStore(store)
+    return _redis_store
+
+def set_redis_store(store: Optional[BaseStore]):
+    """Ganti memory store, misal InMemoryStore untuk benchmark offline"""
+    global _redis_store
+    _redis_store = InstrumentedStore(store) if store is not None else None
+
+def get_memory_llm():
+    """LLM untuk memory detection (role memory_extraction di llm_registry)"""
+    return get_model("memory_extraction")
 
-# Global Redis store
-redis_store = None
-with RedisStore.from_conn_string(REDIS_URL, index=index_config) as _redis_store:
-    _redis_store.setup()
-    redis_store = _redis_store
+def set_memory_llm(llm):
+    """Ganti LLM memory detection (misal fake model untuk benchmark)"""
+    set_model("memory_extraction", llm)
 
-# LLM untuk memory detection
-memory_llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    google_api_key=GOOGLE_API_KEY,
-    temperature=0,
-    convert_system_message_to_human=True,
-)
+def format_user_context(memories) -> Optional[str]:
+    """Format daftar memori user menjadi teks konteks (None jika kosong)"""
+    if not memories:
+        return None
+    context_info = []
+    for i, memory in enumerate(memories, 1):
+        # Add memory ID untuk reference saat delete/update
+        memory_data = memory.value['data']
+        memory_id = memory.key
+        context_info.append(f"{i}. {memory_data} [ID: {memory_id[:8]}...]")
+    
+    return f"Konteks yang tersimpan tentang user ({len(memories)} items):\n" + "\n".join(context_info)
 
 def get_user_context(config: RunnableConfig) -> str:
     """
-    WAJIB DIPANGGIL PERTAMA di setiap conversation untuk mendapatkan konteks user yang tersimpan. 
-    Tool ini akan memberikan context lengkap tentang user untuk membantu memberikan response yang personal.
-    SELALU gunakan tool ini terlebih dahulu sebelum merespons user.
+    Tool untuk memuat ulang konteks user yang tersimpan.
+    Konteks user sudah dimuat otomatis oleh node load_user_context di awal setiap turn,
+    jadi tool ini hanya perlu dipanggil jika butuh data terbaru setelah memory diubah.
     """
     try:
         user_id = config["configurable"]["user_id"]
         namespace = ("memories", user_id)
         
         # Search semua memori untuk konteks umum
-        memories = redis_store.search(namespace, query="")
-        
-        if memories:
-            context_info = []
-            for i, memory in enumerate(memories, 1):
-                # Add memory ID untuk reference saat delete/update
-                memory_data = memory.value['data']
-                memory_id = memory.key
-                context_info.append(f"{i}. {memory_data} [ID: {memory_id[:8]}...]")
+        memories = get_redis_store().search(namespace, query="")
+        result = format_user_context(memories)
+        
+        if result:
+            logger.info("get_user_context", extra={"user_id": user_id, "memories": len(memories)})
             
-            result = f"Konteks yang tersimpan tentang user ({len(memories)} items):\n" + "\n".join(context_info)
+            return result
+        else:
+            return "Belum ada informasi yang tersimpan tentang user ini."
             
-            print(f"\n--- [TOOL: get_user_context] ---")
-            print(f"User ID: {user_id}")
-            print(f"Found {len(memories)} memories")
-            print(f"--------------------------------\n")
+    except Exception as e:
+        return f"Error mengambil konteks user: {str(e)}"
+
+async def aget_user_context(config: RunnableConfig) -> str:
+    """Versi async dari get_user_context"""
+    try:
+        user_id = config["configurable"]["user_id"]
+        namespace = ("memories", user_id)
+        
+        memories = await get_redis_store().asearch(namespace, query="")
+        result = format_user_context(memories)
+        
+        if result:
+            logger.info("get_user_context", extra={"user_id": user_id, "memories": len(memories)})
             
             return result
         else:
@@ -82,13 +129,25 @@ def save_important_info(information: str, config: RunnableConfig) -> str:
         user_id = config["configurable"]["user_id"]
         namespace = ("memories", user_id)
         memory_id = str(uuid.uuid4())
-        redis_store.put(namespace, memory_id, {"data": information})
+        get_redis_store().put(namespace, memory_id, {"data": information})
         
-        print(f"\n--- [TOOL: save_important_info] ---")
-        print(f"User ID: {user_id}")
-        print(f"Saved: {information}")
-        print(f"Memory ID: {memory_id}")
-        print(f"------------------------------------\n")
+        logger.info("save_important_info", extra={"user_id": user_id, "memory_id": memory_id})
+        log_payload(logger, "save_important_info payload", {"information": information})
+        return f"✓ Informasi berhasil disimpan: {information} [ID: {memory_id[:8]}...]"
+        
+    except Exception as e:
+        return f"Error menyimpan informasi: {str(e)}"
+
+async def asave_important_info(information: str, config: RunnableConfig) -> str:
+    """Versi async dari save_important_info"""
+    try:
+        user_id = config["configurable"]["user_id"]
+        namespace = ("memories", user_id)
+        memory_id = str(uuid.uuid4())
+        await get_redis_store().aput(namespace, memory_id, {"data": information})
+        
+        logger.info("save_important_info", extra={"user_id": user_id, "memory_id": memory_id})
+        log_payload(logger, "save_important_info payload", {"information": information})
         return f"✓ Informasi berhasil disimpan: {information} [ID: {memory_id[:8]}...]"
         
     except Exception as e:
@@ -105,7 +164,7 @@ def delete_user_memory(memory_identifier: str, config: RunnableConfig) -> str:
         namespace = ("memories", user_id)
         
         # Get all memories dulu
-        memories = redis_store.search(namespace, query="")
+        memories = get_redis_store().search(namespace, query="")
         
         if not memories:
             return "Tidak ada memori yang tersimpan untuk dihapus."
@@ -124,15 +183,12 @@ def delete_user_memory(memory_identifier: str, config: RunnableConfig) -> str:
                 memory_id.startswith(memory_identifier) or
                 identifier_lower in memory_id.lower()):
                 
-                redis_store.delete(namespace, memory_id)
+                get_redis_store().delete(namespace, memory_id)
                 deleted_items.append(memory.value['data'])
                 deleted_count += 1
         
-        print(f"\n--- [TOOL: delete_user_memory] ---")
-        print(f"User ID: {user_id}")
-        print(f"Deleted {deleted_count} memories")
-        print(f"Items: {deleted_items}")
-        print(f"-------------------------------------\n")
+        logger.info("delete_user_memory", extra={"user_id": user_id, "deleted": deleted_count})
+        log_payload(logger, "delete_user_memory payload", {"deleted_items": deleted_items})
         
         if deleted_count > 0:
             return f"✓ Berhasil menghapus {deleted_count} memori: {', '.join(deleted_items)}"
@@ -152,7 +208,7 @@ def clear_all_user_memory(config: RunnableConfig) -> str:
         namespace = ("memories", user_id)
         
         # Get all memories
-        memories = redis_store.search(namespace, query="")
+        memories = get_redis_store().search(namespace, query="")
         
         if not memories:
             return "Tidak ada memori yang perlu dihapus."
@@ -161,12 +217,9 @@ def clear_all_user_memory(config: RunnableConfig) -> str:
         
         # Delete semua memories
         for memory in memories:
-            redis_store.delete(namespace, memory.key)
+            get_redis_store().delete(namespace, memory.key)
         
-        print(f"\n--- [TOOL: clear_all_user_memory] ---")
-        print(f"User ID: {user_id}")
-        print(f"Deleted ALL {deleted_count} memories")
-        print(f"---------------------------------------\n")
+        logger.info("clear_all_user_memory", extra={"user_id": user_id, "deleted": deleted_count})
         
         return f"✓ Berhasil menghapus semua {deleted_count} memori user. Data Anda telah direset lengkap."
         
@@ -183,7 +236,7 @@ def update_user_memory(old_info: str, new_info: str, config: RunnableConfig) ->
         namespace = ("memories", user_id)
         
         # Cari memory yang match dengan old_info
-        memories = redis_store.search(namespace, query="")
+        memories = get_redis_store().search(namespace, query="")
         updated_count = 0
         updated_items = []
         
@@ -197,16 +250,13 @@ def update_user_memory(old_info: str, new_info: str, config: RunnableConfig) ->
                 updated_data = memory_data.replace(old_info, new_info)
                 
                 # Update di Redis
-                redis_store.put(namespace, memory_id, {"data": updated_data})
+                get_redis_store().put(namespace, memory_id, {"data": updated_data})
                 
                 updated_items.append(f"'{memory_data}' → '{updated_data}'")
                 updated_count += 1
         
-        print(f"\n--- [TOOL: update_user_memory] ---")
-        print(f"User ID: {user_id}")
-        print(f"Updated {updated_count} memories")
-        print(f"Changes: {updated_items}")
-        print(f"-----------------------------------\n")
+        logger.info("update_user_memory", extra={"user_id": user_id, "updated": updated_count})
+        log_payload(logger, "update_user_memory payload", {"updated_items": updated_items})
         
         if updated_count > 0:
             return f"✓ Berhasil mengupdate {updated_count} memori:\n" + "\n".join(updated_items)
@@ -225,7 +275,7 @@ def list_user_memories(config: RunnableConfig) -> str:
         user_id = config["configurable"]["user_id"]
         namespace = ("memories", user_id)
         
-        memories = redis_store.search(namespace, query="")
+        memories = get_redis_store().search(namespace, query="")
         
         if not memories:
             return "Belum ada memori yang tersimpan."
@@ -244,67 +294,45 @@ def list_user_memories(config: RunnableConfig) -> str:
         
         result = f"Daftar Memori User ({len(memories)} total):\n\n" + "\n\n".join(memory_list)
         
-        print(f"\n--- [TOOL: list_user_memories] ---")
-        print(f"User ID: {user_id}")
-        print(f"Listed {len(memories)} memories")
-        print(f"-----------------------------------\n")
+        logger.info("list_user_memories", extra={"user_id": user_id, "memories": len(memories)})
         
         return result
         
     except Exception as e:
         return f"Error menampilkan daftar memori: {str(e)}"
 
-def analyze_and_save_info(user_message: str, config: RunnableConfig) -> str:
-    """
-    Tool untuk menganalisis pesan user dan otomatis menyimpan preferensi songket yang disebutkan.
-    Menggunakan rule-based detection dulu untuk efisiensi, baru LLM jika diperlukan.
-    """
-    try:
-        user_id = config["configurable"]["user_id"]
-        
-        # Rule-based detection untuk info preferensi songket & personal (lebih cepat)
-        important_patterns = {
-            'nama': r'nama\s+saya\s+(\w+)|saya\s+(\w+)|panggil\s+saya\s+(\w+)',
-            'alamat': r'alamat\s+saya\s+([\w\s,]+)|saya\s+tinggal\s+di\s+([\w\s,]+)|domisili\s+di\s+([\w\s,]+)|dari\s+([\w\s,]+)',
-            'warna_favorit': r'warna\s+favorit\s+saya\s+([\w\s]+)|saya\s+suka\s+warna\s+([\w\s]+)|warna\s+kesukaan\s+([\w\s]+)',
-            'motif_favorit': r'motif\s+favorit\s+saya\s+([\w\s]+)|saya\s+suka\s+motif\s+([\w\s]+)|motif\s+kesukaan\s+([\w\s]+)|motif\s+(lepus|bungo|tabur|pucuk\s+rebung|cantik\s+manis|tajuk|pulir|limar)',
-            'preferensi_baju': r'saya\s+suka\s+(kebaya|baju\s+kurung|kemeja|dress)\s*([\w\s]*)|lebih\s+suka\s+(pakai|pake)\s+([\w\s]+)|gaya\s+berpakaian\s+([\w\s]+)',
-            'jenis_songket': r'saya\s+suka\s+songket\s+([\w\s]+)|songket\s+favorit\s+saya\s+([\w\s]+)|songket\s+(palembang|sumatera|tradisional|modern|klasik)',
-            'acara_khusus': r'untuk\s+acara\s+(pernikahan|wisuda|formal|adat|tradisional)|mau\s+dipake\s+(nikah|wedding|wisuda|formal)',
-            'budget_range': r'budget\s+saya\s+([\w\s]+)|harga\s+sekitar\s+([\d\.,juta\s]+)|kisaran\s+harga\s+([\d\.,juta\s]+)',
-            'ukuran_baju': r'ukuran\s+saya\s+([SMLXLsmlxl\d]+)|size\s+([SMLXLsmlxl\d]+)|badan\s+saya\s+(kecil|sedang|besar)',
-        }
-        
-        extracted_info = []
-        message_lower = user_message.lower()
-        
-        for category, pattern in important_patterns.items():
-            match = re.search(pattern, message_lower)
-            if match:
-                # Ambil group yang tidak None
-                value = next((g for g in match.groups() if g), "")
-                if value:
-                    extracted_info.append(f"{category.title()}: {value.title()}")
-        
-        # Jika ada info terdeteksi dengan rule-based, simpan langsung
-        if extracted_info:
-            namespace = ("memories", user_id)
-            saved_items = []
-            
-            for info in extracted_info:
-                memory_id = str(uuid.uuid4())
-                redis_store.put(namespace, memory_id, {"data": info})
-                saved_items.append(info)
-            
-            print(f"\n--- [TOOL: analyze_and_save_info - RULE-BASED] ---")
-            print(f"User ID: {user_id}")
-            print(f"Detected: {', '.join(saved_items)}")
-            print(f"-----------------------------------------------\n")
-            
-            return f"✓ Terdeteksi dan disimpan (rule-based): {'; '.join(saved_items)}"
-        
-        # Fallback ke LLM analysis untuk kasus yang tidak terdeteksi rule-based
-        analysis_prompt = f"""
+# Rule-based detection untuk info preferensi songket & personal (lebih cepat)
+IMPORTANT_PATTERNS = {
+    'nama': r'nama\s+saya\s+(\w+)|saya\s+(\w+)|panggil\s+saya\s+(\w+)',
+    'alamat': r'alamat\s+saya\s+([\w\s,]+)|saya\s+tinggal\s+di\s+([\w\s,]+)|domisili\s+di\s+([\w\s,]+)|dari\s+([\w\s,]+)',
+    'warna_favorit': r'warna\s+favorit\s+saya\s+([\w\s]+)|saya\s+suka\s+warna\s+([\w\s]+)|warna\s+kesukaan\s+([\w\s]+)',
+    'motif_favorit': r'motif\s+favorit\s+saya\s+([\w\s]+)|saya\s+suka\s+motif\s+([\w\s]+)|motif\s+kesukaan\s+([\w\s]+)|motif\s+(lepus|bungo|tabur|pucuk\s+rebung|cantik\s+manis|tajuk|pulir|limar)',
+    'preferensi_baju': r'saya\s+suka\s+(kebaya|baju\s+kurung|kemeja|dress)\s*([\w\s]*)|lebih\s+suka\s+(pakai|pake)\s+([\w\s]+)|gaya\s+berpakaian\s+([\w\s]+)',
+    'jenis_songket': r'saya\s+suka\s+songket\s+([\w\s]+)|songket\s+favorit\s+saya\s+([\w\s]+)|songket\s+(palembang|sumatera|tradisional|modern|klasik)',
+    'acara_khusus': r'untuk\s+acara\s+(pernikahan|wisuda|formal|adat|tradisional)|mau\s+dipake\s+(nikah|wedding|wisuda|formal)',
+    'budget_range': r'budget\s+saya\s+([\w\s]+)|harga\s+sekitar\s+([\d\.,juta\s]+)|kisaran\s+harga\s+([\d\.,juta\s]+)',
+    'ukuran_baju': r'ukuran\s+saya\s+([SMLXLsmlxl\d]+)|size\s+([SMLXLsmlxl\d]+)|badan\s+saya\s+(kecil|sedang|besar)',
+}
+
+ANALYSIS_SYSTEM_PROMPT = "Anda adalah AI analyzer yang bertugas mengekstrak informasi penting dari pesan user."
+
+def extract_rule_based_info(user_message: str) -> List[str]:
+    """Ekstrak info penting dari pesan user dengan regex"""
+    extracted_info = []
+    message_lower = user_message.lower()
+    
+    for category, pattern in IMPORTANT_PATTERNS.items():
+        match = re.search(pattern, message_lower)
+        if match:
+            # Ambil group yang tidak None
+            value = next((g for g in match.groups() if g), "")
+            if value:
+                extracted_info.append(f"{category.title()}: {value.title()}")
+    return extracted_info
+
+def _build_analysis_prompt(user_message: str) -> str:
+    """Prompt untuk LLM fallback analysis"""
+    return f"""
         Analisis pesan user berikut dan tentukan apakah ada informasi personal/preferensi songket yang perlu disimpan:
 
         Pesan user: "{user_message}"
@@ -326,10 +354,35 @@ def analyze_and_save_info(user_message: str, config: RunnableConfig) -> str:
         User: "Bagaimana cuaca hari ini?"
         Response: "NONE"
         """
+
+def analyze_and_save_info(user_message: str, config: RunnableConfig) -> str:
+    """
+    Tool untuk menganalisis pesan user dan otomatis menyimpan preferensi songket yang disebutkan.
+    Menggunakan rule-based detection dulu untuk efisiensi, baru LLM jika diperlukan.
+    """
+    try:
+        user_id = config["configurable"]["user_id"]
+        extracted_info = extract_rule_based_info(user_message)
         
-        analysis_response = memory_llm.invoke([
-            SystemMessage(content="Anda adalah AI analyzer yang bertugas mengekstrak informasi penting dari pesan user."),
-            HumanMessage(content=analysis_prompt)
+        # Jika ada info terdeteksi dengan rule-based, simpan langsung
+        if extracted_info:
+            namespace = ("memories", user_id)
+            saved_items = []
+            
+            for info in extracted_info:
+                memory_id = str(uuid.uuid4())
+                get_redis_store().put(namespace, memory_id, {"data": info})
+                saved_items.append(info)
+            
+            logger.info("analyze_and_save_info", extra={"user_id": user_id, "saved": len(saved_items), "method": "rule_based"})
+            log_payload(logger, "analyze_and_save_info payload", {"detected": saved_items})
+            
+            return f"✓ Terdeteksi dan disimpan (rule-based): {'; '.join(saved_items)}"
+        
+        # Fallback ke LLM analysis untuk kasus yang tidak terdeteksi rule-based
+        analysis_response = get_memory_llm().invoke([
+            SystemMessage(content=ANALYSIS_SYSTEM_PROMPT),
+            HumanMessage(content=_build_analysis_prompt(user_message))
         ])
         
         analysis_result = analysis_response.content.strip()
@@ -340,13 +393,46 @@ def analyze_and_save_info(user_message: str, config: RunnableConfig) -> str:
             
             namespace = ("memories", user_id)
             memory_id = str(uuid.uuid4())
-            redis_store.put(namespace, memory_id, {"data": info_to_save})
+            get_redis_store().put(namespace, memory_id, {"data": info_to_save})
+            
+            logger.info("analyze_and_save_info", extra={"user_id": user_id, "method": "llm"})
+            log_payload(logger, "analyze_and_save_info payload", {"analysis": analysis_result, "saved": info_to_save})
+            
+            return f"✓ Terdeteksi dan disimpan (LLM): {info_to_save}"
+        else:
+            return "Tidak ada informasi penting yang perlu disimpan dari pesan ini."
+    except Exception as e:
+        return f"Error dalam analisis: {str(e)}"
+
+async def aanalyze_and_save_info(user_message: str, config: RunnableConfig) -> str:
+    """Versi async dari analyze_and_save_info"""
+    try:
+        user_id = config["configurable"]["user_id"]
+        namespace = ("memories", user_id)
+        extracted_info = extract_rule_based_info(user_message)
+        
+        if extracted_info:
+            for info in extracted_info:
+                await get_redis_store().aput(namespace, str(uuid.uuid4()), {"data": info})
             
-            print(f"\n--- [TOOL: analyze_and_save_info - LLM] ---")
-            print(f"User ID: {user_id}")
-            print(f"Analysis: {analysis_result}")
-            print(f"Saved: {info_to_save}")
-            print(f"-------------------------------------\n")
+            logger.info("analyze_and_save_info", extra={"user_id": user_id, "saved": len(extracted_info), "method": "rule_based"})
+            log_payload(logger, "analyze_and_save_info payload", {"detected": extracted_info})
+            
+            return f"✓ Terdeteksi dan disimpan (rule-based): {'; '.join(extracted_info)}"
+        
+        analysis_response = await get_memory_llm().ainvoke([
+            SystemMessage(content=ANALYSIS_SYSTEM_PROMPT),
+            HumanMessage(content=_build_analysis_prompt(user_message))
+        ])
+        
+        analysis_result = analysis_response.content.strip()
+        
+        if analysis_result.startswith("INFO:"):
+            info_to_save = analysis_result.replace("INFO:", "").strip()
+            await get_redis_store().aput(namespace, str(uuid.uuid4()), {"data": info_to_save})
+            
+            logger.info("analyze_and_save_info", extra={"user_id": user_id, "method": "llm"})
+            log_payload(logger, "analyze_and_save_info payload", {"analysis": analysis_result, "saved": info_to_save})
             
             return f"✓ Terdeteksi dan disimpan (LLM): {info_to_save}"
         else:
@@ -354,68 +440,73 @@ def analyze_and_save_info(user_message: str, config: RunnableConfig) -> str:
     except Exception as e:
         return f"Error dalam analisis: {str(e)}"
 
+# Tool manajemen memori jarang dipanggil dan hanya melakukan operasi Redis
+# sederhana, jadi versi async cukup menjalankan versi sync di thread pool tool
+async def adelete_user_memory(memory_identifier: str, config: RunnableConfig) -> str:
+    """Versi async dari delete_user_memory"""
+    return await run_blocking(delete_user_memory, memory_identifier, config)
+
+async def aclear_all_user_memory(config: RunnableConfig) -> str:
+    """Versi async dari clear_all_user_memory"""
+    return await run_blocking(clear_all_user_memory, config)
+
+async def aupdate_user_memory(old_info: str, new_info: str, config: RunnableConfig) -> str:
+    """Versi async dari update_user_memory"""
+    return await run_blocking(update_user_memory, old_info, new_info, config)
+
+async def alist_user_memories(config: RunnableConfig) -> str:
+    """Versi async dari list_user_memories"""
+    return await run_blocking(list_user_memories, config)
+
 
 memory_tools = [
     StructuredTool.from_function(
         func=get_user_context,
+        coroutine=aget_user_context,
         name="get_user_context",
         args_schema=EmptyArgs,
-        description="WAJIB DIPANGGIL PERTAMA di setiap conversation untuk mendapatkan konteks user yang tersimpan. Gunakan tool ini sebelum merespons user untuk mendapatkan informasi personal yang sudah diketahui sebelumnya."
+        description="Memuat ulang konteks user yang tersimpan. Konteks user sudah tersedia otomatis di prompt; panggil hanya jika butuh data terbaru setelah memory diubah dalam percakapan ini."
     ),
     StructuredTool.from_function(
         func=analyze_and_save_info,
+        coroutine=aanalyze_and_save_info,
         name="analyze_and_save_info", 
         args_schema=AnalyzeMessageArgs,
         description="Menganalisis pesan user dengan rule-based detection (cepat) dan LLM fallback untuk otomatis mendeteksi dan menyimpan preferensi songket, seni, dan informasi personal yang perlu diingat."
     ),
     StructuredTool.from_function(
         func=save_important_info,
+        coroutine=asave_important_info,
         name="save_important_info",
         args_schema=SaveInfoArgs,
         description="Menyimpan informasi penting tentang user yang disebutkan dalam percakapan (nama, lokasi, preferensi, dll)."
     ),
     StructuredTool.from_function(
         func=delete_user_memory,
+        coroutine=adelete_user_memory,
         name="delete_user_memory",
         args_schema=DeleteMemoryArgs,
         description="Menghapus memori user tertentu berdasarkan konten atau ID. Gunakan ketika user minta hapus informasi spesifik seperti 'hapus alamat saya' atau 'lupakan preferensi warna'."
     ),
     StructuredTool.from_function(
         func=update_user_memory,
+        coroutine=aupdate_user_memory,
         name="update_user_memory",
         args_schema=UpdateMemoryArgs,
         description="Mengupdate/mengoreksi informasi user yang sudah tersimpan. Gunakan ketika user mau ganti informasi lama dengan yang baru."
     ),
     StructuredTool.from_function(
         func=clear_all_user_memory,
+        coroutine=aclear_all_user_memory,
         name="clear_all_user_memory",
         args_schema=EmptyArgs,
         description="Menghapus SEMUA memori user (reset lengkap). HANYA gunakan jika user secara eksplisit minta hapus semua data pribadi mereka."
     ),
     StructuredTool.from_function(
         func=list_user_memories,
+        coroutine=alist_user_memories,
         name="list_user_memories",
         args_schema=EmptyArgs,
         description="Menampilkan daftar lengkap semua memori user dengan ID. Berguna untuk debugging atau ketika user ingin review data yang tersimpan."
     )
 ]
-
-
-# Tambahkan ini di kode untuk debug
-print("RedisStore type:", type(redis_store))
-print("Available methods:", dir(redis_store))
-print("Search method doc:", redis_store.search.__doc__)
-
-# Test apakah benar-benar menggunakan embedding
-test_data = "nama saya John"
-memory_id = "test_123"
-
-# Simpan data
-redis_store.put(namespace, memory_id, {"data": test_data})
-
-# Search dengan query mirip
-result1 = redis_store.search(namespace, query="John")
-result2 = redis_store.search(namespace, query="nama John")  
-result3 = redis_store.search(namespace, query="completely different query")
-
-print("Results:", len(result1), len(result2), len(result3))
\ No newline at end of file
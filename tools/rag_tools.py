@@ -1,105 +1,209 @@
+import logging
 import os
+from typing import Any, Dict, Optional, Tuple
 from dotenv import load_dotenv
+from redis import Redis
 from langchain.tools import StructuredTool
+from langchain_core.tools import ToolException
 from pydantic import BaseModel
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.documents import Document
 from langchain_redis import RedisVectorStore
+from redisvl.query.filter import Tag
 from models.document_models import DocumentSearchArgs
+from services.metrics import REDIS_LATENCY
+from services.embedding_service import get_embeddings
+from services.index_schema import CONTENT_FIELD, VECTOR_DIM, VECTOR_INDEX_NAME, build_search_query
+from tools.thread_pool import run_blocking
+from services.prefetch import current_prefetch
+from tools.rendering import render_documents
+from tools.bm25_index import BM25Index, reciprocal_rank_fusion
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 REDIS_URL = os.getenv("REDIS_URL")
-DB_NAME = "vector_db"
+DB_NAME = VECTOR_INDEX_NAME
 
-_retriever = None
+_vectorstore = None
 _initialized = False
 
-INDEX_CONFIG = {
-    "embedding": {
-        "dimension": 1536,              
-        "distance_metric": "cosine"
-    }
-}
+# Batas atas top_k per pencarian (juga jumlah hasil yang di-prefetch)
+SEARCH_K = 10
+# Jarak cosine maksimum hasil vector search (RangeQuery di Redis); kosong = tanpa batas
+_max_distance = os.getenv("SEARCH_MAX_DISTANCE", "0.75")
+SEARCH_MAX_DISTANCE = float(_max_distance) if _max_distance else None
+
+# Hybrid retrieval: hasil vector search digabung dengan BM25 lexical lewat Reciprocal Rank Fusion
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+BM25_K = int(os.getenv("BM25_K", "10"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Index BM25 disimpan di Redis di samping vector index (ditulis oleh create_vectorstore.py)
+BM25_KEY = f"{DB_NAME}:bm25"
+
+_bm25_index = None
+_bm25_loaded = False
 
-def _create_vector_retriever():
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001")
-    vectorstore = RedisVectorStore.from_existing_index(
+def _create_vectorstore():
+    return RedisVectorStore.from_existing_index(
         redis_url=REDIS_URL,
         index_name=DB_NAME,
-        embedding=embeddings,
-        index_config=INDEX_CONFIG
+        embedding=get_embeddings(),
+        # Skema dibaca dari index yang sudah ada; dimensi diisi agar RedisVectorStore
+        # tidak melakukan panggilan embedding contoh saat inisialisasi
+        embedding_dimensions=VECTOR_DIM,
     )
-    return vectorstore.as_retriever(search_kwargs={"k": 10})
-
-try:
-    print("Initializing document search (vector retriever)...")
-    _retriever = _create_vector_retriever()
-    _initialized = True
-    print("Retriever initialized successfully")
-except Exception as e:
-    print(f"Failed to initialize retriever: {e}")
-    _retriever = None
-    _initialized = False
-
-
-def _initialize_retriever():
-    """Return retriever if ready"""
-    global _retriever, _initialized
-    if not _initialized or _retriever is None:
-        print("Retriever belum tersedia")
-        return None
-    return _retriever
 
-def search_documents(query: str, top_k: int = 10) -> str:
-    retriever = _initialize_retriever()
+def get_vectorstore():
+    """Return vector store, dibuat saat pertama dipakai. None jika index belum ada."""
+    global _vectorstore, _initialized
+    if not _initialized:
+        try:
+            logger.info("Initializing document search (vector store)...")
+            _vectorstore = _create_vectorstore()
+            _initialized = True
+            logger.info("Vector store initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize vector store: {e}")
+            _vectorstore = None
+    return _vectorstore
+
+def set_vectorstore(vectorstore):
+    """Ganti vector store, misal InMemoryVectorStore untuk benchmark offline"""
+    global _vectorstore, _initialized
+    _vectorstore = vectorstore
+    _initialized = vectorstore is not None
+
+def load_bm25_index(redis_client) -> Optional[BM25Index]:
+    data = redis_client.get(BM25_KEY)
+    return BM25Index.from_bytes(data) if data else None
+
+def save_bm25_index(redis_client, index: BM25Index):
+    redis_client.set(BM25_KEY, index.to_bytes())
+
+def get_bm25_index() -> Optional[BM25Index]:
+    """Return index BM25, dimuat dari Redis saat pertama dipakai. None jika belum dibuat."""
+    global _bm25_index, _bm25_loaded
+    if not _bm25_loaded:
+        _bm25_loaded = True
+        try:
+            with REDIS_LATENCY.labels(operation="bm25_load").time():
+                _bm25_index = load_bm25_index(Redis.from_url(REDIS_URL))
+            if _bm25_index is None:
+                logger.warning(f"Index BM25 '{BM25_KEY}' belum ada, search_documents hanya memakai vector search")
+        except Exception as e:
+            logger.error(f"Failed to load BM25 index: {e}")
+            _bm25_index = None
+    return _bm25_index
+
+def set_bm25_index(index: Optional[BM25Index]):
+    """Ganti index BM25, misal index dari dokumen benchmark offline"""
+    global _bm25_index, _bm25_loaded
+    _bm25_index = index
+    _bm25_loaded = True
+
+def _to_document(result) -> Document:
+    page = result.get("page")
+    return Document(
+        page_content=result[CONTENT_FIELD],
+        metadata={"doc_type": result.get("doc_type"), "page": int(float(page)) if page else page},
+    )
 
-    if retriever is None:
-        return "Document search tidak tersedia. Pastikan vectorstore sudah dibuat."
+def _vector_search(vectorstore, embedding, top_k: int = SEARCH_K, doc_type: Optional[str] = None):
+    """
+    Query KNN ke Redis (dipisah dari embedding agar latency keduanya terukur terpisah).
+    top_k, batas jarak, dan filter doc_type dijalankan di Redis sehingga hanya hasil
+    yang dipakai (isi chunk, doc_type, page) yang dikirim balik.
+    """
+    with REDIS_LATENCY.labels(operation="vector_search").time():
+        if isinstance(vectorstore, RedisVectorStore):
+            # Query dibangun sendiri agar datatype vektor query sama dengan skema index (float16)
+            query = build_search_query(
+                embedding, top_k, Tag("doc_type") == doc_type if doc_type else None, SEARCH_MAX_DISTANCE
+            )
+            return [_to_document(result) for result in vectorstore.index.query(query)]
+        # Vector store lain (misal InMemoryVectorStore di benchmark): filter berupa callable
+        doc_filter = (lambda doc: doc.metadata.get("doc_type") == doc_type) if doc_type else None
+        return vectorstore.similarity_search_by_vector(embedding, k=top_k, filter=doc_filter)
+
+def _retrieve(vectorstore, query: str, embedding, top_k: int = SEARCH_K, doc_type: Optional[str] = None):
+    """Vector search, digabung dengan BM25 (RRF) jika hybrid search aktif dan index tersedia"""
+    results = _vector_search(vectorstore, embedding, top_k, doc_type)
+    bm25 = get_bm25_index() if HYBRID_SEARCH else None
+    if bm25 is None:
+        return results
+    lexical = bm25.search(query, k=min(top_k, BM25_K), doc_type=doc_type)
+    return reciprocal_rank_fusion([results, lexical], k=RRF_K)[:top_k]
+
+def _format_results(query: str, results, top_k: int) -> str:
+    """Format hasil pencarian menjadi teks ringkas untuk LLM (dibatasi budget token tool)"""
+    return render_documents(query, results, top_k)
+
+def _tool_output(query: str, results, top_k: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    (content untuk LLM, artifact). Artifact sengaja tanpa "status" agar tidak dianggap data
+    terstruktur oleh collect_tool_artifacts; answer cache memakai jumlah dokumennya.
+    """
+    results = results[:top_k]
+    return _format_results(query, results, top_k), {"documents": len(results)}
+
+def search_documents(query: str, top_k: int = 5, doc_type: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Gagal (vectorstore tidak ada, Redis/embedding error) dilaporkan lewat ToolException
+    sehingga ToolMessage berstatus error, bukan teks biasa yang terlihat seperti hasil.
+    """
+    vectorstore = get_vectorstore()
+
+    if vectorstore is None:
+        raise ToolException("Document search tidak tersedia. Pastikan vectorstore sudah dibuat.")
 
     try:
-        top_k = max(1, min(top_k, 10))
-        results = retriever.get_relevant_documents(query)
-
-        if not results:
-            return f"Tidak ditemukan dokumen yang relevan untuk query: '{query}'"
-
-        formatted_results = []
-        for i, doc in enumerate(results[:top_k], 1):
-            content = doc.page_content.strip()
-            if len(content) > 500:
-                content = content[:500] + "..."
-            
-            doc_type = doc.metadata.get('doc_type', 'Unknown')
-            source = doc.metadata.get('source', 'Unknown')
-            page = doc.metadata.get('page', 'N/A')
-            
-            formatted_results.append(
-                f"**Hasil {i}:**\n"
-                f"**Dokumen:** {doc_type}\n"
-                f"**Halaman:** {page}\n"
-                f"**Konten:**\n{content}\n"
-            )
+        top_k = max(1, min(top_k, SEARCH_K))
+        embedding = vectorstore.embeddings.embed_query(query)
+        results = _retrieve(vectorstore, query, embedding, top_k, doc_type)
+    except Exception as e:
+        raise ToolException(f"Error saat mencari dokumen: {str(e)}") from e
+    return _tool_output(query, results, top_k)
 
-        summary = (
-            f"**Pencarian Dokumen Berhasil**\n"
-            f"**Query:** {query}\n"
-            f"**Ditemukan:** {len(formatted_results)} hasil relevan\n\n"
-        )
+async def aretrieve_documents(query: str, top_k: int = SEARCH_K, doc_type: Optional[str] = None):
+    """Embedding + hybrid search async (dipakai tool dan speculative prefetch)"""
+    vectorstore = get_vectorstore()
+    if vectorstore is None:
+        return None
+    embedding = await vectorstore.embeddings.aembed_query(query)
+    return await run_blocking(_retrieve, vectorstore, query, embedding, top_k, doc_type)
 
-        return summary + "\n".join(formatted_results)
+async def asearch_documents(query: str, top_k: int = 5, doc_type: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """Versi async dari search_documents; memakai hasil speculative prefetch jika query-nya mirip"""
+    if get_vectorstore() is None:
+        raise ToolException("Document search tidak tersedia. Pastikan vectorstore sudah dibuat.")
 
+    try:
+        top_k = max(1, min(top_k, SEARCH_K))
+        # Prefetch dibuat tanpa filter (top SEARCH_K), jadi hanya dipakai untuk pencarian tanpa doc_type
+        prefetch = current_prefetch() if doc_type is None else None
+        results = await prefetch.take("search_documents", query) if prefetch is not None else None
+        if results is None:
+            results = await aretrieve_documents(query, top_k, doc_type)
     except Exception as e:
-        return f"Error saat mencari dokumen: {str(e)}"
+        raise ToolException(f"Error saat mencari dokumen: {str(e)}") from e
+    if results is None:
+        raise ToolException("Document search tidak tersedia. Pastikan vectorstore sudah dibuat.")
+    return _tool_output(query, results, top_k)
 
 document_search_tools = [
     StructuredTool.from_function(
         func=search_documents,
+        coroutine=asearch_documents,
         name="search_documents",
         description=(
             "Mencari informasi dalam koleksi dokumen PDF yang telah diindeks. "
             "Gunakan tool ini ketika pengguna bertanya tentang informasi spesifik "
-            "yang mungkin ada dalam dokumen atau file PDF yang tersedia."
+            "yang mungkin ada dalam dokumen atau file PDF yang tersedia. "
+            "Isi doc_type untuk membatasi pencarian ke satu dokumen."
         ),
-        args_schema=DocumentSearchArgs
+        args_schema=DocumentSearchArgs,
+        response_format="content_and_artifact",
+        handle_tool_error=True,
     )
 ]
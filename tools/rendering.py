@@ -0,0 +1,100 @@
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+# Hasil tool dirender ringkas sebelum dikirim ke LLM; data lengkap tetap ada di artifact
+TOOL_TOKEN_BUDGET = int(os.getenv("TOOL_TOKEN_BUDGET", "800"))
+RENDER_MAX_ITEMS = int(os.getenv("RENDER_MAX_ITEMS", "8"))
+RENDER_MAX_TEXT_CHARS = int(os.getenv("RENDER_MAX_TEXT_CHARS", "240"))
+
+def _parse_budgets(raw: str) -> Dict[str, int]:
+    """Override budget per tool, format: "search_documents=1200,get_products_by_umkm=600" """
+    budgets = {}
+    for item in raw.split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            budgets[name.strip()] = int(value)
+    return budgets
+
+TOOL_TOKEN_BUDGETS = _parse_budgets(os.getenv("TOOL_TOKEN_BUDGETS", "search_documents=1200"))
+
+# Field yang tidak dibutuhkan LLM untuk menjawab (gambar dikirim ke frontend lewat artifact)
+PRUNED_FIELDS = {"product_image", "umkm_image"}
+
+def get_token_budget(tool_name: str) -> int:
+    return TOOL_TOKEN_BUDGETS.get(tool_name, TOOL_TOKEN_BUDGET)
+
+def estimate_tokens(text: str) -> int:
+    """Estimasi kasar (~4 karakter per token), sama dengan estimasi di nodes/history.py"""
+    return len(text) // 4 + 1
+
+def _shorten(text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + "..."
+
+def _prune(value: Any, known: Dict[str, Any], max_items: int, max_chars: int) -> Any:
+    if isinstance(value, dict):
+        return {
+            key: _prune(item, known, max_items, max_chars)
+            for key, item in value.items()
+            if key not in PRUNED_FIELDS and item is not None and known.get(key, object()) != item
+        }
+    if isinstance(value, list):
+        items = [_prune(item, known, max_items, max_chars) for item in value[:max_items]]
+        if len(value) > max_items:
+            items.append(f"... dan {len(value) - max_items} item lainnya")
+        return items
+    if isinstance(value, str):
+        return _shorten(value, max_chars)
+    return value
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+def render_tool_result(tool_name: str, result: Dict[str, Any], tool_args: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Render hasil tool database untuk LLM: buang field gambar dan nilai yang sudah diketahui
+    dari argumen tool (misal umkm_id), JSON ringkas, list dipotong dengan catatan sisa item,
+    lalu diperkecil bertahap sampai muat di budget token tool.
+    """
+    budget = get_token_budget(tool_name)
+    known = tool_args or {}
+    max_items, max_chars = RENDER_MAX_ITEMS, RENDER_MAX_TEXT_CHARS
+    while True:
+        text = _dumps(_prune(result, known, max_items, max_chars))
+        if estimate_tokens(text) <= budget or (max_items <= 1 and max_chars <= 40):
+            break
+        max_items = max(1, max_items // 2)
+        max_chars = max(40, max_chars // 2)
+    if estimate_tokens(text) > budget:
+        text = text[: budget * 4] + "...(dipotong)"
+    return text
+
+def render_documents(query: str, documents: List[Any], top_k: int, tool_name: str = "search_documents") -> str:
+    """
+    Render hasil pencarian dokumen: satu baris sumber per hasil dan potongan isi,
+    jumlah hasil dan panjang potongan dikurangi sampai muat di budget token tool.
+    """
+    if not documents:
+        return f"Tidak ditemukan dokumen yang relevan untuk query: '{query}'"
+
+    budget = get_token_budget(tool_name)
+    documents = documents[:top_k]
+    max_chars = 500
+    while True:
+        lines = [f"Hasil pencarian dokumen untuk '{query}' ({len(documents)} hasil):"]
+        for i, doc in enumerate(documents, 1):
+            doc_type = doc.metadata.get("doc_type", "Unknown")
+            page = doc.metadata.get("page", "N/A")
+            lines.append(f"[{i}] {doc_type} hal. {page}: {_shorten(doc.page_content, max_chars)}")
+        text = "\n".join(lines)
+        if estimate_tokens(text) <= budget or (len(documents) <= 1 and max_chars <= 100):
+            return text
+        if max_chars > 200:
+            max_chars = max(200, max_chars * 2 // 3)
+        elif len(documents) > 1:
+            documents = documents[:-1]
+        else:
+            max_chars = 100
@@ -0,0 +1,22 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Pool terbatas untuk pekerjaan blocking (psycopg2, Redis sync, embedding)
+# agar lonjakan tool call tidak membuat thread tanpa batas
+TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "16"))
+
+_executor = ThreadPoolExecutor(max_workers=TOOL_MAX_WORKERS, thread_name_prefix="sribot-tool")
+
+async def run_blocking(func, *args, **kwargs):
+    """Jalankan fungsi sync di thread pool tool, dengan contextvars ikut terbawa"""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(_executor, call)
+
+def shutdown_thread_pool():
+    """Dipanggil saat worker berhenti"""
+    _executor.shutdown(wait=False, cancel_futures=True)